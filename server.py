@@ -2,13 +2,18 @@
 import os
 import io
 import datetime
-from flask import Flask, send_file, jsonify
+from flask import Flask, send_file, jsonify, request
 from snapsac_render import render_one_video
+from output_index import get_index
 
 app = Flask(__name__)
 OUT_DIR = os.getenv("OUT_DIR", "/out")
 
 
+def _index():
+    return get_index(OUT_DIR) if os.path.isdir(OUT_DIR) else None
+
+
 @app.get("/")
 def health():
     return jsonify(status="ok", build=os.getenv("BUILD_ID", "dev"))
@@ -17,18 +22,50 @@ def health():
 @app.post("/render")
 def render_now():
     os.makedirs(OUT_DIR, exist_ok=True)
-    # <-- fais renvoyer le chemin dans ta fonction
     path = render_one_video(OUT_DIR)
     return jsonify(ok=True, path=path)
 
 
 @app.get("/last")
 def last_file():
-    if not os.path.isdir(OUT_DIR):
+    index = _index()
+    if index is None:
         return jsonify(error="no out dir"), 404
-    files = [os.path.join(OUT_DIR, f) for f in os.listdir(
-        OUT_DIR) if f.endswith((".mp4", ".gif"))]
-    if not files:
+    row = index.last(direction=request.args.get("direction"))
+    if not row:
         return jsonify(error="no files"), 404
-    latest = max(files, key=os.path.getmtime)
-    return send_file(latest, as_attachment=False)
+    # conditional=True → ETag / Range (206) support
+    return send_file(row["path"], as_attachment=False, conditional=True,
+                     etag=row["sha256"])
+
+
+@app.get("/videos")
+def list_videos():
+    index = _index()
+    if index is None:
+        return jsonify(error="no out dir"), 404
+    args = request.args
+    try:
+        rows = index.list(
+            direction=args.get("direction"),
+            distance=args.get("distance", type=int),
+            pax=args.get("pax", type=int),
+            limit=min(args.get("limit", 50, type=int), 500),
+            offset=args.get("offset", 0, type=int),
+        )
+    except ValueError:
+        return jsonify(error="bad query"), 400
+    for r in rows:
+        r["url"] = f"/videos/{r['id']}"
+        r.pop("path")
+    return jsonify(videos=rows, count=len(rows))
+
+
+@app.get("/videos/<int:vid>")
+def get_video(vid):
+    index = _index()
+    row = index.get(vid) if index else None
+    if not row or not os.path.exists(row["path"]):
+        return jsonify(error="not found"), 404
+    return send_file(row["path"], as_attachment=False, conditional=True,
+                     etag=row["sha256"])
@@ -0,0 +1,282 @@
+"""
+aircraft_registry.py
+icao24 → aircraft type lookup for matching live traffic to the catalog.
+
+OpenSky state vectors carry no aircraft type. `build` turns an offline
+registry (the OpenSky aircraft database CSV: icao24, typecode,
+operatoricao, ...) into an index directory, once:
+
+    keys.npy         sorted unique icao24 (uint32)
+    types.npy        type code per key (uint16, index into typecodes.json)
+    operators.npy    sorted operator ICAO codes (S3)
+    op_types.npy     most common type code of each operator's fleet
+    typecodes.json   type designators ("A20N", "B738", ...)
+
+TypeIndex memory-maps the arrays, so opening it costs nothing and a
+snapshot's 10k hex codes resolve in one vectorized join (searchsorted
++ equality test). Type designators map to catalog families through
+FAMILY_RULES ("B738" → B737); aircraft missing from the registry fall
+back to their callsign prefix (airline ICAO code → operator fleet, then
+CALLSIGN_FAMILIES), resolved through an LRU since a snapshot only has a
+few hundred distinct prefixes.
+
+    python aircraft_registry.py build aircraftDatabase.csv [INDEX_DIR]
+    python aircraft_registry.py match [INDEX_DIR]
+"""
+import os
+import csv
+import json
+import time
+import pathlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+AIRCRAFT_REGISTRY = os.getenv(
+    "AIRCRAFT_REGISTRY", str(pathlib.Path(__file__).resolve().parent / ".cache" / "registry"))
+PREFIX_CACHE = int(os.getenv("PREFIX_CACHE", "4096"))
+
+# catalog family → ICAO type designator prefixes
+FAMILY_RULES = (
+    ("A380", ("A38",)),
+    ("B777", ("B77",)),
+    ("B737", ("B73", "B37M", "B38M", "B39M", "B3XM")),
+    ("A320", ("A318", "A319", "A32", "A19N", "A20N", "A21N")),
+)
+# airlines flying a single family (fallback without a registry)
+CALLSIGN_FAMILIES = {
+    "RYR": "B737", "SWA": "B737", "FDB": "B737", "AXB": "B737",
+    "EZY": "A320", "EJU": "A320", "WZZ": "A320", "VLG": "A320", "IGO": "A320",
+}
+
+UNKNOWN = -1
+VIA_NONE, VIA_REGISTRY, VIA_CALLSIGN = 0, 1, 2
+
+
+def family_of(typecode):
+    """Catalog family of an ICAO type designator, or None."""
+    code = (typecode or "").strip().upper()
+    for family, prefixes in FAMILY_RULES:
+        if code.startswith(prefixes):
+            return family
+    return None
+
+
+def _hex(s):
+    try:
+        return int(s, 16)
+    except (TypeError, ValueError):
+        return None
+
+
+# ====== Build ======
+
+
+def build(csv_path, out_dir=AIRCRAFT_REGISTRY):
+    """Index a registry CSV (header with icao24 and typecode, optional operatoricao)."""
+    out = pathlib.Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    with open(csv_path, encoding="utf-8", errors="replace", newline="") as f:
+        quote = "'" if f.read(1) == "'" else '"'   # recent dumps quote with '
+        f.seek(0)
+        reader = csv.DictReader(f, quotechar=quote)
+        keys, types, ops = [], [], []
+        type_ids = {}
+        for row in reader:
+            code = _hex(row.get("icao24"))
+            typecode = (row.get("typecode") or "").strip().upper()
+            if code is None or not typecode:
+                continue
+            keys.append(code)
+            types.append(type_ids.setdefault(typecode, len(type_ids)))
+            ops.append((row.get("operatoricao") or "").strip().upper()[:3])
+    if len(type_ids) > np.iinfo(np.uint16).max:
+        raise ValueError("registry: too many distinct type codes")
+
+    keys = np.array(keys, dtype=np.uint32)
+    types = np.array(types, dtype=np.uint16)
+    ops = np.array(ops, dtype="S3")
+    # last row wins for duplicated icao24
+    rev = slice(None, None, -1)
+    uniq, first = np.unique(keys[rev], return_index=True)
+    np.save(out / "keys.npy", uniq)
+    np.save(out / "types.npy", types[rev][first])
+
+    # each operator's most common type
+    has_op = ops != b""
+    op_names, op_inv = np.unique(ops[has_op], return_inverse=True)
+    pair = op_inv.astype(np.int64) * len(type_ids) + types[has_op]
+    pairs, counts = np.unique(pair, return_counts=True)
+    op_of = pairs // len(type_ids)
+    order = np.lexsort((-counts, op_of))
+    head = order[np.r_[True, op_of[order][1:] != op_of[order][:-1]]] if len(order) else order
+    np.save(out / "operators.npy", op_names)
+    np.save(out / "op_types.npy", (pairs[head] % len(type_ids)).astype(np.uint16))
+
+    typecodes = sorted(type_ids, key=type_ids.get)
+    (out / "typecodes.json").write_text(json.dumps(typecodes), encoding="utf-8")
+    return TypeIndex(out)
+
+
+# ====== Lookup ======
+
+
+class TypeIndex:
+    """Memory-mapped registry index; an index without files only uses callsigns."""
+
+    def __init__(self, root=AIRCRAFT_REGISTRY):
+        self.root = pathlib.Path(root)
+        if (self.root / "keys.npy").exists():
+            for name in ("keys", "types", "operators", "op_types"):
+                setattr(self, name, np.load(self.root / f"{name}.npy", mmap_mode="r"))
+            self.typecodes = json.loads((self.root / "typecodes.json").read_text(encoding="utf-8"))
+        else:
+            self.keys = np.empty(0, np.uint32)
+            self.types = np.empty(0, np.uint16)
+            self.operators = np.empty(0, "S3")
+            self.op_types = np.empty(0, np.uint16)
+            self.typecodes = []
+        self._families = {}
+        self._prefix = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"prefix_hits": 0, "prefix_misses": 0}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def type_codes(self, icao24):
+        """Registry type code per icao24 (uint32 codes), UNKNOWN when absent."""
+        codes = np.asarray(icao24, dtype=np.uint32)
+        if not len(self.keys):
+            return np.full(codes.shape, UNKNOWN, dtype=np.int32)
+        i = np.minimum(np.searchsorted(self.keys, codes), len(self.keys) - 1)
+        return np.where(self.keys[i] == codes, self.types[i].astype(np.int32), UNKNOWN)
+
+    def typecodes_of(self, icao24):
+        """Type designator per icao24 ('' when absent)."""
+        names = np.array(self.typecodes + [""], dtype=object)
+        return names[self.type_codes(icao24)]
+
+    def family_ids(self, catalog):
+        """Catalog id per registry type code (+ UNKNOWN at index -1), cached per catalog."""
+        key = catalog.fingerprint()
+        ids = self._families.get(key)
+        if ids is None:
+            ids = np.array([_catalog_id(catalog, family_of(t)) for t in self.typecodes]
+                           + [UNKNOWN], dtype=np.int32)
+            self._families = {key: ids}
+        return ids
+
+    def prefix_family(self, prefix):
+        """Family of an airline callsign prefix (b"RYR") or None, through the LRU."""
+        with self._lock:
+            if prefix in self._prefix:
+                self._prefix.move_to_end(prefix)
+                self.stats["prefix_hits"] += 1
+                return self._prefix[prefix]
+            self.stats["prefix_misses"] += 1
+        family = None
+        i = int(np.searchsorted(self.operators, prefix))
+        if i < len(self.operators) and self.operators[i] == prefix:
+            family = family_of(self.typecodes[self.op_types[i]])
+        if family is None:
+            family = CALLSIGN_FAMILIES.get(prefix.decode("ascii", "replace"))
+        with self._lock:
+            self._prefix[prefix] = family
+            while len(self._prefix) > max(PREFIX_CACHE, 1):
+                self._prefix.popitem(last=False)
+        return family
+
+    def resolve(self, catalog, icao24, callsign=None):
+        """
+        (catalog ids, via) per aircraft: UNKNOWN / VIA_NONE when neither the
+        registry nor the callsign prefix gives a catalog family.
+        """
+        ids = self.family_ids(catalog)[self.type_codes(icao24)]
+        via = np.where(ids >= 0, VIA_REGISTRY, VIA_NONE).astype(np.int8)
+        if callsign is not None:
+            todo = np.flatnonzero(ids < 0)
+            prefixes = np.asarray(callsign, dtype="S8")[todo].astype("S3")
+            ok = np.char.isalpha(prefixes) & (np.char.str_len(prefixes) == 3)
+            todo, prefixes = todo[ok], prefixes[ok]
+            uniq, inv = np.unique(prefixes, return_inverse=True)
+            fam = np.array([_catalog_id(catalog, self.prefix_family(bytes(p))) for p in uniq],
+                           dtype=np.int32)
+            ids[todo] = fam[inv]
+            via[todo[fam[inv] >= 0]] = VIA_CALLSIGN
+        return ids, via
+
+    def catalog_ids(self, snapshot, catalog, default=None):
+        """resolve() for a Snapshot; unknown aircraft get `default` (a catalog name) if set."""
+        ids, via = self.resolve(catalog, snapshot["icao24"], snapshot["callsign"])
+        if default is not None:
+            ids = np.where(ids >= 0, ids, catalog.id_of(default))
+        return ids, via
+
+    def info(self):
+        return {"root": str(self.root), "aircraft": len(self), "types": len(self.typecodes),
+                "operators": len(self.operators), "prefix_cache": len(self._prefix), **self.stats}
+
+
+def _catalog_id(catalog, family):
+    if family is None:
+        return UNKNOWN
+    try:
+        return catalog.id_of(family)
+    except KeyError:
+        return UNKNOWN
+
+
+_DEFAULT = None
+
+
+def load_index(root=None):
+    """Index at `root`, or the shared default (AIRCRAFT_REGISTRY env)."""
+    global _DEFAULT
+    if root is not None:
+        return TypeIndex(root)
+    if _DEFAULT is None:
+        _DEFAULT = TypeIndex(AIRCRAFT_REGISTRY)
+    return _DEFAULT
+
+
+# ====== CLI ======
+
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description="icao24 → aircraft type index")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("build", help="index a registry CSV (OpenSky aircraft database)")
+    p.add_argument("csv")
+    p.add_argument("index", nargs="?", default=AIRCRAFT_REGISTRY)
+    p = sub.add_parser("match", help="resolve the recorded OpenSky snapshot")
+    p.add_argument("index", nargs="?", default=AIRCRAFT_REGISTRY)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "build":
+        t0 = time.perf_counter()
+        idx = build(args.csv, args.index)
+        print(f"[REGISTRY] {idx.info()} in {time.perf_counter() - t0:.2f}s")
+        return
+
+    from catalog import load_catalog
+    from opensky_store import load_fixture, snapshot_from_json
+    cat = load_catalog()
+    snap = snapshot_from_json(load_fixture())
+    idx = TypeIndex(args.index)
+    idx.catalog_ids(snap, cat)                  # warm the prefix cache
+    t0 = time.perf_counter()
+    ids, via = idx.catalog_ids(snap, cat)
+    ms = (time.perf_counter() - t0) * 1000.0
+    counts = np.bincount(ids[ids >= 0], minlength=len(cat))
+    print(f"[REGISTRY] {len(snap)} aircraft in {ms:.2f} ms: "
+          f"{int((via == VIA_REGISTRY).sum())} by registry, "
+          f"{int((via == VIA_CALLSIGN).sum())} by callsign, {int((ids < 0).sum())} unknown")
+    print("[REGISTRY] " + ", ".join(f"{n}: {c}" for n, c in zip(cat.names, counts)))
+    print(f"[REGISTRY] {idx.info()}")
+
+
+if __name__ == "__main__":
+    main()
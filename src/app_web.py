@@ -1,16 +1,17 @@
 # app_web.py - SnapSac Live Web Version - IMPROVED (ENGLISH UI)
-from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
+import time
+_T_IMPORT = time.perf_counter()   # startup clock (import → first frame)
 import os
 import math
-import time
 import io
-from flask import Flask, Response, request, jsonify
+import atexit
+import threading
+from flask import Flask, Response, request, jsonify, send_file
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.lines import Line2D
-from matplotlib.patches import Circle, FancyArrow   # for weather compass
-import matplotlib
-matplotlib.use('Agg')
+
+# Matplotlib is imported lazily (first figure / warm-up thread) so the port
+# binds and /livez answers without paying for it.
+os.environ.setdefault("MPLBACKEND", "Agg")
 
 try:
     from data_sources import fetch_current_wind, fetch_opensky_states
@@ -19,6 +20,26 @@ except Exception:
     fetch_current_wind = None
     fetch_opensky_states = None
 
+from sessions import (SessionTable, RenderPool, RESOLUTIONS, RENDER_WORKERS,
+                      snap_fps, snap_resolution)
+from qos import QoSController, default_tiers
+from live_hls import (LiveEncoder, ffmpeg_available, LIVE_FPS, LIVE_SEGMENT_S,
+                      MIMETYPES)
+from catalog import load_catalog
+from fleet_plot import TOP_K_LABELS, rank_by
+import fuel_model
+import crossover
+import pareto
+import traffic_fuel
+import traffic_density
+import aircraft_registry
+import wind_field
+import route as route_engine
+import fleet_assign
+import export
+from sweep_store import axis_values, parse_range
+from opensky_store import TrafficSource
+
 app = Flask(__name__)
 
 # ====== Build id ======
@@ -40,15 +61,43 @@ EASING = "ease_in_out"
 # Target FPS – override via env TARGET_FPS
 TARGET_FPS = int(os.getenv("TARGET_FPS", "30"))
 
+# Adaptive quality: caps dpi / FPS / substeps for every channel under load
+qos = QoSController(
+    default_tiers(max(RESOLUTIONS.values()), TARGET_FPS, SUBSTEPS),
+    workers=RENDER_WORKERS,
+)
+
 # ====== Aircraft data ======
-AVIONS = {
-    "A320": {"poids_vide": 42000,  "conso_base": 2.4, "max_pax": 180, "sens_vent": 1.0, "vitesse": 840},
-    "B737": {"poids_vide": 41413,  "conso_base": 2.6, "max_pax": 190, "sens_vent": 1.1, "vitesse": 842},
-    "B777": {"poids_vide": 134800, "conso_base": 5.0, "max_pax": 396, "sens_vent": 1.3, "vitesse": 905},
-    "A380": {"poids_vide": 277000, "conso_base": 8.0, "max_pax": 850, "sens_vent": 1.5, "vitesse": 945},
-}
-POIDS_PASSAGER = 80
-POIDS_BAGAGE = 23
+# Specs come from the catalog file (AIRCRAFT_CATALOG, default data/aircraft.csv)
+CATALOG = load_catalog()
+AVIONS = CATALOG.as_dict()
+# EXPORT_LIVE=/path/points.csv (or .arrow): every point played by any
+# channel is appended by a background writer (dropped, never blocking,
+# if the disk falls behind)
+EXPORT_LIVE = os.getenv("EXPORT_LIVE", "").strip()
+live_export = export.ExportWriter(EXPORT_LIVE, CATALOG.names) if EXPORT_LIVE else None
+if live_export is not None:
+    atexit.register(live_export.close, 5.0)
+
+# ====== Live traffic ======
+# OPENSKY_REPLAY=dir: replay a recorded snapshot store (opensky_store.py)
+# at OPENSKY_REPLAY_SPEED× instead of the latest OpenSky answer
+OPENSKY_REPLAY = os.getenv("OPENSKY_REPLAY", "").strip()
+OPENSKY_REPLAY_SPEED = float(os.getenv("OPENSKY_REPLAY_SPEED", "10"))
+traffic = TrafficSource(
+    replay_dir=OPENSKY_REPLAY or None, speed=OPENSKY_REPLAY_SPEED,
+    fetch=fetch_opensky_states if os.getenv('USE_FREE_APIS', '0') in ('1', 'true', 'True')
+    else None)
+# icao24 → catalog family (AIRCRAFT_REGISTRY index; callsign prefixes without one)
+type_index = aircraft_registry.load_index()
+# WIND_FIELD=1: per-aircraft winds from the gridded Open-Meteo field (wind_field.py)
+WIND_FIELD = os.getenv("WIND_FIELD", "0") == "1"
+# TRAFFIC_OVERLAY=1: density map of the current snapshot under the compass
+TRAFFIC_OVERLAY = os.getenv("TRAFFIC_OVERLAY", "0") == "1"
+TRAFFIC_OVERLAY_METRIC = os.getenv("TRAFFIC_OVERLAY_METRIC", "count")
+
+POIDS_PASSAGER = fuel_model.POIDS_PASSAGER
+POIDS_BAGAGE = fuel_model.POIDS_BAGAGE
 DIRECTIONS = ["head", "tail", "side"]
 DISTANCES = [800, 1200, 1600, 2000]
 PAX_LIST = [140, 160, 180, 200, 220, 240]
@@ -77,23 +126,23 @@ PALETTE = {
 
 def calcule_etat(avion_key, direction, vent, pax, distance):
     """Return flight state for given aircraft, direction, wind, pax, distance."""
-    specs = AVIONS[avion_key]
-    if pax > specs["max_pax"]:
+    specs = CATALOG.spec(avion_key)
+    if pax > specs.max_pax:
         return None
-    masse = specs["poids_vide"] + pax * (POIDS_PASSAGER + POIDS_BAGAGE)
+    masse = specs.poids_vide + pax * (POIDS_PASSAGER + POIDS_BAGAGE)
 
     if direction == "head":
-        coef = vent * 0.005 * specs["sens_vent"]
-        vitesse = specs["vitesse"] - vent
+        coef = vent * 0.005 * specs.sens_vent
+        vitesse = specs.vitesse - vent
     elif direction == "tail":
-        coef = vent * -0.003 * specs["sens_vent"]
-        vitesse = specs["vitesse"] + vent
+        coef = vent * -0.003 * specs.sens_vent
+        vitesse = specs.vitesse + vent
     else:  # side / crosswind
-        coef = vent * 0.001 * specs["sens_vent"]
-        vitesse = specs["vitesse"]
+        coef = vent * 0.001 * specs.sens_vent
+        vitesse = specs.vitesse
 
     vitesse = max(600, min(1000, vitesse))
-    conso_km = specs["conso_base"] + (masse / 1000.0) * 0.1 + coef
+    conso_km = specs.conso_base + (masse / 1000.0) * 0.1 + coef
     conso_L = conso_km * distance
 
     return {
@@ -107,13 +156,8 @@ def calcule_etat(avion_key, direction, vent, pax, distance):
 
 
 def ymax_sequence(direction, distance, pax, metric):
-    y_max = 0.0
-    for v in range(0, 301, 20):
-        for avion in AVIONS:
-            e = calcule_etat(avion, direction, v, pax, distance)
-            if e:
-                y_max = max(y_max, e[metric])
-    return (y_max * 1.20) if y_max > 0 else 1.0
+    return fuel_model.ymax(CATALOG, direction, distance, pax, metric,
+                           vents=range(0, 301, 20), headroom=1.20)
 
 
 def sequence_generator():
@@ -169,14 +213,33 @@ class SnapSacAnimation:
         "duree_h": "Time (h)"
     }
 
-    def __init__(self):
+    def __init__(self, force_direction=FORCE_DIRECTION_ENV, dpi=150, fps=TARGET_FPS):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
+        from matplotlib.figure import Figure
+        from matplotlib.lines import Line2D
+        from matplotlib.patches import Circle   # for weather compass
+
         # Data series first
         self.series = {m: {avion: {"x": [], "y": []}
                            for avion in AVIONS} for m in self.METRICS}
         self.frame_count = 0
 
+        # Large fleets: one LineCollection/PathCollection per axes
+        from fleet_plot import FleetArtists, fleet_colors, use_collections
+        self.colors = {n: tuple(c) for n, c in zip(
+            CATALOG.names, fleet_colors(CATALOG.names, PALETTE))}
+        self.fleet = None
+        self.fleet_x = []
+        self.fleet_y = {m: [] for m in self.METRICS}
+
         # Runtime control: None = AUTO, else "head"/"tail"/"side"
-        self.force_direction = FORCE_DIRECTION_ENV
+        self.force_direction = force_direction
+        self.fps = fps
+        self.base_dpi = dpi
+        self.substeps = min(SUBSTEPS, qos.current.substeps)
+
+        # Per-instance wind steps (may be re-centered on real wind)
+        self.vent_steps = list(VENT_STEPS)
 
         # Sequence generator (AUTO base)
         self.seq_gen = sequence_generator()
@@ -199,10 +262,11 @@ class SnapSacAnimation:
         self.wind_speed = None
         self.wind_source = None
 
+        self._xover_artists = []
         self._reset_sequence(self.current_seq)
 
         # Figure / axes
-        self.fig = plt.figure(figsize=(12, 9), facecolor=BG, dpi=150)
+        self.fig = Figure(figsize=(12, 9), facecolor=BG, dpi=dpi)
         # Leave room at the bottom for log + progress bar
         gs = self.fig.add_gridspec(3, 1, hspace=0.32, top=0.94, bottom=0.32)
 
@@ -215,8 +279,18 @@ class SnapSacAnimation:
             ax.set_xlim(0, 300)
             self.axes[metric] = ax
 
+            if use_collections(len(CATALOG)):
+                self.fleet = self.fleet or {}
+                self.fleet[metric] = FleetArtists(
+                    ax, CATALOG.names, list(self.colors.values()),
+                    lw=3.5, best_lw=5.0, alpha=0.85,
+                    marker_size=110, best_marker_size=340,
+                    label_kw={"bbox": dict(boxstyle="round,pad=0.2",
+                                           facecolor=PANEL, alpha=0.8)})
+                continue
+
             # Lines + moving markers/labels per aircraft
-            for avion, color in PALETTE.items():
+            for avion, color in self.colors.items():
                 line, = ax.plot([], [], lw=3.5, color=color, alpha=0.95,
                                 antialiased=True, solid_capstyle="round", zorder=3)
                 self.lines[metric][avion] = line
@@ -239,24 +313,27 @@ class SnapSacAnimation:
                 self.lines['markers'][metric][avion] = marker
                 self.lines['labels'][metric][avion] = label
 
+        self._annotate_crossovers()
+
         # Canvas
         self.canvas = FigureCanvas(self.fig)
 
-        # Legend
+        # Legend (batched mode relies on the top-K labels instead)
         legend_elements = []
-        for avion, color in PALETTE.items():
+        for avion, color in (self.colors.items() if self.fleet is None else ()):
             legend_elements.append(
                 Line2D([0], [0], color=color, lw=4,
                        label=f"{avion}", marker='o', markersize=8)
             )
-        self.axes[self.METRICS[0]].legend(
-            handles=legend_elements,
-            loc='upper left',
-            fontsize=10,
-            framealpha=0.9,
-            facecolor=PANEL,
-            edgecolor='#2a2f4a'
-        )
+        if legend_elements:
+            self.axes[self.METRICS[0]].legend(
+                handles=legend_elements,
+                loc='upper left',
+                fontsize=10,
+                framealpha=0.9,
+                facecolor=PANEL,
+                edgecolor='#2a2f4a'
+            )
 
         # Log window (bottom)
         self.log_ax = self.fig.add_axes((0.08, 0.14, 0.84, 0.14))
@@ -287,7 +364,7 @@ class SnapSacAnimation:
         # Progress bar (under log)
         self.progress_ax = self.fig.add_axes((0.08, 0.08, 0.84, 0.03))
         self.progress_ax.set_facecolor(PANEL)
-        self.progress_ax.set_xlim(0, len(VENT_STEPS) * SUBSTEPS)
+        self.progress_ax.set_xlim(0, len(self.vent_steps) * self.substeps)
         self.progress_ax.set_ylim(0, 1)
         self.progress_ax.set_xticks([])
         self.progress_ax.set_yticks([])
@@ -334,6 +411,27 @@ class SnapSacAnimation:
         # Arrow placeholder (will be updated each frame)
         self.met_arrow = None
 
+        # Traffic density map (optional, under the compass)
+        self.traffic_ax = None
+        self._traffic_layer = None
+        if TRAFFIC_OVERLAY:
+            self.traffic_ax = self.fig.add_axes((0.80, 0.49, 0.18, 0.16))
+            self.traffic_ax.set_facecolor("#101325")
+            self.traffic_ax.set_xticks([])
+            self.traffic_ax.set_yticks([])
+            for sp in self.traffic_ax.spines.values():
+                sp.set_visible(False)
+            self.traffic_img = self.traffic_ax.imshow(
+                np.zeros((1, 1, 4), dtype=np.uint8), extent=traffic_density.WORLD,
+                origin="lower", interpolation="nearest", aspect="auto")
+            self.traffic_ax.set_xlim(traffic_density.WORLD[:2])
+            self.traffic_ax.set_ylim(traffic_density.WORLD[2:])
+            self.traffic_ax.text(0.5, 0.97, "LIVE TRAFFIC", transform=self.traffic_ax.transAxes,
+                                 ha="center", va="top", fontsize=9, color=FG, weight="bold")
+            self.traffic_label = self.traffic_ax.text(
+                0.5, 0.02, "", transform=self.traffic_ax.transAxes,
+                ha="center", va="bottom", fontsize=7, color=MUTED)
+
         # Subtle background "watermark" with wind info
         self.weather_bg = self.fig.text(
             0.5, 0.50, "",
@@ -343,7 +441,7 @@ class SnapSacAnimation:
         )
 
         # Footer
-        footer_text = f"Live animation • {TARGET_FPS} FPS • Build: {APP_BUILD}"
+        footer_text = f"Live animation • {self.fps} FPS • Build: {APP_BUILD}"
         self.footer_artist = self.fig.text(
             0.5, 0.02, footer_text,
             fontsize=10, color=MUTED,
@@ -363,8 +461,19 @@ class SnapSacAnimation:
             for avion in AVIONS:
                 self.series[metric][avion]["x"].clear()
                 self.series[metric][avion]["y"].clear()
+            self.fleet_y[metric].clear()
+        self.fleet_x.clear()
+
+        # Break-even winds for this scenario (static markers on every chart)
+        self.crossovers = crossover.solve(CATALOG, self.direction, self.distance, self.pax)
+        if hasattr(self, "axes"):
+            self._annotate_crossovers()
 
         self.frame_count = 0
+        # QoS tier changes apply at sequence boundaries (keeps frames aligned)
+        self.substeps = min(SUBSTEPS, qos.current.substeps)
+        if hasattr(self, "progress_ax"):
+            self.progress_ax.set_xlim(0, len(self.vent_steps) * self.substeps)
 
         # Optionally re-center wind steps on real wind
         if self.use_free_apis and fetch_current_wind:
@@ -391,16 +500,51 @@ class SnapSacAnimation:
                     step = VENT_STEP
                     new_steps = list(range(lo - (lo % step), hi + step, step))
                     if len(new_steps) >= 2:
-                        global VENT_STEPS
-                        VENT_STEPS = sorted(list(set(new_steps)))
-                        self.progress_ax.set_xlim(
-                            0, len(VENT_STEPS) * SUBSTEPS)
+                        self.vent_steps = sorted(set(new_steps))
+                        if hasattr(self, "progress_ax"):
+                            self.progress_ax.set_xlim(
+                                0, len(self.vent_steps) * self.substeps)
             except Exception:
                 pass
 
+    def _annotate_crossovers(self):
+        for art in self._xover_artists:
+            art.remove()
+        self._xover_artists = [
+            art for ax in self.axes.values()
+            for art in crossover.annotate(ax, self.crossovers, self.colors)]
+
     def _etat(self, avion, vent):
         return calcule_etat(avion, self.direction, vent, self.pax, self.distance)
 
+    def _fleet_step(self, step_index, substep, v0, v1, t):
+        """Batched mode: evaluate every aircraft at once for this frame."""
+        e0 = fuel_model.evaluate(CATALOG, self.direction, v0, self.pax, self.distance)
+        e1 = e0 if step_index >= len(self.vent_steps) - 1 else fuel_model.evaluate(
+            CATALOG, self.direction, v1, self.pax, self.distance)
+        if substep == 0:
+            self.fleet_x.append(v0)
+            for metric in self.METRICS:
+                self.fleet_y[metric].append(e0[metric])
+        cur = {m: lerp(e0[m], e1[m], t) for m in self.METRICS}
+        cpx = cur["conso_L_pax"]
+        if not np.isfinite(cpx).any():
+            return None, None, float("inf"), cur
+        i = int(np.nanargmin(cpx))
+        best_state = {k: float(v[i]) for k, v in e0.items()}
+        return CATALOG.names[i], best_state, float(cpx[i]), cur
+
+    def _draw_fleet(self, metric, v_cur, best_model, cur):
+        n = len(CATALOG)
+        x = np.asarray(self.fleet_x, dtype=float)
+        Y = (np.column_stack(self.fleet_y[metric]) if self.fleet_x
+             else np.empty((n, 0)))
+        points = np.column_stack([np.full(n, v_cur), cur[metric]])
+        best = CATALOG.id_of(best_model) if best_model else None
+        self.fleet[metric].update(
+            x, Y, best=best, points=points,
+            rank=rank_by(cur["conso_L_pax"]), label_dx=6, best_color=ACC)
+
     def _update_weather_compass(self, sim_wind):
         """Update the small compass panel with real + simulated wind."""
         # Choose what to display
@@ -416,6 +560,8 @@ class SnapSacAnimation:
             else:
                 disp_angle = 90.0   # side / crosswind
 
+        from matplotlib.patches import FancyArrow
+
         # Arrow (remove previous one)
         if self.met_arrow is not None and self.met_arrow in self.met_ax.patches:
             try:
@@ -447,49 +593,106 @@ class SnapSacAnimation:
         # Big subtle background text (“image” feeling)
         self.weather_bg.set_text(f"{disp_speed:.0f} km/h\nWIND")
 
+    def _update_traffic_overlay(self):
+        """Density layer of the current snapshot (cached; swapped when it changes)."""
+        if self.traffic_ax is None:
+            return
+        snap = traffic.current()
+        if snap is None:
+            return
+        img = traffic_density.layer(snap, TRAFFIC_OVERLAY_METRIC)
+        if img is not self._traffic_layer:
+            self._traffic_layer = img
+            self.traffic_img.set_data(img)
+            self.traffic_img.set_extent(traffic_density.grid(snap).extent)
+            self.traffic_label.set_text(f"{len(snap)} aircraft • {traffic.source}")
+
+    def _apply_dpi(self):
+        dpi = min(self.base_dpi, qos.current.dpi)
+        if self.fig.dpi != dpi:
+            self.fig.set_dpi(dpi)
+
     def generate_frame(self):
+        """Advance one frame and return it as PNG bytes."""
         try:
-            # Update Y-limits
-            for metric in self.METRICS:
-                ax = self.axes[metric]
-                ymax = ymax_sequence(
-                    self.direction, self.distance, self.pax, metric)
-                ax.set_ylim(0, ymax)
-
-            axes = self.axes
-
-            # Animation progression
-            total_frames = len(VENT_STEPS) * SUBSTEPS
-            if self.frame_count >= total_frames:
-                self.current_seq = next(self.seq_gen)
-                self._reset_sequence(self.current_seq)
-                self.frame_count = 0
-                total_frames = len(VENT_STEPS) * SUBSTEPS
-                self.progress_ax.set_xlim(0, total_frames)
-
-            step_index = self.frame_count // SUBSTEPS
-            substep = self.frame_count % SUBSTEPS
-            t = ease_t(substep / SUBSTEPS)
+            self._update_frame()
+            # Render frame (at most the QoS tier's dpi);
+            # print_png draws the canvas itself, no separate draw() pass
+            self._apply_dpi()
+            img_buffer = io.BytesIO()
+            self.canvas.print_png(img_buffer)
+            img_buffer.seek(0)
+            img_data = img_buffer.getvalue()
+
+            self.frame_count += 1
+            return img_data
+
+        except Exception as e:
+            return self._error_frame(e)
+
+    def render_rgba(self, dpi=None):
+        """
+        Advance one frame and return the canvas as an (h, w, 4) uint8
+        array (live encoder input). `dpi` pins the size, since an encoder
+        needs constant frame dimensions; errors propagate to the caller.
+        """
+        self._update_frame()
+        if dpi is None:
+            self._apply_dpi()
+        elif self.fig.dpi != dpi:
+            self.fig.set_dpi(dpi)
+        self.canvas.draw()
+        self.frame_count += 1
+        return np.asarray(self.canvas.buffer_rgba())
+
+    def _update_frame(self):
+        """Advance the simulation one frame and update all artists."""
+        # Update Y-limits
+        for metric in self.METRICS:
+            ax = self.axes[metric]
+            ymax = ymax_sequence(
+                self.direction, self.distance, self.pax, metric)
+            ax.set_ylim(0, ymax)
+
+        axes = self.axes
+
+        # Animation progression
+        total_frames = len(self.vent_steps) * self.substeps
+        if self.frame_count >= total_frames:
+            self.current_seq = next(self.seq_gen)
+            self._reset_sequence(self.current_seq)
+            self.frame_count = 0
+            total_frames = len(self.vent_steps) * self.substeps
+            self.progress_ax.set_xlim(0, total_frames)
+
+        step_index = self.frame_count // self.substeps
+        substep = self.frame_count % self.substeps
+        t = ease_t(substep / self.substeps)
+        try:
+            t = float(t)
+        except Exception:
             try:
-                t = float(t)
+                t = float(str(t))
             except Exception:
-                try:
-                    t = float(str(t))
-                except Exception:
-                    t = 0.0
+                t = 0.0
 
-            v0 = VENT_STEPS[step_index]
-            v1 = VENT_STEPS[step_index +
-                            1] if step_index < len(VENT_STEPS) - 1 else v0
-            v_cur = lerp(v0, v1, t)
+        v0 = self.vent_steps[step_index]
+        v1 = self.vent_steps[step_index +
+                        1] if step_index < len(self.vent_steps) - 1 else v0
+        v_cur = lerp(v0, v1, t)
 
-            # Compute states and update series
-            best_model, best_state, best_cpx = None, None, float("inf")
+        # Compute states and update series
+        best_model, best_state, best_cpx = None, None, float("inf")
 
+        fleet_cur = None
+        if self.fleet is not None:
+            best_model, best_state, best_cpx, fleet_cur = self._fleet_step(
+                step_index, substep, v0, v1, t)
+        else:
             for avion in AVIONS:
                 e0 = self._etat(avion, v0)
                 e1 = self._etat(avion, v1) if step_index < len(
-                    VENT_STEPS) - 1 else e0
+                    self.vent_steps) - 1 else e0
 
                 if not e0:
                     continue
@@ -509,37 +712,53 @@ class SnapSacAnimation:
                     best_model = avion
                     best_state = e0
 
-            # Draw curves
-            for metric, ax in axes.items():
-                # Vertical wind line
-                for ln in [ln for ln in list(ax.lines) if getattr(ln, '_is_vline', False)]:
-                    try:
-                        ln.remove()
-                    except Exception:
-                        pass
-                vline = ax.axvline(
-                    v_cur, color="#7480b8", lw=2.0,
-                    ls="--", alpha=0.7, zorder=4
-                )
-                vline._is_vline = True
+        # Non-dominated models on (fuel/pax, time) at the current wind
+        cur_all = fleet_cur if fleet_cur is not None else fuel_model.evaluate(
+            CATALOG, self.direction, v_cur, self.pax, self.distance)
+        pareto_models = pareto.front_names(
+            CATALOG, pareto.pareto_mask(cur_all["conso_L_pax"], cur_all["duree_h"]))
+
+        if live_export is not None:
+            played = fuel_model.evaluate(
+                CATALOG, self.direction, [v_cur], self.pax, self.distance)
+            live_export.submit(export.rows_from_states(
+                fuel_model.direction_code(self.direction), v_cur, self.distance,
+                self.pax, played), block=False)
+
+        # Draw curves
+        for metric, ax in axes.items():
+            # Vertical wind line
+            for ln in [ln for ln in list(ax.lines) if getattr(ln, '_is_vline', False)]:
+                try:
+                    ln.remove()
+                except Exception:
+                    pass
+            vline = ax.axvline(
+                v_cur, color="#7480b8", lw=2.0,
+                ls="--", alpha=0.7, zorder=4
+            )
+            vline._is_vline = True
 
-                # Wind text
-                for txt in [txt for txt in list(ax.texts) if getattr(txt, '_is_vent', False)]:
-                    try:
-                        txt.remove()
-                    except Exception:
-                        pass
-                vent_text = ax.text(
-                    v_cur + 5, ax.get_ylim()[1] * 0.95,
-                    f"Wind: {v_cur:.0f} km/h",
-                    fontsize=9, color="#7480b8",
-                    ha='left', va='top',
-                    bbox=dict(boxstyle="round,pad=0.3",
-                              facecolor=PANEL, alpha=0.8)
-                )
-                vent_text._is_vent = True
+            # Wind text
+            for txt in [txt for txt in list(ax.texts) if getattr(txt, '_is_vent', False)]:
+                try:
+                    txt.remove()
+                except Exception:
+                    pass
+            vent_text = ax.text(
+                v_cur + 5, ax.get_ylim()[1] * 0.95,
+                f"Wind: {v_cur:.0f} km/h",
+                fontsize=9, color="#7480b8",
+                ha='left', va='top',
+                bbox=dict(boxstyle="round,pad=0.3",
+                          facecolor=PANEL, alpha=0.8)
+            )
+            vent_text._is_vent = True
 
-                for avion, color in PALETTE.items():
+            if self.fleet is not None:
+                self._draw_fleet(metric, v_cur, best_model, fleet_cur)
+            else:
+                for avion, color in self.colors.items():
                     s = self.series[metric][avion]
                     line = self.lines[metric][avion]
 
@@ -553,7 +772,7 @@ class SnapSacAnimation:
                             avion, self.direction, v0, self.pax, self.distance)
                         e1_marker = calcule_etat(
                             avion, self.direction, v1, self.pax, self.distance
-                        ) if step_index < len(VENT_STEPS) - 1 else e0_marker
+                        ) if step_index < len(self.vent_steps) - 1 else e0_marker
 
                         if e0_marker:
                             y0_marker = e0_marker[metric]
@@ -600,7 +819,8 @@ class SnapSacAnimation:
                                 label.set_fontweight('bold')
                             else:
                                 label.set_color(color)
-                                label.set_fontweight('normal')
+                                label.set_fontweight(
+                                    'bold' if avion in pareto_models else 'normal')
                             label.set_visible(True)
                         else:
                             marker.set_offsets(np.array([]).reshape(0, 2))
@@ -612,209 +832,761 @@ class SnapSacAnimation:
                         marker.set_offsets(np.array([]).reshape(0, 2))
                         label.set_visible(False)
 
-                # "Best" text
-                best_text = f"Best: {best_model}" if best_model else "Best: —"
-                for old_best in [old for old in ax.texts if getattr(old, '_is_best', False)]:
-                    old_best.remove()
-                best_txt = ax.text(
-                    0.98, 0.96, best_text,
-                    transform=ax.transAxes,
-                    ha="right", va="top",
-                    fontsize=11, color="#C9CEEC", weight='bold',
-                    bbox=dict(boxstyle="round,pad=0.4",
-                              facecolor=PANEL, alpha=0.9)
-                )
-                best_txt._is_best = True
-
-            # Suptitle – more “product” style
-            direction_emoji = {"head": "↓", "tail": "↑", "side": "↔"}
-            emoji = direction_emoji.get(self.direction, "")
-            title_text = (
-                f"{emoji} Kerosene Optimisator • Live fuel comparison • "
-                f"Wind {v_cur:.0f} km/h • {self.distance} km • {self.pax} pax"
+            # "Best" text
+            best_text = f"Best: {best_model}" if best_model else "Best: —"
+            if len(pareto_models) > 1:
+                best_text += f"\nPareto: {pareto.summary(pareto_models)}"
+            for old_best in [old for old in ax.texts if getattr(old, '_is_best', False)]:
+                old_best.remove()
+            best_txt = ax.text(
+                0.98, 0.96, best_text,
+                transform=ax.transAxes,
+                ha="right", va="top",
+                fontsize=11, color="#C9CEEC", weight='bold',
+                bbox=dict(boxstyle="round,pad=0.4",
+                          facecolor=PANEL, alpha=0.9)
             )
-            for st_old in [st_old for st_old in self.fig.texts if getattr(st_old, '_is_suptitle', False)]:
-                st_old.remove()
-            st = self.fig.suptitle(
-                title_text, fontsize=17, fontweight="bold", color=FG, y=0.98
-            )
-            st._is_suptitle = True
+            best_txt._is_best = True
+
+        # Suptitle – more “product” style
+        direction_emoji = {"head": "↓", "tail": "↑", "side": "↔"}
+        emoji = direction_emoji.get(self.direction, "")
+        title_text = (
+            f"{emoji} Kerosene Optimisator • Live fuel comparison • "
+            f"Wind {v_cur:.0f} km/h • {self.distance} km • {self.pax} pax"
+        )
+        for st_old in [st_old for st_old in self.fig.texts if getattr(st_old, '_is_suptitle', False)]:
+            st_old.remove()
+        st = self.fig.suptitle(
+            title_text, fontsize=17, fontweight="bold", color=FG, y=0.98
+        )
+        st._is_suptitle = True
 
-            # Progress bar
-            for p in list(self.progress_ax.patches):
-                try:
-                    p.remove()
-                except Exception:
-                    pass
-            for txt in list(self.progress_ax.texts):
-                try:
-                    txt.remove()
-                except Exception:
-                    pass
+        # Progress bar
+        for p in list(self.progress_ax.patches):
+            try:
+                p.remove()
+            except Exception:
+                pass
+        for txt in list(self.progress_ax.texts):
+            try:
+                txt.remove()
+            except Exception:
+                pass
 
-            self.progress_ax.barh(
-                0.5, self.frame_count,
-                color=ACC, alpha=0.9, height=0.6,
-                edgecolor=ACC, linewidth=1, zorder=3
-            )
-            self.progress_ax.barh(
-                0.5, total_frames,
-                color=PANEL, alpha=0.3, height=0.6, zorder=1
-            )
-            progress_pct = (self.frame_count / total_frames) * 100
-            self.progress_ax.text(
-                0.5, 0.5, f"{progress_pct:.1f}%",
-                transform=self.progress_ax.transAxes,
-                ha='center', va='center',
-                color=FG, fontsize=9, weight='bold'
-            )
+        self.progress_ax.barh(
+            0.5, self.frame_count,
+            color=ACC, alpha=0.9, height=0.6,
+            edgecolor=ACC, linewidth=1, zorder=3
+        )
+        self.progress_ax.barh(
+            0.5, total_frames,
+            color=PANEL, alpha=0.3, height=0.6, zorder=1
+        )
+        progress_pct = (self.frame_count / total_frames) * 100
+        self.progress_ax.text(
+            0.5, 0.5, f"{progress_pct:.1f}%",
+            transform=self.progress_ax.transAxes,
+            ha='center', va='center',
+            color=FG, fontsize=9, weight='bold'
+        )
 
-            # === Bottom LOG (detailed, English) ===
-            log_lines = []
-            log_lines.append(
-                f"FRAME {self.frame_count:4d} • Wind {v_cur:5.1f} km/h • "
-                f"dir={self.direction} • dist={self.distance} km • pax={self.pax}"
-            )
-            log_lines.append("-" * 90)
-            log_lines.append(
-                "ACFT | mass[t] | base L/km | wind_coef | fuel/pax[L] | fuel_tot[L] | time[h] | speed[km/h]"
-            )
-            log_lines.append("-" * 90)
+        # === Bottom LOG (detailed, English) ===
+        log_lines = []
+        log_lines.append(
+            f"FRAME {self.frame_count:4d} • Wind {v_cur:5.1f} km/h • "
+            f"dir={self.direction} • dist={self.distance} km • pax={self.pax}"
+        )
+        log_lines.append("-" * 90)
+        log_lines.append(
+            "ACFT | mass[t] | base L/km | wind_coef | fuel/pax[L] | fuel_tot[L] | time[h] | speed[km/h]"
+        )
+        log_lines.append("-" * 90)
 
-            for avion in AVIONS:
-                e = calcule_etat(avion, self.direction, v_cur,
-                                 self.pax, self.distance)
-                if e:
-                    mass_t = e["mass_kg"] / 1000.0
-                    coef = e["wind_coef"]
-                    specs = AVIONS[avion]
-                    base = specs["conso_base"]
-                    log_lines.append(
-                        f"{avion:4s} | {mass_t:6.1f} | {base:9.3f} | {coef:+9.3f} | "
-                        f"{e['conso_L_pax']:11.2f} | {e['conso_L']:11.0f} | "
-                        f"{e['duree_h']:7.3f} | {e['vitesse']:11.0f}"
-                    )
-
-            if best_model is not None:
-                log_lines.append("")
+        log_models = AVIONS if self.fleet is None else [
+            CATALOG.names[i] for i in rank_by(fleet_cur["conso_L_pax"])[:TOP_K_LABELS]]
+        for avion in log_models:
+            e = calcule_etat(avion, self.direction, v_cur,
+                             self.pax, self.distance)
+            if e:
+                mass_t = e["mass_kg"] / 1000.0
+                coef = e["wind_coef"]
+                base = CATALOG.spec(avion).conso_base
                 log_lines.append(
-                    f"BEST MODEL → {best_model}  (fuel per pax = {best_cpx:5.1f} L)"
+                    f"{avion:4s} | {mass_t:6.1f} | {base:9.3f} | {coef:+9.3f} | "
+                    f"{e['conso_L_pax']:11.2f} | {e['conso_L']:11.0f} | "
+                    f"{e['duree_h']:7.3f} | {e['vitesse']:11.0f}"
                 )
 
-            self.log_text.set_text("\n".join(log_lines))
+        if best_model is not None:
+            log_lines.append("")
+            log_lines.append(
+                f"BEST MODEL → {best_model}  (fuel per pax = {best_cpx:5.1f} L)"
+            )
+
+        self.log_text.set_text("\n".join(log_lines))
+
+        # === KPI PANEL (bottom-right, in log area) – simplified & bigger ===
+        kpi_lines = []
+        kpi_lines.append("RUN SNAPSHOT")
+        kpi_lines.append(
+            f"{self.direction.upper()} • {self.distance} km • {self.pax} pax"
+        )
+
+        # Compact wind line: sim vs real meteo
+        wind_parts = [f"sim wind {v_cur:.0f} km/h"]
+        if self.wind_speed is not None:
+            wind_parts.append(f"meteo {self.wind_speed:.0f} km/h")
+        if self.wind_angle is not None:
+            wind_parts.append(f"{self.wind_angle:.0f}°")
+        kpi_lines.append(" | ".join(wind_parts))
 
-            # === KPI PANEL (bottom-right, in log area) – simplified & bigger ===
-            kpi_lines = []
-            kpi_lines.append("RUN SNAPSHOT")
+        kpi_lines.append("")
+
+        if best_model and best_state:
+            kpi_lines.append(f"BEST: {best_model}")
             kpi_lines.append(
-                f"{self.direction.upper()} • {self.distance} km • {self.pax} pax"
-            )
+                f"Fuel / pax : {best_state['conso_L_pax']:.1f} L")
+            kpi_lines.append(
+                f"Total fuel : {best_state['conso_L']:,.0f} L")
+            kpi_lines.append(
+                f"Time       : {best_state['duree_h']:.2f} h")
+            kpi_lines.append(
+                f"Speed      : {best_state['vitesse']:.0f} km/h")
+
+        self.kpi_text_artist.set_text("\n".join(kpi_lines))
+
+        # === Weather compass & background text ===
+        self._update_weather_compass(v_cur)
+        self._update_traffic_overlay()
+
+    def _error_frame(self, e):
+        """Placeholder PNG when a frame fails to render."""
+        print(f"Frame generation error: {e}")
+        import traceback
+        from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
+        from matplotlib.figure import Figure
+        traceback.print_exc()
+        fig = Figure(figsize=(10, 6))
+        ax = fig.add_subplot()
+        ax.text(0.5, 0.5, f"Kerosene Optimisator\nError: {e}",
+                ha='center', va='center', fontsize=16,
+                transform=ax.transAxes)
+        img_buffer = io.BytesIO()
+        FigureCanvas(fig).print_png(img_buffer)
+        img_buffer.seek(0)
+        return img_buffer.getvalue()
+
+    def close(self):
+        """Release figure memory when the render channel is dropped."""
+        self.fig.clear()
+
+
+# ====== Sessions & shared renders ======
+SESSION_COOKIE = "ksid"
+DEFAULT_RESOLUTION = snap_resolution(os.getenv("RESOLUTION", "high"))
+
+sessions = SessionTable(
+    default_direction=FORCE_DIRECTION_ENV,
+    default_fps=snap_fps(TARGET_FPS, TARGET_FPS),
+    default_resolution=DEFAULT_RESOLUTION,
+)
+
+
+def _make_renderer(key):
+    """One SnapSacAnimation per distinct (direction, fps, resolution)."""
+    direction, fps, resolution = key
+    return SnapSacAnimation(
+        force_direction=None if direction == "auto" else direction,
+        dpi=RESOLUTIONS[resolution], fps=fps)
+
+
+def _on_render(key, seconds, renderer):
+    if startup["first_frame_s"] is None:
+        startup["first_frame_s"] = time.perf_counter() - _T_IMPORT
+        print(f"⏱️ import → first frame: {startup['first_frame_s']:.2f}s")
+    # channels with a viewer: idle ones linger until the next stream closes
+    qos.set_audience(sessions.active_count(), len(sessions.keys_in_use()))
+    qos.observe(seconds, dpi=renderer.fig.dpi)
+    if startup["error"] is not None:
+        # a failed warm-up is not fatal: the first good frame makes us ready
+        startup.update(error=None, ready=True)
+
+
+render_pool = RenderPool(_make_renderer, on_render=_on_render)
+
+
+# ====== Startup: lazy figures + background warm-up ======
+WARMUP = os.getenv("WARMUP", "1") == "1"
+WARMUP_FRAMES = max(1, int(os.getenv("WARMUP_FRAMES", "3")))
+
+startup = {
+    "ready": not WARMUP,
+    "import_s": None,
+    "first_frame_s": None,
+    "warmup_s": None,
+    "error": None,
+}
 
-            # Compact wind line: sim vs real meteo
-            wind_parts = [f"sim wind {v_cur:.0f} km/h"]
-            if self.wind_speed is not None:
-                wind_parts.append(f"meteo {self.wind_speed:.0f} km/h")
-            if self.wind_angle is not None:
-                wind_parts.append(f"{self.wind_angle:.0f}°")
-            kpi_lines.append(" | ".join(wind_parts))
-
-            kpi_lines.append("")
-
-            if best_model and best_state:
-                kpi_lines.append(f"BEST: {best_model}")
-                kpi_lines.append(
-                    f"Fuel / pax : {best_state['conso_L_pax']:.1f} L")
-                kpi_lines.append(
-                    f"Total fuel : {best_state['conso_L']:,.0f} L")
-                kpi_lines.append(
-                    f"Time       : {best_state['duree_h']:.2f} h")
-                kpi_lines.append(
-                    f"Speed      : {best_state['vitesse']:.0f} km/h")
-
-            self.kpi_text_artist.set_text("\n".join(kpi_lines))
-
-            # === Weather compass & background text ===
-            self._update_weather_compass(v_cur)
-
-            # Render frame
-            img_buffer = io.BytesIO()
-            self.canvas.draw()
-            self.canvas.print_png(img_buffer)
-            img_buffer.seek(0)
-            img_data = img_buffer.getvalue()
 
-            self.frame_count += 1
-            return img_data
+def _warmup():
+    """Build the default channel and pre-render its first frames."""
+    t0 = time.perf_counter()
+    key = (FORCE_DIRECTION_ENV or "auto",
+           sessions.default_fps, sessions.default_resolution)
+    try:
+        frame_no = 0
+        for _ in range(WARMUP_FRAMES):
+            frame_no, _ = render_pool.frame(key, frame_no, 0.0)
+        startup["ready"] = True
+    except Exception as e:
+        startup["error"] = str(e)
+        print(f"Warm-up error: {e}")
+    finally:
+        startup["warmup_s"] = time.perf_counter() - t0
 
-        except Exception as e:
-            print(f"Frame generation error: {e}")
-            import traceback
-            traceback.print_exc()
-            fig, ax = plt.subplots(figsize=(10, 6))
-            ax.text(0.5, 0.5, f"Kerosene Optimisator\nError: {e}",
-                    ha='center', va='center', fontsize=16,
-                    transform=ax.transAxes)
-            img_buffer = io.BytesIO()
-            plt.savefig(img_buffer, format='png')
-            img_buffer.seek(0)
-            return img_buffer.getvalue()
-        finally:
-            pass
 
+_warmup_thread = None
+_warmup_lock = threading.Lock()
 
-# Init animation (global singleton)
-snapsac_anim = SnapSacAnimation()
 
+def start_warmup():
+    """Start the warm-up thread once (from __main__ or the first request)."""
+    global _warmup_thread
+    if not WARMUP or _warmup_thread is not None:
+        return
+    with _warmup_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=_warmup, name="warmup", daemon=True)
+            _warmup_thread.start()
 
-def generate_frames():
-    while True:
-        try:
-            frame = snapsac_anim.generate_frame()
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/png\r\n\r\n' + frame + b'\r\n')
-            time.sleep(1.0 / TARGET_FPS)
-        except Exception as e:
-            print(f"Stream error: {e}")
-            time.sleep(1)
+
+@app.before_request
+def _warmup_on_first_request():
+    # importing app_web (scripts, CLIs) renders nothing; serving does
+    start_warmup()
+
+
+def _session():
+    sid = request.cookies.get(SESSION_COOKIE) or request.args.get("sid")
+    return sessions.get(sid)
+
+
+def generate_frames(session):
+    sessions.open_stream(session)
+    try:
+        while True:
+            try:
+                key = session.key()
+                fps = min(session.fps, qos.current.fps)
+                frame_no, frame = render_pool.frame(
+                    key, session.frame_no, 1.0 / fps)
+                session.frame_no = frame_no
+                session.last_seen = time.monotonic()
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/png\r\n\r\n' + frame + b'\r\n')
+            except Exception as e:
+                print(f"Stream error: {e}")
+                time.sleep(1)
+    finally:
+        sessions.close_stream(session)
+        render_pool.expire(sessions.keys_in_use())
 
 
 @app.route('/video_feed')
 def video_feed():
-    return Response(generate_frames(),
+    session = _session()
+    resp = Response(generate_frames(session),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
+    resp.set_cookie(SESSION_COOKIE, session.sid, samesite="Lax")
+    return resp
 
 
 @app.route('/health')
+@app.route('/livez')
 def health():
+    """Liveness: the process is up and serving requests."""
     return 'OK'
 
 
+@app.route('/readyz')
+def readyz():
+    """Readiness: first frames are rendered, streams will start instantly (503 if warm-up failed)."""
+    body = {k: (round(v, 3) if isinstance(v, float) else v)
+            for k, v in startup.items()}
+    ok = startup["ready"] and startup["error"] is None
+    return jsonify(body), (200 if ok else 503)
+
+
 # ====== CONTROL ENDPOINT (for UI buttons) ======
 @app.route('/control', methods=['POST'])
 def control():
     """
-    Simple JSON API:
-    { "direction": "auto" | "head" | "tail" | "side" }
+    Simple JSON API, scoped to the caller's session:
+    { "direction": "auto" | "head" | "tail" | "side",
+      "fps": 5..30, "resolution": "low" | "medium" | "high" }
+    All fields are optional.
     """
     data = request.get_json(silent=True) or {}
+    session = _session()
     direction = str(data.get("direction", "")).strip().lower()
 
-    if direction == "auto":
-        snapsac_anim.force_direction = None
-        snapsac_anim._reset_sequence(snapsac_anim.current_seq)
-        return jsonify({"status": "ok", "mode": "auto"})
+    if direction and direction != "auto" and direction not in DIRECTIONS:
+        return jsonify({"status": "error", "message": "invalid direction"}), 400
+    if "resolution" in data and str(data["resolution"]).lower() not in RESOLUTIONS:
+        return jsonify({"status": "error", "message": "invalid resolution"}), 400
+
+    if direction:
+        session.direction = None if direction == "auto" else direction
+    if "fps" in data:
+        session.fps = snap_fps(data["fps"], TARGET_FPS)
+    if "resolution" in data:
+        session.resolution = snap_resolution(data["resolution"])
+    # New channel → restart the cursor so the first frame is not skipped
+    session.frame_no = 0
+
+    out = {"status": "ok", "session": session.to_dict()}
+    if session.direction is None:
+        out["mode"] = "auto"
+    else:
+        out.update(mode="forced", direction=session.direction)
+    resp = jsonify(out)
+    resp.set_cookie(SESSION_COOKIE, session.sid, samesite="Lax")
+    return resp
+
+
+@app.route('/sessions')
+def sessions_info():
+    return jsonify({
+        "sessions": len(sessions),
+        "viewers": sessions.active_count(),
+        "pool": render_pool.stats(),
+        "live": live.stats(),
+        "export": live_export.stats() if live_export is not None else None,
+    })
+
+
+@app.route('/crossovers')
+def crossovers_info():
+    """
+    Break-even winds where the best aircraft changes.
+    ?direction=&distance=&pax= → one scenario; any omitted field spans the
+    scenario grid (DIRECTIONS × DISTANCES × PAX_LIST). ?lo=&hi= set the
+    wind range (default 0..300 km/h).
+    """
+    args = request.args
+    try:
+        directions = [args["direction"]] if "direction" in args else list(DIRECTIONS)
+        distances = [float(args["distance"])] if "distance" in args else DISTANCES
+        pax_list = [int(args["pax"])] if "pax" in args else PAX_LIST
+        lo = float(args.get("lo", crossover.WIND_MIN))
+        hi = float(args.get("hi", crossover.WIND_MAX))
+    except ValueError:
+        return jsonify({"status": "error", "message": "invalid number"}), 400
+    if any(d not in DIRECTIONS for d in directions):
+        return jsonify({"status": "error", "message": "invalid direction"}), 400
+    if not (hi > lo) or min(distances) <= 0 or min(pax_list) <= 0:
+        return jsonify({"status": "error", "message": "invalid range"}), 400
+
+    grid = crossover.solve_grid(CATALOG, directions, distances, pax_list, lo, hi)
+    return jsonify({
+        "wind_range": [lo, hi],
+        "scenarios": [
+            {"direction": d, "distance": dist, "pax": pax, "segments": segs,
+             "crossovers": [{"wind_kmh": v, "from": a, "to": b}
+                            for v, a, b in crossover.crossings(segs)]}
+            for (d, dist, pax), segs in grid.items()
+        ],
+    })
+
+
+@app.route('/pareto')
+def pareto_info():
+    """
+    Pareto-optimal models on (fuel, flight time) per scenario point.
+    ?direction=&distance=&pax=&vent= narrow the grid (omitted fields span
+    DIRECTIONS × VENT_STEPS × DISTANCES × PAX_LIST); ?fuel=conso_L_pax|conso_L.
+    """
+    args = request.args
+    try:
+        directions = [args["direction"]] if "direction" in args else list(DIRECTIONS)
+        vents = [float(args["vent"])] if "vent" in args else VENT_STEPS
+        distances = [float(args["distance"])] if "distance" in args else DISTANCES
+        pax_list = [int(args["pax"])] if "pax" in args else PAX_LIST
+    except ValueError:
+        return jsonify({"status": "error", "message": "invalid number"}), 400
+    fuel = args.get("fuel", "conso_L_pax")
+    if any(d not in DIRECTIONS for d in directions):
+        return jsonify({"status": "error", "message": "invalid direction"}), 400
+    if fuel not in pareto.FUEL_METRICS:
+        return jsonify({"status": "error", "message": "invalid fuel metric"}), 400
+    if min(distances) <= 0 or min(pax_list) <= 0:
+        return jsonify({"status": "error", "message": "invalid range"}), 400
+
+    mask = pareto.grid(CATALOG, directions, vents, distances, pax_list, fuel)
+    points = []
+    for i, d in enumerate(directions):
+        for j, v in enumerate(vents):
+            for k, dist in enumerate(distances):
+                for m, pax in enumerate(pax_list):
+                    points.append({
+                        "direction": d, "vent": v, "distance": dist, "pax": pax,
+                        "pareto": pareto.front_names(CATALOG, mask[:, i, j, k, m]),
+                    })
+    return jsonify({"fuel": fuel, "time": pareto.TIME_METRIC, "points": points,
+                    "cache": pareto.cache_stats})
+
 
-    if direction in DIRECTIONS:
-        snapsac_anim.force_direction = direction
-        snapsac_anim._reset_sequence(snapsac_anim.current_seq)
-        return jsonify({"status": "ok", "mode": "forced", "direction": direction})
+def _grid_arg(args, name, default, cast=float):
+    """?name=value or ?name=start:stop:step → list of grid values."""
+    if name not in args:
+        return list(default)
+    text = args[name]
+    if ":" in text:
+        return [cast(v) for v in axis_values(parse_range(text))]
+    return [cast(text)]
 
-    return jsonify({"status": "error", "message": "invalid direction"}), 400
+
+@app.route('/altitude')
+def altitude_info():
+    """
+    Fuel per flight level for one scenario: ?direction=&vent=&distance=&pax=
+    plus ?levels=200:430:10, optional ?mach= and ?isa_dev= (K).
+    """
+    args = request.args
+    direction = args.get("direction", "head")
+    try:
+        vent = float(args.get("vent", 0))
+        distance = float(args.get("distance", DISTANCES[0]))
+        pax = int(args.get("pax", PAX_LIST[0]))
+        levels = _grid_arg(args, "levels", range(200, 431, 10))
+        mach = float(args["mach"]) if "mach" in args else None
+        isa_dev = float(args.get("isa_dev", 0))
+    except ValueError:
+        return jsonify({"status": "error", "message": "invalid number or range"}), 400
+    if direction not in DIRECTIONS:
+        return jsonify({"status": "error", "message": "invalid direction"}), 400
+    if distance <= 0 or pax <= 0 or not 0 <= min(levels) <= max(levels) <= 650:
+        return jsonify({"status": "error", "message": "invalid range"}), 400
+    if mach is not None and not 0.1 <= mach <= 0.99:
+        return jsonify({"status": "error", "message": "mach must be within 0.1..0.99"}), 400
+    metric = args.get("metric", "conso_L_pax")
+    if metric not in ("conso_L", "conso_L_pax", "duree_h"):
+        return jsonify({"status": "error", "message": "invalid metric"}), 400
+
+    lv, vals, best = fuel_model.best_flight_level(
+        CATALOG, direction, vent, pax, distance, levels, mach, isa_dev, metric)
+    return jsonify({
+        "levels": lv.tolist(), "metric": metric, "mach": mach, "isa_dev": isa_dev,
+        "aircraft": [{"name": n,
+                      "best_level": None if np.isnan(b) else int(b),
+                      "values": [None if not np.isfinite(x) else round(float(x), 3) for x in row]}
+                     for n, row, b in zip(CATALOG.names, vals, best)],
+    })
+
+
+@app.route('/export')
+def export_points():
+    """
+    Stream the scenario grid as CSV (default) or Arrow IPC (?format=arrow,
+    needs pyarrow). ?direction= plus ?vent= / ?distance= / ?pax= as a value
+    or a start:stop:step range; omitted fields span the animation grid.
+    """
+    args = request.args
+    fmt = args.get("format", "csv").lower()
+    if fmt not in export.formats():
+        return jsonify({"status": "error", "message": f"format must be one of {export.formats()}"}), 400
+    try:
+        directions = [args["direction"]] if "direction" in args else list(DIRECTIONS)
+        vents = _grid_arg(args, "vent", VENT_STEPS)
+        distances = _grid_arg(args, "distance", DISTANCES)
+        pax_list = _grid_arg(args, "pax", PAX_LIST, cast=lambda v: int(float(v)))
+    except ValueError:
+        return jsonify({"status": "error", "message": "invalid number or range"}), 400
+    if any(d not in DIRECTIONS for d in directions):
+        return jsonify({"status": "error", "message": "invalid direction"}), 400
+    if min(distances) <= 0 or min(pax_list) <= 0:
+        return jsonify({"status": "error", "message": "invalid range"}), 400
+
+    batches = export.grid_batches(CATALOG, directions, vents, distances, pax_list)
+    resp = Response(export.stream(batches, fmt, CATALOG.names), mimetype=export.MIMETYPES[fmt])
+    resp.headers["Content-Disposition"] = (
+        f'attachment; filename="kerosene_points{export.EXTENSIONS[fmt]}"')
+    return resp
+
+
+@app.route('/traffic')
+def traffic_info():
+    """Current traffic snapshot: source (replay/opensky/fixture), time, counts."""
+    return jsonify(traffic.stats())
+
+
+@app.route('/traffic/track')
+def traffic_track():
+    """
+    Positions of one aircraft from the replayed store:
+    ?icao24=hex[&t0=&t1=] (epoch seconds, default the whole store).
+    """
+    if traffic.replay is None:
+        return jsonify({"status": "error", "message": "no snapshot store (set OPENSKY_REPLAY)"}), 404
+    args = request.args
+    icao24 = args.get("icao24", "").strip().lower()
+    try:
+        int(icao24, 16)
+        t0 = int(args["t0"]) if "t0" in args else None
+        t1 = int(args["t1"]) if "t1" in args else None
+    except ValueError:
+        return jsonify({"status": "error", "message": "invalid icao24 or time"}), 400
+    tr = traffic.replay.store.track(icao24, t0, t1)
+    return jsonify({"icao24": icao24, **{k: v.tolist() for k, v in tr.items()}})
+
+
+@app.route('/traffic/burn')
+def traffic_burn():
+    """
+    Fuel burn of the current traffic snapshot by country / region /
+    altitude band. Wind from ?wind=<km/h>&wind_from=<deg>, else the wind
+    field at each aircraft (WIND_FIELD=1), else Open-Meteo at
+    DEFAULT_LAT/DEFAULT_LON when USE_FREE_APIS is on, else calm.
+    """
+    snap = traffic.current()
+    if snap is None:
+        return jsonify({"status": "error", "message": "no traffic snapshot"}), 503
+    args = request.args
+    try:
+        wind = float(args["wind"]) if "wind" in args else None
+        wind_from = float(args.get("wind_from", 0.0))
+        limit = int(args.get("limit", 10))
+    except ValueError:
+        return jsonify({"status": "error", "message": "invalid number"}), 400
+    source = "query"
+    field = wind_field.current_field() if wind is None and WIND_FIELD else None
+    if field is not None:
+        wind, wind_from = field.at(snap["latitude"], snap["longitude"])
+        source = "field"
+    elif wind is None:
+        wind, source = 0.0, "calm"
+        if traffic.fetch is not None and fetch_current_wind is not None:
+            w = fetch_current_wind(float(os.getenv('DEFAULT_LAT', '48.8566')),
+                                   float(os.getenv('DEFAULT_LON', '2.3522')))
+            if w:
+                wind, wind_from, source = w['windspeed_kmh'], w['winddirection'], 'open-meteo'
+    ids, _ = type_index.catalog_ids(snap, CATALOG, default=traffic_fuel.TRAFFIC_AIRCRAFT)
+    out = traffic_fuel.summary(snap, CATALOG, wind, wind_from, ids, limit=limit)
+    if field is not None:
+        wind, wind_from = round(float(np.nanmean(wind)), 1), None    # report the mean speed
+    out.update(source=traffic.source, wind={"kmh": wind, "from": wind_from, "source": source})
+    return jsonify(out)
+
+
+@app.route('/traffic/types')
+def traffic_types():
+    """Catalog family of the current traffic (registry, else callsign prefix)."""
+    snap = traffic.current()
+    if snap is None:
+        return jsonify({"status": "error", "message": "no traffic snapshot"}), 503
+    t0 = time.perf_counter()
+    ids, via = type_index.catalog_ids(snap, CATALOG)
+    ms = (time.perf_counter() - t0) * 1000.0
+    counts = np.bincount(ids[ids >= 0], minlength=len(CATALOG))
+    return jsonify({
+        "time": snap.time,
+        "aircraft": len(snap),
+        "by_type": dict(zip(CATALOG.names, counts.tolist())),
+        "registry": int((via == aircraft_registry.VIA_REGISTRY).sum()),
+        "callsign": int((via == aircraft_registry.VIA_CALLSIGN).sum()),
+        "unknown": int((ids < 0).sum()),
+        "ms": round(ms, 2),
+        "index": type_index.info(),
+    })
+
+
+@app.route('/wind')
+def wind_at():
+    """Wind field at positions: ?lat=a,b,c&lon=x,y,z (fetches / reads the cached grid)."""
+    try:
+        lat = np.array([float(x) for x in request.args["lat"].split(",")])
+        lon = np.array([float(x) for x in request.args["lon"].split(",")])
+    except (KeyError, ValueError):
+        return jsonify({"status": "error", "message": "lat and lon lists required"}), 400
+    if lat.shape != lon.shape:
+        return jsonify({"status": "error", "message": "lat and lon differ in length"}), 400
+    field = wind_field.current_field()
+    if field is None:
+        return jsonify({"status": "error", "message": "wind field unavailable"}), 503
+    speed, direction = field.at(lat, lon)
+    return jsonify({"field": field.info(), "speed_kmh": np.round(speed, 1).tolist(),
+                    "from_deg": np.round(direction, 1).tolist()})
+
+
+@app.route('/route')
+def route_info():
+    """
+    Fuel / time along great-circle routes: ?routes=CDG:JFK,LHR:DXB (or
+    ?from=&to=, airport codes or "lat,lon"), ?pax=, ?segments=. Wind from
+    ?wind=<km/h>&wind_from=<deg>, else the wind field (WIND_FIELD=1), else calm.
+    """
+    args = request.args
+    if "routes" in args:
+        pairs = [tuple(r.split(":", 1)) for r in args["routes"].split(",") if r]
+    else:
+        pairs = [(args.get("from", "CDG"), args.get("to", "JFK"))]
+    try:
+        pax = int(args.get("pax", 180))
+        segments = int(args.get("segments", route_engine.ROUTE_SEGMENTS))
+        wind = (float(args["wind"]), float(args.get("wind_from", 0.0))) if "wind" in args else None
+    except ValueError:
+        return jsonify({"status": "error", "message": "invalid number"}), 400
+    if any(len(p) != 2 for p in pairs) or pax <= 0 or not 1 <= segments <= 4096:
+        return jsonify({"status": "error", "message": "invalid routes, pax or segments"}), 400
+    source = "query" if wind is not None else "calm"
+    if wind is None and WIND_FIELD:
+        wind = wind_field.current_field()
+        source = "field" if wind is not None else "calm"
+    try:
+        results = route_engine.compare(CATALOG, pairs, pax, wind, segments)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    def clean(a):
+        return [None if not np.isfinite(x) else round(float(x), 3) for x in a]
+    return jsonify({
+        "pax": pax, "segments": segments, "wind": source,
+        "routes": [{
+            "from": o, "to": d, "distance_km": round(r["distance_km"], 1),
+            "mean_head_kmh": round(r["mean_head_kmh"], 1),
+            "best": route_engine.best(CATALOG, r),
+            "aircraft": CATALOG.names,
+            **{k: clean(r[k]) for k in ("conso_L", "conso_L_pax", "duree_h")},
+        } for o, d, r in results],
+        "cache": route_engine.cache_stats,
+    })
+
+
+@app.route('/traffic/density.png')
+def traffic_density_png():
+    """Density layer of the current snapshot: ?metric=count|mean_altitude|mean_speed&res=<deg>."""
+    snap = traffic.current()
+    if snap is None:
+        return jsonify({"status": "error", "message": "no traffic snapshot"}), 503
+    metric = request.args.get("metric", "count")
+    try:
+        res = float(request.args.get("res", traffic_density.DENSITY_RES_DEG))
+    except ValueError:
+        return jsonify({"status": "error", "message": "invalid number"}), 400
+    if metric not in traffic_density.METRICS:
+        return jsonify({"status": "error", "message": "invalid metric"}), 400
+    if not 0.05 <= res <= 10:
+        return jsonify({"status": "error", "message": "res must be within 0.05..10 degrees"}), 400
+    import matplotlib.image as mpimg
+    buf = io.BytesIO()
+    mpimg.imsave(buf, traffic_density.layer(snap, metric, res), format="png", origin="lower")
+    return Response(buf.getvalue(), mimetype="image/png")
+
+
+ASSIGN_MAX_MISSIONS = int(os.getenv("ASSIGN_MAX_MISSIONS", "50000"))
+
+
+@app.route('/assign', methods=['POST'])
+def assign_fleet():
+    """
+    Fleet assignment at minimum total fuel. POST {"missions": [{"direction",
+    "vent", "distance", "pax"}, ...], "fleet": {"A320": 10, ...},
+    "rotations": 1, "metric": "conso_L" | "duree_h"}.
+    """
+    data = request.get_json(silent=True) or {}
+    rows = data.get("missions")
+    fleet = data.get("fleet")
+    if not isinstance(rows, list) or not rows or not isinstance(fleet, dict):
+        return jsonify({"status": "error", "message": "missions (list) and fleet (object) required"}), 400
+    if len(rows) > ASSIGN_MAX_MISSIONS:
+        return jsonify({"status": "error",
+                        "message": f"at most {ASSIGN_MAX_MISSIONS} missions"}), 400
+    try:
+        rotations = int(data.get("rotations", 1))
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "invalid rotations"}), 400
+    if rotations < 1:
+        return jsonify({"status": "error", "message": "rotations must be >= 1"}), 400
+    try:
+        mis = fleet_assign.missions(*([r[k] for r in rows]
+                                      for k in ("direction", "vent", "distance", "pax")))
+        result = fleet_assign.assign(CATALOG, mis, {str(k): int(v) for k, v in fleet.items()},
+                                     rotations, str(data.get("metric", "conso_L")))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"status": "error", "message": f"invalid request: {e}"}), 400
+    for k in ("total", "lower_bound", "matrix_ms", "solve_ms"):
+        result[k] = round(result[k], 3)
+    result["greedy"]["total"] = round(result["greedy"]["total"], 3)
+    return jsonify(result)
+
+
+# ====== HLS LIVE OUTPUT ======
+LIVE_RESOLUTION = snap_resolution(os.getenv("LIVE_RESOLUTION", "medium"))
+
+
+def _make_live_source():
+    """Dedicated renderer for the shared encode, at a fixed frame size."""
+    anim = SnapSacAnimation(force_direction=FORCE_DIRECTION_ENV or None,
+                            dpi=RESOLUTIONS[LIVE_RESOLUTION], fps=LIVE_FPS)
+    return lambda: anim.render_rgba(dpi=anim.base_dpi)
+
+
+live = LiveEncoder(_make_live_source)
+
+
+@app.route('/live.m3u8')
+def live_playlist():
+    """
+    HLS playlist of the shared live encode (one ffmpeg for all viewers).
+    Starts the encoder on first request; it stops when nobody watches.
+    """
+    if not ffmpeg_available():
+        return jsonify({"status": "error", "message": "ffmpeg not found"}), 503
+    live.touch()
+    if not live.wait_playlist(timeout=3 * LIVE_SEGMENT_S + 10):
+        resp = jsonify({"status": "starting", "live": live.stats()})
+        resp.headers["Retry-After"] = str(int(LIVE_SEGMENT_S) + 1)
+        return resp, 503
+    resp = Response(live.playlist(prefix="live/"), mimetype=MIMETYPES[".m3u8"])
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
+@app.route('/live/<name>')
+def live_segment(name):
+    live.touch()
+    path = live.segment_path(name)
+    if path is None:
+        return jsonify({"status": "error", "message": "segment expired"}), 404
+    # segments never change once listed
+    return send_file(path, mimetype=MIMETYPES[os.path.splitext(name)[1]],
+                     max_age=60, conditional=True)
+
+
+# ====== QoS ENDPOINT ======
+@app.route('/qos', methods=['GET', 'POST'])
+def qos_info():
+    """
+    GET: current tier, measured frame time, load and recent tier changes.
+    POST { "tier": "auto" | "full" | "high" | "medium" | "low" | "minimal" }
+    """
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        if not qos.pin(str(data.get("tier", "")).strip().lower()):
+            return jsonify({"status": "error", "message": "invalid tier"}), 400
+    return jsonify(qos.to_dict())
 
 
 @app.route('/')
 def index():
-    return '''
+    session = _session()
+    resp = Response(_INDEX_HTML)
+    resp.set_cookie(SESSION_COOKIE, session.sid, samesite="Lax")
+    return resp
+
+
+_INDEX_HTML = '''
     <!DOCTYPE html>
     <html>
     <head>
@@ -992,8 +1764,12 @@ def index():
     '''
 
 
+startup["import_s"] = time.perf_counter() - _T_IMPORT
+
+
 if __name__ == '__main__':
     port = int(os.getenv("PORT", "8080"))
     print("🚀 Starting Kerosene Optimisator Web...")
     print(f"📡 Listening on 0.0.0.0:{port}")
+    start_warmup()
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,131 @@
+"""
+atmosphere.py
+International Standard Atmosphere (ISA) as precomputed tables.
+
+Temperature, pressure, density and speed of sound are tabulated every
+ATMOS_STEP_M metres from sea level to ATMOS_MAX_ALT_M (troposphere lapse
+rate to 11 km, isothermal to 20 km, +1 K/km above) once at import.
+Lookups are linear interpolation on the regular table — one multiply,
+floor and gather per point, no exp / pow — so an altitude sweep
+dimension costs a few array passes, not a Python loop.
+
+An ISA deviation (ISA+15 day) shifts temperature; pressure stays that of
+the pressure altitude and density / speed of sound follow from it.
+
+    python atmosphere.py          # table accuracy + throughput
+"""
+import os
+
+import numpy as np
+
+ATMOS_STEP_M = float(os.getenv("ATMOS_STEP_M", "10"))
+ATMOS_MAX_ALT_M = float(os.getenv("ATMOS_MAX_ALT_M", "20000"))
+
+T0 = 288.15            # K
+P0 = 101325.0          # Pa
+G0 = 9.80665           # m/s²
+R_AIR = 287.05287      # J/(kg·K)
+GAMMA = 1.4
+FT_TO_M = 0.3048
+# (base altitude m, lapse rate K/m)
+LAYERS = ((0.0, -0.0065), (11000.0, 0.0), (20000.0, 0.001), (32000.0, 0.0028))
+FIELDS = ("temperature", "pressure", "density", "speed_of_sound")
+
+
+def isa_exact(alt_m):
+    """Closed-form ISA at geopotential altitude (m): {temperature, pressure, density, speed_of_sound}."""
+    h = np.asarray(alt_m, dtype=np.float64)
+    T = np.full(h.shape, T0)
+    p = np.full(h.shape, P0)
+    t_base, p_base = T0, P0
+    for i, (h0, lapse) in enumerate(LAYERS):
+        h1 = LAYERS[i + 1][0] if i + 1 < len(LAYERS) else np.inf
+        dh = np.clip(h - h0, 0.0, h1 - h0)
+        inside = h >= h0
+        if lapse == 0.0:
+            T = np.where(inside, t_base, T)
+            p = np.where(inside, p_base * np.exp(-G0 * dh / (R_AIR * t_base)), p)
+        else:
+            t = t_base + lapse * dh
+            T = np.where(inside, t, T)
+            p = np.where(inside, p_base * (t / t_base) ** (-G0 / (lapse * R_AIR)), p)
+        if np.isfinite(h1):
+            t_top = t_base + lapse * (h1 - h0)
+            p_base = (p_base * np.exp(-G0 * (h1 - h0) / (R_AIR * t_base)) if lapse == 0.0
+                      else p_base * (t_top / t_base) ** (-G0 / (lapse * R_AIR)))
+            t_base = t_top
+    return {"temperature": T, "pressure": p, "density": p / (R_AIR * T),
+            "speed_of_sound": np.sqrt(GAMMA * R_AIR * T)}
+
+
+ALTITUDES = np.arange(0.0, ATMOS_MAX_ALT_M + ATMOS_STEP_M / 2, ATMOS_STEP_M)
+TABLE = isa_exact(ALTITUDES)
+# rows (value, slope to the next row) for all fields: one gather per lookup
+_ROWS = np.stack([TABLE[f] for f in FIELDS], axis=-1)
+_ROWS = np.concatenate([_ROWS, np.diff(_ROWS, axis=0, append=_ROWS[-1:])], axis=-1)
+
+
+def _index(alt_m):
+    f = np.clip(np.asarray(alt_m, dtype=np.float64) / ATMOS_STEP_M, 0.0, len(ALTITUDES) - 1)
+    i = f.astype(np.intp)
+    return i, f - i
+
+
+def lookup(alt_m, field):
+    """Table value of `field` at altitude(s) (clamped to the table range)."""
+    i, t = _index(alt_m)
+    k = FIELDS.index(field)
+    return _ROWS[i, k] + _ROWS[i, k + len(FIELDS)] * t
+
+
+def at(alt_m, isa_dev=0.0):
+    """ISA (+ isa_dev K) at altitude(s): {temperature, pressure, density, speed_of_sound}."""
+    i, t = _index(alt_m)
+    rows = _ROWS[i]
+    vals = rows[..., :len(FIELDS)] + rows[..., len(FIELDS):] * t[..., None]
+    out = {f: vals[..., k] for k, f in enumerate(FIELDS)}
+    if np.any(np.asarray(isa_dev) != 0):
+        T = out["temperature"] + isa_dev
+        out.update(temperature=T, density=out["pressure"] / (R_AIR * T),
+                   speed_of_sound=np.sqrt(GAMMA * R_AIR * T))
+    return out
+
+
+def flight_level_m(fl):
+    """Flight level (hundreds of feet) → metres."""
+    return np.asarray(fl, dtype=np.float64) * 100.0 * FT_TO_M
+
+
+def density(alt_m, isa_dev=0.0):
+    if np.all(np.asarray(isa_dev) == 0):
+        return lookup(alt_m, "density")
+    return lookup(alt_m, "pressure") / (R_AIR * (lookup(alt_m, "temperature") + isa_dev))
+
+
+def speed_of_sound(alt_m, isa_dev=0.0):
+    if np.all(np.asarray(isa_dev) == 0):
+        return lookup(alt_m, "speed_of_sound")
+    return np.sqrt(GAMMA * R_AIR * (lookup(alt_m, "temperature") + isa_dev))
+
+
+def _bench(n=5_000_000, seed=0):
+    import time
+    h = np.random.default_rng(seed).uniform(0, ATMOS_MAX_ALT_M, n)
+    t0 = time.perf_counter()
+    exact = isa_exact(h)
+    t_exact = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    fast = at(h)
+    t_table = time.perf_counter() - t0
+    errs = ", ".join(f"{f} {np.max(np.abs(fast[f] / exact[f] - 1)):.1e}" for f in FIELDS)
+    print(f"[ISA] table {len(ALTITUDES)} rows every {ATMOS_STEP_M:g} m; max relative error: {errs}")
+    print(f"[ISA] {n:,} altitudes × 4 fields: exact {t_exact * 1000:.0f} ms, "
+          f"table {t_table * 1000:.0f} ms")
+    for fl in (0, 100, 350, 410):
+        a = at(flight_level_m(fl))
+        print(f"  FL{fl:03d}: {a['temperature']:.2f} K  {a['pressure']:.0f} Pa  "
+              f"{a['density']:.4f} kg/m³  a={a['speed_of_sound']:.1f} m/s")
+
+
+if __name__ == "__main__":
+    _bench()
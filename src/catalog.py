@@ -0,0 +1,170 @@
+"""
+catalog.py
+Aircraft catalog loaded from a CSV/JSON data file.
+
+Specs are stored as a struct-of-arrays table (one numpy column per field)
+indexed by integer aircraft ids, so model evaluation and filtering work on
+whole columns instead of per-aircraft dict lookups. `as_dict()` still gives
+the legacy AVIONS mapping for code that iterates by name.
+"""
+import os
+import csv
+import json
+import pathlib
+import numpy as np
+
+FIELDS = ("poids_vide", "conso_base", "max_pax", "sens_vent", "vitesse")
+DTYPES = {
+    "poids_vide": np.float64,
+    "conso_base": np.float64,
+    "max_pax": np.int32,
+    "sens_vent": np.float64,
+    "vitesse": np.float64,
+}
+
+DEFAULT_PATH = pathlib.Path(__file__).resolve().parent / "data" / "aircraft.csv"
+CATALOG_PATH = os.getenv("AIRCRAFT_CATALOG", str(DEFAULT_PATH))
+
+
+class AircraftSpec:
+    """Read-only view of one catalog row (attribute access, no dict)."""
+    __slots__ = ("id", "name") + FIELDS
+
+    def __init__(self, id, name, poids_vide, conso_base, max_pax, sens_vent, vitesse):
+        self.id = id
+        self.name = name
+        self.poids_vide = poids_vide
+        self.conso_base = conso_base
+        self.max_pax = max_pax
+        self.sens_vent = sens_vent
+        self.vitesse = vitesse
+
+    def __repr__(self):
+        return f"AircraftSpec({self.id}, {self.name!r})"
+
+
+class AircraftCatalog:
+    """Struct-of-arrays aircraft table; row i is aircraft id i."""
+
+    def __init__(self, names, **columns):
+        self.names = [str(n) for n in names]
+        for field in FIELDS:
+            if field not in columns:
+                raise ValueError(f"catalog: missing column '{field}'")
+            setattr(self, field, np.asarray(columns[field], dtype=DTYPES[field]))
+        self._validate()
+        self.ids = np.arange(len(self.names), dtype=np.int32)
+        self._index = {n: i for i, n in enumerate(self.names)}
+        self._specs = [
+            AircraftSpec(i, n, *(getattr(self, f)[i].item() for f in FIELDS))
+            for i, n in enumerate(self.names)
+        ]
+
+    # ----- construction -----
+    @classmethod
+    def from_records(cls, rows):
+        rows = list(rows)
+        names = []
+        cols = {f: [] for f in FIELDS}
+        for lineno, row in enumerate(rows, start=1):
+            name = str(row.get("name", "")).strip()
+            if not name:
+                raise ValueError(f"catalog row {lineno}: missing name")
+            names.append(name)
+            for f in FIELDS:
+                try:
+                    cols[f].append(float(row[f]))
+                except (KeyError, TypeError, ValueError):
+                    raise ValueError(
+                        f"catalog row {lineno} ({name}): bad or missing '{f}'")
+        return cls(names, **cols)
+
+    @classmethod
+    def load(cls, path=CATALOG_PATH):
+        """Load a .csv (header row) or .json (list or {"aircraft": [...]})."""
+        path = pathlib.Path(path)
+        with path.open("r", encoding="utf-8", newline="") as f:
+            if path.suffix.lower() == ".json":
+                data = json.load(f)
+                if isinstance(data, dict):
+                    data = data.get("aircraft", [])
+                return cls.from_records(data)
+            return cls.from_records(csv.DictReader(f))
+
+    def _validate(self):
+        n = len(self.names)
+        for f in FIELDS:
+            col = getattr(self, f)
+            if col.shape != (n,):
+                raise ValueError(f"catalog: column '{f}' has shape {col.shape}, expected ({n},)")
+            if not np.all(np.isfinite(col)):
+                raise ValueError(f"catalog: non-finite value in '{f}'")
+        if len(set(self.names)) != n:
+            dup = sorted({x for x in self.names if self.names.count(x) > 1})
+            raise ValueError(f"catalog: duplicate aircraft names {dup}")
+        for f in ("poids_vide", "conso_base", "max_pax", "vitesse"):
+            bad = np.flatnonzero(getattr(self, f) <= 0)
+            if bad.size:
+                raise ValueError(f"catalog: '{f}' must be > 0 for {self.names[bad[0]]}")
+        bad = np.flatnonzero(self.sens_vent < 0)
+        if bad.size:
+            raise ValueError(f"catalog: 'sens_vent' must be >= 0 for {self.names[bad[0]]}")
+
+    # ----- access -----
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def id_of(self, name):
+        return self._index[name]
+
+    def spec(self, key):
+        """Row by name or integer id."""
+        return self._specs[key if isinstance(key, (int, np.integer)) else self._index[key]]
+
+    def capable(self, pax):
+        """Ids of aircraft with max_pax >= pax."""
+        return np.flatnonzero(self.max_pax >= pax).astype(np.int32)
+
+    def capable_mask(self, pax):
+        """Boolean (n_aircraft, *shape(pax)) mask, vectorized over pax."""
+        pax = np.asarray(pax)
+        return self.max_pax.reshape((-1,) + (1,) * pax.ndim) >= pax
+
+    def select(self, ids):
+        """Sub-catalog with the given ids (renumbered from 0)."""
+        ids = np.asarray(ids, dtype=np.int64)
+        return AircraftCatalog([self.names[i] for i in ids],
+                               **{f: getattr(self, f)[ids] for f in FIELDS})
+
+    def as_dict(self):
+        """Legacy AVIONS mapping: {name: {field: value}}."""
+        return {s.name: {f: getattr(s, f) for f in FIELDS} for s in self._specs}
+
+    def fingerprint(self):
+        """Stable bytes of the whole table (for hashing / cache keys)."""
+        parts = ["\x1f".join(self.names).encode("utf-8")]
+        parts += [np.ascontiguousarray(getattr(self, f)).tobytes() for f in FIELDS]
+        return b"\x1e".join(parts)
+
+
+_DEFAULT = None
+
+
+def load_catalog(path=None):
+    """Catalog from `path`, or the shared default (AIRCRAFT_CATALOG env)."""
+    global _DEFAULT
+    if path is not None:
+        return AircraftCatalog.load(path)
+    if _DEFAULT is None:
+        _DEFAULT = AircraftCatalog.load(CATALOG_PATH)
+    return _DEFAULT
+
+
+if __name__ == "__main__":
+    cat = load_catalog()
+    print(f"catalog: {len(cat)} aircraft from {CATALOG_PATH}")
+    for s in cat._specs:
+        print(f"  [{s.id}] {s.name:6s} max_pax={s.max_pax:4d} vitesse={s.vitesse:.0f}")
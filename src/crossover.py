@@ -0,0 +1,189 @@
+"""
+crossover.py
+Exact break-even winds between aircraft.
+
+For one (direction, distance, pax), fuel per pax is linear in wind:
+
+    conso_L_pax(v) = a + b·v
+    a = (conso_base + masse / 1000 · 0.1) · distance / pax
+    b = WIND_COEF[direction] · sens_vent · distance / pax
+
+(the speed clip only affects flight time). The "best aircraft" as a
+function of wind is therefore the lower envelope of n lines. We walk it
+from the low end of the wind range: from the current winner, the next
+winner is the line with a smaller slope that crosses it first. At most
+n-1 breakpoints and O(n) work each give O(n²) per scenario, with no wind
+grid. The walk is vectorized over any number of scenarios at once.
+"""
+import numpy as np
+
+import fuel_model
+
+WIND_MIN = 0.0
+WIND_MAX = 300.0
+_EPS = 1e-9
+
+
+def line_coefficients(catalog, direction, distance, pax):
+    """(a, b) arrays shaped (n_aircraft, *broadcast); NaN = cannot carry pax."""
+    e0 = fuel_model.evaluate(catalog, direction, 0.0, pax, distance)["conso_L_pax"]
+    e1 = fuel_model.evaluate(catalog, direction, 1.0, pax, distance)["conso_L_pax"]
+    return e0, e1 - e0
+
+
+def lower_envelope(a, b, lo=WIND_MIN, hi=WIND_MAX):
+    """
+    Lower envelope of the lines a + b·v on [lo, hi], for every scenario
+    (trailing dims of a and b). Returns (models, breaks):
+    models (n, *S) int, winner of each segment, -1 after the last one;
+    breaks (n-1, *S) float, wind where segment k ends (NaN = none).
+    """
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    n = a.shape[0]
+    shape = a.shape[1:]
+    a = a.reshape(n, -1)
+    b = b.reshape(n, -1)
+    S = a.shape[1]
+    valid = np.isfinite(a) & np.isfinite(b)
+    a = np.where(valid, a, np.inf)
+    b = np.where(valid, b, 0.0)
+    cols = np.arange(S)
+
+    models = np.full((n, S), -1, dtype=np.int64)
+    breaks = np.full((max(n - 1, 0), S), np.nan)
+
+    # winner at `lo`: lowest value, ties → lowest slope (stays below after lo)
+    val = a + b * lo
+    vmin = val.min(axis=0)
+    tie = valid & (val <= vmin + _EPS * np.maximum(np.abs(vmin), 1.0))
+    cur = np.argmin(np.where(tie, b, np.inf), axis=0)
+    active = valid.any(axis=0)
+    models[0] = np.where(active, cur, -1)
+    v = np.full(S, float(lo))
+
+    for k in range(n - 1):
+        if not active.any():
+            break
+        ac, bc = a[cur, cols], b[cur, cols]
+        steeper = valid & (b < bc - _EPS)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cross = np.where(steeper, (a - ac) / (bc - b), np.inf)
+        cross = np.where(cross > v + _EPS, cross, np.inf)
+        first = cross.min(axis=0)
+        # ties at the same crossing → lowest slope wins afterwards
+        at_first = np.isfinite(cross) & (cross <= first + _EPS * np.maximum(np.abs(first), 1.0))
+        nxt = np.argmin(np.where(at_first, b, np.inf), axis=0)
+        step = active & (first < hi)
+        breaks[k] = np.where(step, first, np.nan)
+        models[k + 1] = np.where(step, nxt, -1)
+        cur = np.where(step, nxt, cur)
+        v = np.where(step, first, v)
+        active = step
+
+    return models.reshape((n,) + shape), breaks.reshape((max(n - 1, 0),) + shape)
+
+
+def solve(catalog, direction, distance, pax, lo=WIND_MIN, hi=WIND_MAX):
+    """
+    Winner segments for one scenario:
+    [{"model", "from_kmh", "to_kmh"}, ...] covering [lo, hi] (empty if
+    no aircraft can carry `pax`).
+    """
+    a, b = line_coefficients(catalog, direction, distance, pax)
+    models, breaks = lower_envelope(a, b, lo, hi)
+    return segments(catalog.names, models, breaks, lo, hi)
+
+
+def segments(names, models, breaks, lo=WIND_MIN, hi=WIND_MAX):
+    """Segment list for one scenario column of lower_envelope()."""
+    out = []
+    start = float(lo)
+    for k, m in enumerate(models):
+        if m < 0:
+            break
+        end = breaks[k] if k < len(breaks) and np.isfinite(breaks[k]) else float(hi)
+        out.append({"model": names[int(m)], "from_kmh": round(start, 3),
+                    "to_kmh": round(float(end), 3)})
+        start = float(end)
+    return out
+
+
+def crossings(segs):
+    """[(wind, from_model, to_model)] between consecutive segments."""
+    return [(s["to_kmh"], s["model"], t["model"]) for s, t in zip(segs, segs[1:])]
+
+
+def solve_grid(catalog, directions=fuel_model.DIRECTIONS, distances=(800, 1200, 1600, 2000),
+               pax_list=(140, 160, 180, 200, 220, 240), lo=WIND_MIN, hi=WIND_MAX):
+    """
+    Whole scenario grid in one vectorized pass:
+    {(direction, distance, pax): segments}.
+    """
+    codes = np.array([fuel_model.direction_code(d) for d in directions])
+    D, K, P = np.meshgrid(codes, np.asarray(distances, float),
+                          np.asarray(pax_list, float), indexing="ij")
+    a, b = line_coefficients(catalog, D, K, P)
+    models, breaks = lower_envelope(a, b, lo, hi)
+    out = {}
+    for i, d in enumerate(directions):
+        for j, dist in enumerate(distances):
+            for k, pax in enumerate(pax_list):
+                out[(d, dist, pax)] = segments(
+                    catalog.names, models[:, i, j, k], breaks[:, i, j, k], lo, hi)
+    return out
+
+
+def best_at(segs, vent):
+    """Winner at `vent` from a segment list (None if empty)."""
+    for s in segs:
+        if vent <= s["to_kmh"]:
+            return s["model"]
+    return segs[-1]["model"] if segs else None
+
+
+def annotate(ax, segs, colors=None, color="#AAB1C6", fontsize=8, zorder=2):
+    """
+    Dotted vertical line + "A → B" label at each break-even wind on `ax`;
+    returns the created artists (remove them on the next sequence).
+    """
+    artists = []
+    for v, src, dst in crossings(segs):
+        c = (colors or {}).get(dst, color)
+        artists.append(ax.axvline(v, color=c, lw=1.0, ls=":", alpha=0.9, zorder=zorder))
+        artists.append(ax.text(
+            v, 0.03, f" {src}→{dst}\n {v:.0f} km/h", transform=ax.get_xaxis_transform(),
+            ha="left", va="bottom", fontsize=fontsize, color=c, zorder=zorder))
+    return artists
+
+
+def _bench(grid_step=5):
+    """Solver vs brute-force sweep on the scenario grid (agreement + timing)."""
+    import time
+    from catalog import load_catalog
+    cat = load_catalog()
+    t0 = time.perf_counter()
+    grid = solve_grid(cat)
+    t_solve = time.perf_counter() - t0
+
+    vents = np.arange(0, 301, grid_step, dtype=float)
+    t0 = time.perf_counter()
+    mismatches = 0
+    for (d, dist, pax), segs in grid.items():
+        cpx = fuel_model.evaluate(cat, d, vents, pax, dist)["conso_L_pax"]
+        if not np.isfinite(cpx).any():
+            continue
+        brute = np.nanargmin(np.where(np.isfinite(cpx), cpx, np.inf), axis=0)
+        for v, i in zip(vents, brute):
+            # grid points sitting exactly on a break-even are ties
+            if best_at(segs, v) != cat.names[i] and not any(
+                    abs(v - s["to_kmh"]) < 1e-6 for s in segs):
+                mismatches += 1
+    t_brute = time.perf_counter() - t0
+    n_cross = sum(len(s) - 1 for s in grid.values() if s)
+    print(f"[XOVER] {len(grid)} scenarios, {n_cross} crossovers: solver {t_solve * 1000:.2f} ms, "
+          f"brute force ({len(vents)} steps) {t_brute * 1000:.1f} ms, mismatches {mismatches}")
+
+
+if __name__ == "__main__":
+    _bench()
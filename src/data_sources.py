@@ -69,6 +69,23 @@ def fetch_current_wind(lat=48.8566, lon=2.3522, cache_max_age=300):
 
 
 # --- OpenSky Network (public endpoint) ---
+# OPENSKY_STORE=dir: every fresh /states/all answer is also appended to a
+# snapshot store (opensky_store.py) instead of only overwriting the cache
+OPENSKY_STORE = os.getenv('OPENSKY_STORE', '')
+_store = None
+
+
+def _record_snapshot(data):
+    global _store
+    try:
+        if _store is None:
+            from opensky_store import SnapshotStore
+            _store = SnapshotStore(OPENSKY_STORE)
+        _store.append(data)
+    except Exception as e:
+        print(f"OpenSky store error: {e}")
+
+
 def fetch_opensky_states(bbox=None, cache_max_age=10):
     """Fetch states from OpenSky. bbox is [minLat, maxLat, minLon, maxLon] or None.
     Returns JSON dict or None.
@@ -89,6 +106,8 @@ def fetch_opensky_states(bbox=None, cache_max_age=10):
         if r.status_code == 200:
             data = r.json()
             _cache_set(cache_name, data)
+            if OPENSKY_STORE and not bbox:
+                _record_snapshot(data)
             return data
     except Exception:
         pass
@@ -0,0 +1,329 @@
+"""
+export.py
+Streaming CSV / Arrow IPC export of simulated points.
+
+A point is one aircraft at one (direction, wind, distance, pax):
+
+    direction, vent, distance, pax, aircraft,
+    conso_L, conso_L_pax, duree_h, vitesse, best
+
+Points travel as column batches (dict of numpy arrays; direction and
+aircraft as integer codes) and are encoded batch by batch, so memory is
+bounded by one batch whatever the export size:
+
+- grid_batches() evaluates a scenario grid lazily, EXPORT_BATCH_ROWS rows
+  at a time (one fuel_model.evaluate call per batch);
+- CSVEncoder / ArrowEncoder turn a batch into bytes (Arrow needs the
+  optional `pyarrow` package; strings are dictionary-encoded);
+- ExportWriter encodes and writes on a background thread behind a
+  bounded queue. Live producers (app_web frames, the GUI) submit with
+  block=False: when the disk can't keep up, batches are dropped and
+  counted instead of stalling the animation.
+
+    python export.py grid.csv                    # full scenario grid
+    python export.py grid.arrow --distance 100:15000:10 --pax 1:850:1
+"""
+import io
+import os
+import time
+import queue
+import threading
+
+import numpy as np
+
+import fuel_model
+
+try:
+    import pyarrow as pa
+except ImportError:          # optional: CSV only
+    pa = None
+
+EXPORT_FORMAT = os.getenv("EXPORT_FORMAT", "csv").strip().lower()
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "262144"))
+EXPORT_QUEUE = int(os.getenv("EXPORT_QUEUE", "32"))       # batches in flight
+
+COLUMNS = ("direction", "vent", "distance", "pax", "aircraft",
+           "conso_L", "conso_L_pax", "duree_h", "vitesse", "best")
+METRICS = ("conso_L", "conso_L_pax", "duree_h", "vitesse")
+CSV_ROW = "%s,%g,%g,%d,%s,%.2f,%.4f,%.4f,%.1f,%d"
+MIMETYPES = {"csv": "text/csv", "arrow": "application/vnd.apache.arrow.stream"}
+EXTENSIONS = {"csv": ".csv", "arrow": ".arrow"}
+
+
+def arrow_available():
+    return pa is not None
+
+
+def formats():
+    return ("csv", "arrow") if arrow_available() else ("csv",)
+
+
+def format_for(path, default=EXPORT_FORMAT):
+    """Format from a file extension (.csv / .arrow / .arrows), else `default`."""
+    ext = os.path.splitext(path)[1].lower()
+    return {".csv": "csv", ".arrow": "arrow", ".arrows": "arrow"}.get(ext, default)
+
+
+# ====== Batches ======
+
+
+def rows_from_states(code, vent, distance, pax, states):
+    """
+    Column batch from states shaped (n_aircraft, m) at m scenario points
+    (code/vent/distance/pax broadcast to (m,)). Aircraft that cannot
+    carry pax are dropped; `best` flags the lowest L/pax per point.
+    """
+    cpx = np.asarray(states["conso_L_pax"])
+    n, m = cpx.shape
+    finite = np.isfinite(cpx)
+    best = np.zeros((n, m), dtype=np.int8)
+    has = finite.any(axis=0)
+    best[np.argmin(np.where(finite, cpx, np.inf), axis=0)[has], np.flatnonzero(has)] = 1
+
+    # scenario-major rows: (m, n) then flattened
+    keep = finite.T.ravel()
+    scen = np.broadcast_to(np.arange(m)[:, None], (m, n)).ravel()[keep]
+    out = {
+        "direction": np.broadcast_to(code, (m,)).astype(np.int8)[scen],
+        "vent": np.broadcast_to(vent, (m,)).astype(np.float64)[scen],
+        "distance": np.broadcast_to(distance, (m,)).astype(np.float64)[scen],
+        "pax": np.broadcast_to(pax, (m,)).astype(np.int32)[scen],
+        "aircraft": np.broadcast_to(np.arange(n, dtype=np.int32), (m, n)).ravel()[keep],
+        "best": best.T.ravel()[keep],
+    }
+    for k in METRICS:
+        out[k] = np.asarray(states[k]).T.ravel()[keep]
+    return out
+
+
+def grid_batches(catalog, directions=fuel_model.DIRECTIONS, vents=range(0, 301, 20),
+                 distances=(800, 1200, 1600, 2000), pax_list=(140, 160, 180, 200, 220, 240),
+                 batch_rows=EXPORT_BATCH_ROWS):
+    """Lazily evaluate the grid direction × vent × distance × pax in batches."""
+    axes = (np.array([fuel_model.direction_code(d) for d in directions]),
+            np.asarray(vents, dtype=np.float64), np.asarray(distances, dtype=np.float64),
+            np.asarray(pax_list, dtype=np.float64))
+    shape = tuple(len(a) for a in axes)
+    total = int(np.prod(shape))
+    step = max(1, batch_rows // max(len(catalog), 1))
+    for start in range(0, total, step):
+        idx = np.unravel_index(np.arange(start, min(start + step, total)), shape)
+        code, vent, dist, pax = (a[i] for a, i in zip(axes, idx))
+        e = fuel_model.evaluate(catalog, code, vent, pax, dist)
+        yield rows_from_states(code, vent, dist, pax, e)
+
+
+def batch_len(batch):
+    return len(batch["aircraft"])
+
+
+# ====== Encoders ======
+
+
+class CSVEncoder:
+    def __init__(self, names, directions=fuel_model.DIRECTIONS):
+        self.names = np.array(names, dtype=object)
+        self.directions = np.array(directions, dtype=object)
+
+    def header(self):
+        return (",".join(COLUMNS) + "\n").encode()
+
+    def encode(self, batch):
+        if not batch_len(batch):
+            return b""
+        cols = [self.directions[batch["direction"]].tolist()]
+        cols += [batch[c].tolist() for c in ("vent", "distance", "pax")]
+        cols.append(self.names[batch["aircraft"]].tolist())
+        cols += [batch[c].tolist() for c in METRICS + ("best",)]
+        return ("\n".join(map(CSV_ROW.__mod__, zip(*cols))) + "\n").encode()
+
+    def close(self):
+        return b""
+
+
+class _Chunks(io.RawIOBase):
+    """Write-only sink collecting bytes until drained."""
+
+    def __init__(self):
+        self.parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.parts.append(bytes(b))
+        return len(b)
+
+    def drain(self):
+        out, self.parts = b"".join(self.parts), []
+        return out
+
+
+class ArrowEncoder:
+    """Arrow IPC stream: schema once, one record batch per batch, EOS."""
+
+    def __init__(self, names, directions=fuel_model.DIRECTIONS):
+        if pa is None:
+            raise RuntimeError("Arrow export needs pyarrow (pip install pyarrow)")
+        self.names = pa.array(list(names), pa.string())
+        self.directions = pa.array(list(directions), pa.string())
+        dict_t = pa.dictionary(pa.int32(), pa.string())
+        self.schema = pa.schema([
+            ("direction", dict_t), ("vent", pa.float64()), ("distance", pa.float64()),
+            ("pax", pa.int32()), ("aircraft", dict_t),
+            *[(k, pa.float64()) for k in METRICS], ("best", pa.bool_()),
+        ])
+        self._sink = _Chunks()
+        self._writer = pa.ipc.new_stream(self._sink, self.schema)
+
+    def header(self):
+        return self._sink.drain()
+
+    def encode(self, batch):
+        cols = [
+            pa.DictionaryArray.from_arrays(batch["direction"].astype(np.int32), self.directions),
+            pa.array(batch["vent"]), pa.array(batch["distance"]),
+            pa.array(batch["pax"], pa.int32()),
+            pa.DictionaryArray.from_arrays(batch["aircraft"].astype(np.int32), self.names),
+            *[pa.array(batch[k]) for k in METRICS],
+            pa.array(batch["best"].astype(bool)),
+        ]
+        self._writer.write_batch(pa.record_batch(cols, schema=self.schema))
+        return self._sink.drain()
+
+    def close(self):
+        self._writer.close()
+        return self._sink.drain()
+
+
+def make_encoder(fmt, names):
+    if fmt == "csv":
+        return CSVEncoder(names)
+    if fmt == "arrow":
+        return ArrowEncoder(names)
+    raise ValueError(f"unknown export format: {fmt!r}")
+
+
+def stream(batches, fmt, names):
+    """Bytes generator (HTTP bodies): header, one chunk per batch, trailer."""
+    enc = make_encoder(fmt, names)
+    yield enc.header()
+    for batch in batches:
+        chunk = enc.encode(batch)
+        if chunk:
+            yield chunk
+    yield enc.close()
+
+
+# ====== Background writer ======
+
+
+class ExportWriter:
+    """
+    Encode + write batches to `path` on a background thread. submit()
+    never touches the disk; with block=False it drops the batch when
+    EXPORT_QUEUE batches are already waiting.
+    """
+
+    def __init__(self, path, names, fmt=None, queue_size=EXPORT_QUEUE):
+        self.path = path
+        self.fmt = fmt or format_for(path)
+        self._enc = make_encoder(self.fmt, names)
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self.rows = 0
+        self.bytes = 0
+        self.dropped = 0
+        self.error = None
+        self.started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="export-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, batch, block=True):
+        if self._thread is None or not self._thread.is_alive():
+            return False
+        try:
+            self._queue.put(batch, block=block)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _run(self):
+        try:
+            with open(self.path, "wb") as f:
+                f.write(self._enc.header())
+                while True:
+                    batch = self._queue.get()
+                    if batch is None:
+                        break
+                    chunk = self._enc.encode(batch)
+                    f.write(chunk)
+                    self.rows += batch_len(batch)
+                    self.bytes += len(chunk)
+                f.write(self._enc.close())
+        except (OSError, ValueError) as e:
+            self.error = str(e)
+            print(f"Export writer error: {e}")
+
+    def close(self, timeout=None):
+        """Flush everything queued, write the trailer and join."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+        return self.stats()
+
+    def stats(self):
+        elapsed = time.monotonic() - self.started
+        return {
+            "path": self.path,
+            "format": self.fmt,
+            "rows": self.rows,
+            "mb": round(self.bytes / 1e6, 2),
+            "dropped_batches": self.dropped,
+            "pending": self._queue.qsize(),
+            "rows_per_s": round(self.rows / elapsed) if elapsed > 0 else None,
+            "error": self.error,
+        }
+
+
+# ====== CLI ======
+
+
+def main(argv=None):
+    import argparse
+    from catalog import load_catalog
+    from sweep_store import axis_values, parse_range
+    ap = argparse.ArgumentParser(description="Export the scenario grid to CSV / Arrow IPC")
+    ap.add_argument("out", help="output file (.csv or .arrow)")
+    ap.add_argument("--format", choices=("csv", "arrow"), default=None)
+    ap.add_argument("--direction", action="append", choices=fuel_model.DIRECTIONS)
+    ap.add_argument("--vent", type=parse_range, default=(0, 300, 20))
+    ap.add_argument("--distance", type=parse_range, default=None,
+                    help="start:stop:step (default: the animation's 4 distances)")
+    ap.add_argument("--pax", type=parse_range, default=None,
+                    help="start:stop:step (default: the animation's 6 pax counts)")
+    ap.add_argument("--batch-rows", type=int, default=EXPORT_BATCH_ROWS)
+    args = ap.parse_args(argv)
+
+    cat = load_catalog()
+    try:
+        writer = ExportWriter(args.out, cat.names, fmt=args.format)
+    except RuntimeError as e:
+        raise SystemExit(str(e))
+    batches = grid_batches(
+        cat, args.direction or fuel_model.DIRECTIONS, axis_values(args.vent),
+        axis_values(args.distance) if args.distance else (800, 1200, 1600, 2000),
+        axis_values(args.pax) if args.pax else (140, 160, 180, 200, 220, 240),
+        batch_rows=args.batch_rows)
+    t0 = time.perf_counter()
+    for batch in batches:
+        writer.submit(batch)          # blocks when the writer falls behind
+    stats = writer.close()
+    sec = time.perf_counter() - t0
+    print(f"[EXPORT] {stats['rows']:,} rows, {stats['mb']} MB {stats['format']} in {sec:.2f}s "
+          f"→ {stats['rows'] / sec:,.0f} rows/s ({args.out})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+fleet_plot.py
+Batched matplotlib artists for plotting many aircraft on one axes.
+
+Instead of one Line2D + one scatter + one Text per aircraft, all curves of
+an axes live in a single LineCollection, all current-point markers in one
+PathCollection, and only the top-K aircraft get a text label. Updates are
+plain array assignments, so draw cost stays roughly flat with fleet size.
+
+Matplotlib is imported inside the functions so importing this module stays
+cheap for app_web's lazy startup.
+
+Run `python fleet_plot.py` for a frame-time benchmark (4 → 200 aircraft).
+"""
+import os
+import time
+import numpy as np
+
+# "lines" = one artist per aircraft (legacy), "collection" = batched,
+# "auto" = batched once the fleet exceeds COLLECTION_THRESHOLD aircraft
+PLOT_MODE = os.getenv("PLOT_MODE", "auto").strip().lower()
+COLLECTION_THRESHOLD = int(os.getenv("COLLECTION_THRESHOLD", "8"))
+TOP_K_LABELS = int(os.getenv("TOP_K_LABELS", "5"))
+
+
+def use_collections(n_aircraft):
+    if PLOT_MODE == "collection":
+        return True
+    if PLOT_MODE == "lines":
+        return False
+    return n_aircraft > COLLECTION_THRESHOLD
+
+
+def fleet_colors(names, palette=None, cmap="turbo"):
+    """RGBA (n, 4): palette color when known, else evenly spread on `cmap`."""
+    from matplotlib import colormaps
+    from matplotlib.colors import to_rgba_array
+    palette = palette or {}
+    n = len(names)
+    spread = colormaps[cmap](np.linspace(0.05, 0.95, max(n, 1)))
+    out = spread[:n].copy()
+    for i, name in enumerate(names):
+        if name in palette:
+            out[i] = to_rgba_array(palette[name])[0]
+    return out
+
+
+class FleetArtists:
+    """One LineCollection + one PathCollection + K labels for one axes."""
+
+    def __init__(self, ax, names, colors, lw=2.4, best_lw=3.8, alpha=0.70,
+                 marker_size=60, best_marker_size=200, top_k=TOP_K_LABELS,
+                 label_kw=None, zorder=3):
+        from matplotlib.collections import LineCollection
+        self.ax = ax
+        self.names = list(names)
+        self.colors = np.asarray(colors, dtype=float)
+        self.lw, self.best_lw = lw, best_lw
+        self.alpha = alpha
+        self.marker_size, self.best_marker_size = marker_size, best_marker_size
+        n = len(self.names)
+
+        self.lines = LineCollection(
+            [], colors=self.colors, linewidths=lw, zorder=zorder,
+            capstyle="round", joinstyle="round")
+        ax.add_collection(self.lines)
+        self.markers = ax.scatter(
+            np.full(n, np.nan), np.full(n, np.nan), s=marker_size,
+            c=self.colors, zorder=zorder + 3, edgecolors="white",
+            linewidths=0.8)
+        kw = {"fontsize": 9, "ha": "left", "va": "center"}
+        kw.update(label_kw or {})
+        self.labels = [ax.text(0, 0, "", visible=False, zorder=zorder + 4, **kw)
+                       for _ in range(min(top_k, n))]
+
+    def artists(self):
+        """Every artist this object updates (for blitting)."""
+        return [self.lines, self.markers, *self.labels]
+
+    def clear(self):
+        n = len(self.names)
+        self.lines.set_segments([])
+        self.markers.set_offsets(np.full((n, 2), np.nan))
+        for lab in self.labels:
+            lab.set_visible(False)
+
+    def update(self, x, Y, best=None, points=None, rank=None, label_dx=4.0,
+               best_color=None):
+        """
+        x: (m,) wind values; Y: (n, m) metric per aircraft (NaN = absent).
+        best: index of the highlighted aircraft. points: (n, 2) marker
+        positions (default: last column). rank: aircraft indices, best first,
+        used to pick which K aircraft get a label.
+        """
+        x = np.asarray(x, dtype=float)
+        Y = np.asarray(Y, dtype=float).reshape(len(self.names), -1)
+        if Y.shape[1] >= 2:
+            segs = np.empty(Y.shape + (2,))
+            segs[..., 0] = x
+            segs[..., 1] = Y
+            self.lines.set_segments(segs)
+        else:
+            self.lines.set_segments([])
+
+        if points is None:
+            points = np.column_stack(
+                [np.full(len(Y), x[-1] if x.size else np.nan),
+                 Y[:, -1] if Y.shape[1] else np.full(len(Y), np.nan)])
+        self.markers.set_offsets(points)
+
+        rgba = self.colors.copy()
+        rgba[:, 3] = self.alpha
+        widths = np.full(len(Y), self.lw)
+        sizes = np.full(len(Y), float(self.marker_size))
+        if best is not None:
+            rgba[best, 3] = 1.0
+            widths[best] = self.best_lw
+            sizes[best] = self.best_marker_size
+        self.lines.set_color(rgba)
+        self.lines.set_linewidths(widths)
+        self.markers.set_sizes(sizes)
+
+        if rank is None:
+            rank = [best] if best is not None else []
+        shown = [i for i in rank if np.isfinite(points[i]).all()][:len(self.labels)]
+        for lab, i in zip(self.labels, shown):
+            lab.set_position((points[i, 0] + label_dx, points[i, 1]))
+            lab.set_text(self.names[i])
+            lab.set_color(best_color if (i == best and best_color) else self.colors[i])
+            lab.set_fontweight("bold" if i == best else "normal")
+            lab.set_visible(True)
+        for lab in self.labels[len(shown):]:
+            lab.set_visible(False)
+
+
+def rank_by(values):
+    """Indices of finite values, ascending (NaN last and dropped)."""
+    values = np.asarray(values, dtype=float)
+    order = np.argsort(values, kind="stable")
+    return order[np.isfinite(values[order])]
+
+
+# ====== Benchmark ======
+
+
+def _bench_catalog(n, seed=0):
+    from catalog import AircraftCatalog, load_catalog, FIELDS
+    base = load_catalog()
+    rng = np.random.default_rng(seed)
+    pick = rng.integers(0, len(base), n)
+    cols = {f: getattr(base, f)[pick] * (1.0 if f == "max_pax" else rng.uniform(0.9, 1.1, n))
+            for f in FIELDS}
+    cols["max_pax"] = np.maximum(cols["max_pax"], 250)
+    return AircraftCatalog([f"{base.names[p]}-{i}" for i, p in enumerate(pick)], **cols)
+
+
+def benchmark(sizes=(4, 20, 50, 100, 200), frames=30, mode="collection"):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import fuel_model
+
+    vents = np.arange(0, 301, 10)
+    results = {}
+    for n in sizes:
+        cat = _bench_catalog(n)
+        fig = Figure(figsize=(12, 4), dpi=100)
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        ax.set_xlim(0, 300)
+        full = fuel_model.evaluate(cat, "head", vents, 200, 1200)["conso_L_pax"]
+        ax.set_ylim(0, np.nanmax(full) * 1.2)
+        colors = fleet_colors(cat.names)
+        if mode == "collection":
+            fleet = FleetArtists(ax, cat.names, colors)
+        else:
+            lines = [ax.plot([], [], lw=2.4, color=c)[0] for c in colors]
+            marks = [ax.scatter([], [], s=60, color=c) for c in colors]
+            labs = [ax.text(0, 0, name, fontsize=9) for name in cat.names]
+        t0 = time.perf_counter()
+        for f in range(frames):
+            m = 2 + f % (len(vents) - 2)
+            Y = full[:, :m]
+            best = int(np.nanargmin(Y[:, -1]))
+            if mode == "collection":
+                fleet.update(vents[:m], Y, best=best, rank=rank_by(Y[:, -1]))
+            else:
+                for i in range(n):
+                    lines[i].set_data(vents[:m], Y[i])
+                    marks[i].set_offsets([[vents[m - 1], Y[i, -1]]])
+                    labs[i].set_position((vents[m - 1] + 4, Y[i, -1]))
+                    lines[i].set_linewidth(3.8 if i == best else 2.4)
+            canvas.draw()
+        results[n] = (time.perf_counter() - t0) / frames * 1000.0
+    return results
+
+
+if __name__ == "__main__":
+    for mode in ("lines", "collection"):
+        res = benchmark(mode=mode)
+        print(f"[BENCH] {mode:10s} " +
+              "  ".join(f"n={n}: {ms:6.1f} ms/frame" for n, ms in res.items()))
@@ -0,0 +1,172 @@
+"""
+fuel_model.py
+Vectorized version of the Snapsac fuel model (`calcule_etat`).
+
+Evaluates every aircraft of a catalog at once over broadcastable arrays of
+wind, pax and distance. Results have shape (n_aircraft, *broadcast_shape);
+aircraft that cannot carry `pax` get NaN.
+
+Optional flight_level / mach / isa_dev inputs fly the aircraft off its
+catalog cruise point, which is taken as `vitesse` at FL_REF in ISA: Mach
+sets the true airspeed from the local speed of sound, and the
+aerodynamic part of the consumption scales with the drag ratio
+0.5·(r + 1/r), r = dynamic pressure relative to the cruise point (too low
+and dense: parasitic drag grows; too high and thin: induced drag grows).
+Left at None they change nothing.
+"""
+import numpy as np
+
+import atmosphere
+
+POIDS_PASSAGER = 80
+POIDS_BAGAGE = 23
+
+DIRECTIONS = ("head", "tail", "side")
+DIR_CODES = {d: i for i, d in enumerate(DIRECTIONS)}
+
+# Per direction: fuel coefficient per km/h of wind, sign applied to speed
+WIND_COEF = np.array([0.005, -0.003, 0.001])
+SPEED_SIGN = np.array([-1.0, 1.0, 0.0])
+
+VITESSE_MIN = 600.0
+VITESSE_MAX = 1000.0
+
+FL_REF = 350            # catalog cruise point
+KMH_PER_MS = 3.6
+_RHO_REF = float(atmosphere.density(atmosphere.flight_level_m(FL_REF)))
+
+
+def direction_code(direction):
+    """'head'/'tail'/'side' (or an int array of codes) → int code(s)."""
+    if isinstance(direction, str):
+        return DIR_CODES[direction]
+    return np.asarray(direction, dtype=np.int8)
+
+
+def cruise(vitesse0, flight_level=None, mach=None, isa_dev=0.0):
+    """
+    True airspeed (km/h) and drag factor when an aircraft cruising at
+    `vitesse0` (FL_REF, ISA) flies `flight_level` at `mach` (either may be
+    None: FL_REF / the catalog airspeed) on an ISA + `isa_dev` day.
+    """
+    fl = FL_REF if flight_level is None else flight_level
+    atm = atmosphere.at(atmosphere.flight_level_m(fl), isa_dev)
+    tas = vitesse0 if mach is None else np.asarray(mach) * atm["speed_of_sound"] * KMH_PER_MS
+    r = atm["density"] * np.square(tas) / (_RHO_REF * np.square(vitesse0))
+    return tas, 0.5 * (r + 1.0 / r)
+
+
+def _off_cruise(flight_level, mach, isa_dev):
+    return flight_level is not None or mach is not None or np.any(np.asarray(isa_dev) != 0)
+
+
+def evaluate(catalog, direction, vent, pax, distance, ids=None,
+             flight_level=None, mach=None, isa_dev=0.0):
+    """
+    Return a dict of arrays {conso_L, conso_L_pax, duree_h, vitesse,
+    mass_kg, wind_coef}, each shaped (n_aircraft, *broadcast(direction,
+    vent, pax, distance[, flight_level, mach, isa_dev])).
+    """
+    code = direction_code(direction)
+    vent, pax, distance = (np.asarray(a, dtype=np.float64)
+                           for a in (vent, pax, distance))
+    shape = np.broadcast_shapes(np.shape(code), vent.shape, pax.shape, distance.shape,
+                                np.shape(flight_level) if flight_level is not None else (),
+                                np.shape(mach) if mach is not None else (), np.shape(isa_dev))
+    col = (-1,) + (1,) * len(shape)
+
+    def column(name):
+        c = getattr(catalog, name)
+        if ids is not None:
+            c = c[ids]
+        return c.reshape(col).astype(np.float64, copy=False)
+
+    poids_vide, conso_base = column("poids_vide"), column("conso_base")
+    sens_vent, vitesse0 = column("sens_vent"), column("vitesse")
+    max_pax = column("max_pax")
+
+    masse = poids_vide + pax * (POIDS_PASSAGER + POIDS_BAGAGE)
+    coef = vent * WIND_COEF[code] * sens_vent
+    aero = conso_base + (masse / 1000.0) * 0.1
+    if _off_cruise(flight_level, mach, isa_dev):
+        vitesse0, drag = cruise(vitesse0, flight_level, mach, isa_dev)
+        aero = aero * drag
+    vitesse = np.clip(vitesse0 + SPEED_SIGN[code] * vent, VITESSE_MIN, VITESSE_MAX)
+    conso_km = aero + coef
+    conso_L = conso_km * distance
+
+    invalid = pax > max_pax
+    full = (len(max_pax),) + shape
+    out = {
+        "conso_L": np.broadcast_to(conso_L, full),
+        "conso_L_pax": np.broadcast_to(conso_L / pax, full),
+        "duree_h": np.broadcast_to(distance / vitesse, full),
+        "vitesse": np.broadcast_to(vitesse, full),
+        "mass_kg": np.broadcast_to(masse, full),
+        "wind_coef": np.broadcast_to(coef, full),
+    }
+    invalid = np.broadcast_to(invalid, full)
+    return {k: np.where(invalid, np.nan, v) for k, v in out.items()}
+
+
+def wind_coef(head, cross):
+    """
+    Fuel coefficient per unit sens_vent (L/km) for a wind split into a
+    headwind component `head` (km/h, negative = tailwind) and a crosswind
+    component `cross`. Pure head / tail / side winds give the
+    WIND_COEF terms of calcule_etat exactly.
+    """
+    head = np.asarray(head, dtype=np.float64)
+    along = np.where(head >= 0, WIND_COEF[0] * head, -WIND_COEF[1] * head)
+    return along + WIND_COEF[2] * np.abs(cross)
+
+
+def evaluate_each(catalog, ids, head, cross, pax, flight_level=None, mach=None, isa_dev=0.0):
+    """
+    Element-wise model: aircraft `ids[i]` carrying `pax[i]` in wind
+    (head[i], cross[i]), optionally at flight_level[i] / mach[i]. Returns
+    {conso_km, vitesse, mass_kg, wind_coef}, broadcast over the inputs;
+    NaN where pax > max_pax.
+    """
+    ids = np.asarray(ids, dtype=np.intp)
+    pax = np.asarray(pax, dtype=np.float64)
+    head = np.asarray(head, dtype=np.float64)
+    masse = catalog.poids_vide[ids] + pax * (POIDS_PASSAGER + POIDS_BAGAGE)
+    coef = wind_coef(head, cross) * catalog.sens_vent[ids]
+    vitesse0 = catalog.vitesse[ids].astype(np.float64)
+    aero = catalog.conso_base[ids] + (masse / 1000.0) * 0.1
+    if _off_cruise(flight_level, mach, isa_dev):
+        vitesse0, drag = cruise(vitesse0, flight_level, mach, isa_dev)
+        aero = aero * drag
+    vitesse = np.clip(vitesse0 - head, VITESSE_MIN, VITESSE_MAX)
+    conso_km = aero + coef
+    invalid = pax > catalog.max_pax[ids]
+    out = {"conso_km": conso_km, "vitesse": vitesse, "mass_kg": masse, "wind_coef": coef}
+    return {k: np.where(invalid, np.nan, v) for k, v in out.items()}
+
+
+def best_flight_level(catalog, direction, vent, pax, distance, levels=range(200, 431, 10),
+                      mach=None, isa_dev=0.0, metric="conso_L_pax"):
+    """
+    Sweep flight levels as an extra (last) axis: returns (levels, values
+    (n_aircraft, *broadcast, n_levels), best level per aircraft / point,
+    NaN where the aircraft cannot fly the point).
+    """
+    levels = np.asarray(list(levels), dtype=np.float64)
+    code, vent, pax, distance, isa_dev = (np.asarray(a)[..., None] for a in (
+        direction_code(direction), vent, pax, distance, isa_dev))
+    e = evaluate(catalog, code, vent, pax, distance, flight_level=levels,
+                 mach=None if mach is None else np.asarray(mach)[..., None], isa_dev=isa_dev)
+    vals = e[metric]
+    ok = np.isfinite(vals).any(axis=-1)
+    best = np.where(ok, levels[np.argmin(np.where(np.isfinite(vals), vals, np.inf), axis=-1)],
+                    np.nan)
+    return levels, vals, best
+
+
+def ymax(catalog, direction, distance, pax, metric, vents=range(0, 301, 20),
+         headroom=1.20):
+    """Y-axis bound for one sequence (max of `metric` over aircraft × wind)."""
+    vals = evaluate(catalog, direction, np.asarray(list(vents)), pax, distance)[metric]
+    y_max = np.nanmax(vals) if np.any(np.isfinite(vals)) else 0.0
+    return float(y_max * headroom) if y_max > 0 else 1.0
@@ -0,0 +1,211 @@
+"""
+gif_encoder.py
+Fast GIF writer for the no-ffmpeg fallback of snapsac_render.
+
+Differences with matplotlib's "pillow" writer:
+- one global palette built once from the known plot colors (COULEURS +
+  text/grid grays, blended towards the background for antialiasing),
+  instead of quantizing every full frame independently; pixels map to it
+  through an exact RGB → index table (palette colors map to themselves,
+  other colors to their nearest entry, resolved once and remembered);
+- frame differencing: each frame only stores the bounding box of pixels
+  that changed since the previous one, and unchanged pixels inside that
+  box are written as the transparent index (long runs → small LZW output);
+- optional decimation (keep one frame out of N, longer delay).
+
+Run `python gif_encoder.py` to compare encode time and size with the
+matplotlib pillow writer on one render sequence.
+"""
+import os
+import struct
+import numpy as np
+from PIL import Image, GifImagePlugin
+from matplotlib.colors import to_rgb
+
+GIF_ENCODER = os.getenv("GIF_ENCODER", "fast")    # "fast" | "pillow"
+GIF_DECIMATE = max(1, int(os.getenv("GIF_DECIMATE", "1")))
+
+TRANSPARENT = 255          # reserved palette index for "unchanged pixel"
+
+
+def build_palette(colors, background="#ffffff", levels=12, grays=48):
+    """
+    Flat RGB list (<= 255 entries): each plot color blended towards the
+    background at `levels` steps, plus a gray ramp for text, grid and axes.
+    Large fleets get fewer blend steps, then a shorter gray ramp, then an
+    evenly spaced subset of their colors, so the palette always fits
+    (other colors map to their nearest entry).
+    """
+    colors = list(colors)
+    room = TRANSPARENT - 1                      # minus the background
+    levels = max(1, min(levels, (room - grays) // max(len(colors), 1)))
+    grays = max(2, min(grays, room - len(colors) * levels))
+    if len(colors) * levels + grays > room:
+        keep = np.linspace(0, len(colors) - 1, room - grays).round().astype(int)
+        colors = [colors[i] for i in keep]
+    bg = np.array(to_rgb(background))
+    entries = [bg]
+    t = np.linspace(0.0, 1.0, levels + 1)[1:, None]
+    for c in colors:
+        entries.extend(bg + (np.array(to_rgb(c)) - bg) * t)
+    entries.extend(np.linspace(0.0, 1.0, grays)[:, None] * np.ones(3))
+    return np.unique(np.round(np.array(entries) * 255).astype(np.uint8), axis=0)
+
+
+def _rgb_codes(rgb):
+    rgb = np.asarray(rgb, dtype=np.uint32)
+    return (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+
+
+def _nearest(codes, palette, chunk=4096):
+    """Index of the palette entry closest (RGB distance) to each 24-bit code."""
+    pal = palette.astype(np.int32)
+    out = np.empty(len(codes), dtype=np.uint8)
+    for s in range(0, len(codes), chunk):
+        c = codes[s:s + chunk]
+        rgb = np.stack([(c >> 16) & 255, (c >> 8) & 255, c & 255], axis=-1).astype(np.int32)
+        d = ((rgb[:, None, :] - pal[None, :, :]) ** 2).sum(axis=-1)
+        out[s:s + chunk] = d.argmin(axis=1)
+    return out
+
+
+class GifEncoder:
+    """
+    Write RGB frames of constant size to `path` with a shared palette.
+    `decimate` only stretches the frame delay; the caller feeds the kept
+    frames (see save_figure_gif).
+    """
+
+    def __init__(self, path, fps, palette, decimate=1, loop=0):
+        self.path = path
+        self.delay_ms = int(round(1000.0 * decimate / fps))
+        self.loop = loop
+        self.n_colors = len(palette)
+        flat = np.zeros((256, 3), dtype=np.uint8)
+        flat[:self.n_colors] = palette
+        # pad with entry 0; only the first n_colors entries are ever referenced
+        flat[self.n_colors:] = palette[0]
+        self._flat = flat
+        # 24-bit RGB → palette index, TRANSPARENT until first seen
+        self._lut = np.full(1 << 24, TRANSPARENT, dtype=np.uint8)
+        self._lut[_rgb_codes(palette)] = np.arange(self.n_colors, dtype=np.uint8)
+        self._fp = None
+        self._prev = None
+        self.frames_written = 0
+
+    def _header(self, w, h):
+        self._fp.write(b"GIF89a")
+        # global color table flag, 8-bit color resolution, 256 entries
+        self._fp.write(struct.pack("<HHBBB", w, h, 0xF7, 0, 0))
+        self._fp.write(self._flat.tobytes())
+        # NETSCAPE2.0 application extension (loop count)
+        self._fp.write(b"!\xff\x0bNETSCAPE2.0\x03\x01" + struct.pack("<H", self.loop) + b"\x00")
+
+    def _quantize(self, rgb):
+        codes = _rgb_codes(rgb[..., :3])
+        idx = self._lut[codes]
+        miss = idx == TRANSPARENT
+        if miss.any():
+            new = np.unique(codes[miss])
+            self._lut[new] = _nearest(new, self._flat[:self.n_colors])
+            idx[miss] = self._lut[codes[miss]]
+        return idx
+
+    def add_frame(self, rgb):
+        """rgb: (h, w, 3|4) uint8 array."""
+        idx = self._quantize(rgb)
+        h, w = idx.shape
+        if self._fp is None:
+            self._fp = open(self.path, "wb")
+            self._header(w, h)
+            x0, y0, region = 0, 0, idx
+        else:
+            changed = idx != self._prev
+            rows = np.flatnonzero(changed.any(axis=1))
+            if rows.size == 0:
+                # identical frame: 1×1 transparent patch just to hold the delay
+                x0, y0 = 0, 0
+                region = np.full((1, 1), TRANSPARENT, dtype=np.uint8)
+            else:
+                cols = np.flatnonzero(changed.any(axis=0))
+                y0, y1 = rows[0], rows[-1] + 1
+                x0, x1 = cols[0], cols[-1] + 1
+                region = np.where(changed[y0:y1, x0:x1],
+                                  idx[y0:y1, x0:x1], TRANSPARENT).astype(np.uint8)
+        self._prev = idx
+        frame = Image.fromarray(np.ascontiguousarray(region), "P")
+        frame.putpalette(self._flat.tobytes())
+        for chunk in GifImagePlugin.getdata(
+                frame, offset=(int(x0), int(y0)), duration=self.delay_ms,
+                disposal=1, transparency=TRANSPARENT):
+            self._fp.write(chunk)
+        self.frames_written += 1
+
+    def close(self):
+        if self._fp is not None:
+            self._fp.write(b";")
+            self._fp.close()
+            self._fp = None
+
+
+def save_figure_gif(fig, update, frames, path, fps, colors, dpi=None,
+                    decimate=GIF_DECIMATE):
+    """
+    Drive `update(i)` for every frame (updates are cumulative) and encode
+    one canvas out of `decimate` as a GIF frame.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    if dpi:
+        fig.set_dpi(dpi)
+    canvas = fig.canvas if isinstance(fig.canvas, FigureCanvasAgg) else FigureCanvasAgg(fig)
+    palette = build_palette(list(colors) + ["#444444"],
+                            background=fig.get_facecolor())
+    enc = GifEncoder(path, fps, palette, decimate=decimate)
+    try:
+        for i in range(frames):
+            update(i)
+            if i % decimate:
+                continue
+            canvas.draw()
+            enc.add_frame(np.asarray(canvas.buffer_rgba()))
+    finally:
+        enc.close()
+    return enc.frames_written
+
+
+# ====== Benchmark ======
+
+
+def _bench():
+    import time
+    import tempfile
+    import snapsac_render as r
+    from matplotlib import pyplot as plt
+    from matplotlib.animation import FuncAnimation
+
+    out = tempfile.mkdtemp(prefix="gifbench_")
+    results = {}
+    for mode in ("pillow", "fast"):
+        r._SEQ_INDEX = 0
+        fig, update, frames = r.build_animation(r.next_sequence())
+        path = os.path.join(out, f"{mode}.gif")
+        t0 = time.perf_counter()
+        if mode == "pillow":
+            anim = FuncAnimation(fig, update, frames=frames,
+                                 interval=r.INTERVAL_MS, blit=False)
+            anim.save(path, writer="pillow", dpi=100)
+        else:
+            save_figure_gif(fig, update, frames, path, 1000.0 / r.INTERVAL_MS,
+                            r.render_colors().values(), dpi=100)
+        results[mode] = (time.perf_counter() - t0, os.path.getsize(path))
+        plt.close(fig)
+    for mode, (sec, size) in results.items():
+        print(f"[BENCH] {mode:6s} encode {sec:6.2f}s  size {size / 1024:8.1f} KiB")
+    base_t, base_s = results["pillow"]
+    fast_t, fast_s = results["fast"]
+    print(f"[BENCH] fast vs pillow: {base_t / fast_t:.1f}x faster, "
+          f"{base_s / fast_s:.1f}x smaller  ({out})")
+
+
+if __name__ == "__main__":
+    _bench()
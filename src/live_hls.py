@@ -0,0 +1,274 @@
+"""
+live_hls.py
+Shared HLS live output for app_web.
+
+One render loop pipes raw RGBA frames into a single ffmpeg process
+(rawvideo on stdin → H.264 → HLS). ffmpeg keeps a rolling window of
+segments on disk (older ones are deleted) and rewrites the playlist;
+every viewer of /live.m3u8 downloads the same segments. N viewers cost
+one render and one encode, and H.264 only sends what changes between
+frames instead of a full PNG per frame as /video_feed does.
+
+Segments are fragmented MP4 (LIVE_FORMAT=fmp4, CMAF .m4s + init.mp4) or
+MPEG-TS (LIVE_FORMAT=ts). The encoder starts on the first request and
+stops after LIVE_IDLE seconds without any playlist/segment request.
+
+Run `python live_hls.py [seconds]` to encode locally with the ffmpeg
+binary and inspect LIVE_DIR (play it with `ffplay LIVE_DIR/live.m3u8`).
+"""
+import os
+import re
+import time
+import shutil
+import tempfile
+import threading
+import subprocess
+
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+LIVE_DIR = os.getenv("LIVE_DIR", os.path.join(tempfile.gettempdir(), "kerosene_live"))
+LIVE_FORMAT = os.getenv("LIVE_FORMAT", "fmp4").strip().lower()    # "fmp4" | "ts"
+LIVE_FPS = int(os.getenv("LIVE_FPS", "15"))
+LIVE_SEGMENT_S = float(os.getenv("LIVE_SEGMENT_S", "2"))
+LIVE_WINDOW = int(os.getenv("LIVE_WINDOW", "6"))     # segments listed in the playlist
+LIVE_IDLE = float(os.getenv("LIVE_IDLE", "30"))      # stop encoding after N s unwatched
+LIVE_CRF = os.getenv("LIVE_CRF", "28")
+
+PLAYLIST = "live.m3u8"
+INIT_SEGMENT = "init.mp4"
+_SEGMENT_RE = re.compile(r"^(seg_\d+\.(ts|m4s)|init\.mp4)$")
+MIMETYPES = {
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".ts": "video/mp2t",
+    ".m4s": "video/iso.segment",
+    ".mp4": "video/mp4",
+}
+
+
+def ffmpeg_available():
+    return shutil.which(FFMPEG_BIN) is not None
+
+
+def ffmpeg_command(width, height, fps, out_dir, fmt=LIVE_FORMAT,
+                   segment_s=LIVE_SEGMENT_S, window=LIVE_WINDOW):
+    """ffmpeg argv reading rgba frames of (width, height) on stdin."""
+    # one keyframe per segment so every segment starts independently
+    gop = max(1, int(round(fps * segment_s)))
+    ext = "m4s" if fmt == "fmp4" else "ts"
+    cmd = [
+        FFMPEG_BIN, "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "rawvideo", "-pix_fmt", "rgba",
+        "-s", f"{width}x{height}", "-r", str(fps), "-i", "pipe:0",
+        "-an",
+        # yuv420p needs even dimensions
+        "-vf", "scale=trunc(iw/2)*2:trunc(ih/2)*2",
+        "-c:v", "libx264", "-preset", "veryfast", "-tune", "zerolatency",
+        "-crf", str(LIVE_CRF), "-pix_fmt", "yuv420p",
+        "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0",
+        "-f", "hls", "-hls_time", str(segment_s), "-hls_list_size", str(window),
+        "-hls_flags", "delete_segments+independent_segments+omit_endlist",
+        "-hls_segment_filename", os.path.join(out_dir, f"seg_%05d.{ext}"),
+    ]
+    if fmt == "fmp4":
+        cmd += ["-hls_segment_type", "fmp4", "-hls_fmp4_init_filename", INIT_SEGMENT]
+    cmd.append(os.path.join(out_dir, PLAYLIST))
+    return cmd
+
+
+class LiveEncoder:
+    """
+    Render loop + ffmpeg process, started on demand.
+    `source_factory()` is called in the encoder thread and must return a
+    callable producing (h, w, 4) uint8 frames of constant size.
+    """
+
+    def __init__(self, source_factory, fps=LIVE_FPS, out_dir=LIVE_DIR,
+                 fmt=LIVE_FORMAT, idle=LIVE_IDLE):
+        if fmt not in ("fmp4", "ts"):
+            raise ValueError(f"unknown live format: {fmt!r}")
+        self.source_factory = source_factory
+        self.fps = fps
+        self.out_dir = out_dir
+        self.fmt = fmt
+        self.idle = idle
+        self.playlist_path = os.path.join(out_dir, PLAYLIST)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._proc = None
+        self.last_request = 0.0
+        self.frames = 0
+        self.render_s = 0.0
+        self.started = None
+        self.size = None
+        self.error = None
+
+    # ----- lifecycle -----
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def touch(self):
+        """Mark viewer activity; start the encoder if it is not running."""
+        self.last_request = time.monotonic()
+        with self._lock:
+            if not self.running:
+                self._start()
+        return self
+
+    def _start(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        # drop the previous run's window: its playlist would point at
+        # segments of another timeline
+        for name in os.listdir(self.out_dir):
+            if name == PLAYLIST or _SEGMENT_RE.match(name):
+                try:
+                    os.remove(os.path.join(self.out_dir, name))
+                except OSError:
+                    pass
+        self._stop.clear()
+        self.frames = 0
+        self.render_s = 0.0
+        self.error = None
+        self.started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="live-hls", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _spawn(self, width, height):
+        cmd = ffmpeg_command(width, height, self.fps, self.out_dir, self.fmt)
+        self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+        self.size = (width, height)
+
+    def _run(self):
+        interval = 1.0 / self.fps
+        try:
+            source = self.source_factory()
+            deadline = time.monotonic()
+            while not self._stop.is_set():
+                if time.monotonic() - self.last_request > self.idle:
+                    print("📴 live: no viewers, stopping encoder")
+                    break
+                t0 = time.perf_counter()
+                frame = source()
+                self.render_s += time.perf_counter() - t0
+                h, w = frame.shape[:2]
+                if self._proc is None:
+                    self._spawn(w, h)
+                elif (w, h) != self.size:
+                    raise RuntimeError(f"frame size changed: {self.size} → {(w, h)}")
+                self._proc.stdin.write(memoryview(frame).cast("B"))
+                self.frames += 1
+
+                deadline += interval
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                elif delay < -1.0:
+                    # rendering slower than fps: don't try to catch up
+                    deadline = time.monotonic()
+        except Exception as e:
+            # any render failure must surface (wait_playlist gives up on it)
+            self.error = f"{type(e).__name__}: {e}"
+            print(f"Live encoder error: {self.error}")
+        finally:
+            self._close_proc()
+
+    def _close_proc(self):
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        if proc.returncode:
+            self.error = self.error or f"ffmpeg exited with {proc.returncode}"
+
+    # ----- serving -----
+    def wait_playlist(self, timeout):
+        """True once ffmpeg has written the first playlist."""
+        end = time.monotonic() + timeout
+        while not os.path.exists(self.playlist_path):
+            if time.monotonic() > end or (not self.running and self.error):
+                return False
+            time.sleep(0.1)
+        return True
+
+    def playlist(self, prefix=""):
+        """
+        Current playlist text with segment URIs prefixed by `prefix`
+        (the playlist and its segments are served under different paths).
+        """
+        try:
+            with open(self.playlist_path, encoding="utf-8") as f:
+                text = f.read()
+        except OSError:
+            return None
+        lines = []
+        for line in text.splitlines():
+            if line and not line.startswith("#"):
+                line = prefix + line
+            elif line.startswith("#EXT-X-MAP:"):
+                line = line.replace('URI="', f'URI="{prefix}')
+            lines.append(line)
+        return "\n".join(lines) + "\n"
+
+    def segment_path(self, name):
+        """Path of a segment file in the window, or None (unknown/expired)."""
+        if not _SEGMENT_RE.match(name):
+            return None
+        path = os.path.join(self.out_dir, name)
+        return path if os.path.exists(path) else None
+
+    def stats(self):
+        elapsed = (time.monotonic() - self.started) if self.started else 0.0
+        return {
+            "running": self.running,
+            "format": self.fmt,
+            "fps": self.fps,
+            "size": self.size,
+            "frames": self.frames,
+            "render_ms": round(self.render_s / self.frames * 1000.0, 2) if self.frames else None,
+            # < 1.0: rendering can't keep up and playback lags real time
+            "realtime": round(self.frames / (elapsed * self.fps), 3) if elapsed and self.running else None,
+            "error": self.error,
+        }
+
+
+# ====== Local test ======
+
+
+def _demo(seconds=12.0):
+    import app_web
+
+    def factory():
+        anim = app_web.SnapSacAnimation(force_direction=None, dpi=100, fps=LIVE_FPS)
+        return lambda: anim.render_rgba(dpi=100)
+
+    if not ffmpeg_available():
+        raise SystemExit(f"{FFMPEG_BIN} not found (set FFMPEG_BIN)")
+    enc = LiveEncoder(factory, idle=seconds + 5)
+    enc.touch()
+    end = time.monotonic() + seconds
+    while time.monotonic() < end and (enc.running or not enc.error):
+        time.sleep(1.0)
+        enc.touch()
+        print(f"[LIVE] {enc.stats()}")
+    enc.stop()
+    segs = sorted(n for n in os.listdir(enc.out_dir) if _SEGMENT_RE.match(n))
+    size = sum(os.path.getsize(os.path.join(enc.out_dir, n)) for n in segs)
+    print(f"[LIVE] {len(segs)} files, {size / 1024:.1f} KiB in {enc.out_dir}")
+    print(enc.playlist("live/"))
+
+
+if __name__ == "__main__":
+    import sys
+    _demo(float(sys.argv[1]) if len(sys.argv) > 1 else 12.0)
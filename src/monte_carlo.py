@@ -0,0 +1,334 @@
+"""
+monte_carlo.py
+Monte Carlo uncertainty on the Snapsac fuel model.
+
+`calcule_etat` uses point values for conso_base, sens_vent and the
+passenger / baggage weights. Here those are drawn from configurable
+distributions (MC_DISTRIBUTIONS: JSON string or path) and the model is
+evaluated for every sample × aircraft × wind step at once, in chunks of
+about MC_CHUNK_ELEMS values, spread over a process pool.
+
+Each task folds its chunks into mergeable aggregates: a fixed-bin
+histogram of fuel per pax per (aircraft, wind) (range taken from a small
+pilot draw), best-aircraft counts, sum and sum of squares. The parent
+adds the tasks up and reads percentile bands and P(best) from them, so
+memory stays flat whatever the sample count.
+
+Flight time does not depend on any sampled parameter, so only the fuel
+charts get bands (conso_L is conso_L_pax × pax).
+
+Run `python monte_carlo.py --samples 2000000` for a throughput report.
+"""
+import os
+import json
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from fuel_model import (POIDS_PASSAGER, POIDS_BAGAGE, WIND_COEF, direction_code)
+
+MC_SAMPLES = int(os.getenv("MC_SAMPLES", "1000000"))
+MC_WORKERS = int(os.getenv("MC_WORKERS", "0")) or (os.cpu_count() or 1)
+MC_CHUNK_ELEMS = int(os.getenv("MC_CHUNK_ELEMS", "4000000"))
+MC_BINS = int(os.getenv("MC_BINS", "2048"))
+MC_PILOT = 4096
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# "relative": value = catalog value × draw (draws centred on 1)
+DEFAULT_DISTRIBUTIONS = {
+    "conso_base":     {"dist": "normal", "sd": 0.05, "relative": True},
+    "sens_vent":      {"dist": "uniform", "low": 0.8, "high": 1.2, "relative": True},
+    "poids_passager": {"dist": "normal", "mean": POIDS_PASSAGER, "sd": 12.0, "min": 40.0},
+    "poids_bagage":   {"dist": "triangular", "left": 8.0, "mode": POIDS_BAGAGE, "right": 32.0},
+}
+PARAMS = tuple(DEFAULT_DISTRIBUTIONS)
+KINDS = ("normal", "lognormal", "uniform", "triangular", "fixed")
+
+
+def load_distributions(spec=None):
+    """
+    Defaults overridden by `spec` (dict), else by MC_DISTRIBUTIONS
+    (inline JSON or path to a JSON file). Unknown names raise ValueError.
+    """
+    if spec is None:
+        raw = os.getenv("MC_DISTRIBUTIONS", "").strip()
+        if raw and not raw.startswith("{"):
+            with open(raw, encoding="utf-8") as f:
+                raw = f.read()
+        spec = json.loads(raw) if raw else {}
+    out = {k: dict(v) for k, v in DEFAULT_DISTRIBUTIONS.items()}
+    for name, d in spec.items():
+        if name not in out:
+            raise ValueError(f"unknown parameter: {name!r} (expected one of {PARAMS})")
+        if d.get("dist", "fixed") not in KINDS:
+            raise ValueError(f"{name}: unknown distribution {d.get('dist')!r}")
+        out[name] = dict(d)
+    return out
+
+
+def draw(spec, rng, shape, base):
+    """Samples of one parameter; `base` = point value(s) of the model."""
+    kind = spec.get("dist", "fixed")
+    rel = spec.get("relative", False)
+    center = 1.0 if rel else base
+    if kind == "normal":
+        v = rng.normal(spec.get("mean", center), spec["sd"], shape)
+    elif kind == "lognormal":
+        # median = mean (or the point value), sigma on the log scale
+        v = np.asarray(spec.get("mean", center)) * np.exp(rng.normal(0.0, spec["sigma"], shape))
+    elif kind == "uniform":
+        v = rng.uniform(spec["low"], spec["high"], shape)
+    elif kind == "triangular":
+        v = rng.triangular(spec["left"], spec["mode"], spec["right"], shape)
+    else:
+        v = np.broadcast_to(np.asarray(spec.get("value", center), dtype=float), shape)
+    if rel:
+        v = base * v
+    if "min" in spec or "max" in spec:
+        v = np.clip(v, spec.get("min", -np.inf), spec.get("max", np.inf))
+    return v
+
+
+def _catalog_columns(catalog):
+    return {f: np.asarray(getattr(catalog, f), dtype=np.float64)
+            for f in ("poids_vide", "conso_base", "sens_vent", "max_pax")}
+
+
+def _fuel_per_pax(cols, dists, rng, n_samples, code, vents, pax, distance):
+    """(n_samples, n_valid_aircraft, n_winds) fuel per pax for one chunk."""
+    n = len(cols["conso_base"])
+    cb = draw(dists["conso_base"], rng, (n_samples, n), cols["conso_base"])
+    sv = draw(dists["sens_vent"], rng, (n_samples, n), cols["sens_vent"])
+    pp = draw(dists["poids_passager"], rng, (n_samples, 1), POIDS_PASSAGER)
+    pb = draw(dists["poids_bagage"], rng, (n_samples, 1), POIDS_BAGAGE)
+    masse = cols["poids_vide"] + pax * (pp + pb)
+    base_km = cb + (masse / 1000.0) * 0.1                       # (S, n)
+    slope = WIND_COEF[code] * sv                                 # (S, n)
+    cpx = base_km[..., None] + slope[..., None] * vents          # (S, n, m)
+    cpx *= distance / pax
+    return cpx
+
+
+def _run_task(args):
+    """One pool task: `samples` draws folded chunk by chunk into aggregates."""
+    (cols, dists, seed, samples, chunk, code, vents, pax, distance, lo, width, bins) = args
+    rng = np.random.default_rng(seed)
+    n, m = lo.shape
+    hist = np.zeros(n * m * bins, dtype=np.int64)
+    best = np.zeros(n * m, dtype=np.int64)
+    s1 = np.zeros((n, m))
+    s2 = np.zeros((n, m))
+    cell = (np.arange(n)[:, None] * m + np.arange(m)) * bins     # (n, m) offsets
+    wind = np.arange(m)
+    done = 0
+    while done < samples:
+        k = min(chunk, samples - done)
+        cpx = _fuel_per_pax(cols, dists, rng, k, code, vents, pax, distance)
+        idx = np.clip(((cpx - lo) / width).astype(np.int64), 0, bins - 1)
+        hist += np.bincount((idx + cell).ravel(), minlength=hist.size)
+        b = np.argmin(cpx, axis=1)                               # (S, m)
+        best += np.bincount((b * m + wind).ravel(), minlength=best.size)
+        s1 += cpx.sum(axis=0)
+        s2 += np.square(cpx).sum(axis=0)
+        done += k
+    return hist.reshape(n, m, bins), best.reshape(n, m), s1, s2
+
+
+def _hist_percentiles(hist, lo, width, qs):
+    """Percentiles (linear inside the bin) from per-cell histograms."""
+    cdf = np.cumsum(hist, axis=-1)
+    total = cdf[..., -1:]
+    out = {}
+    for q in qs:
+        target = q / 100.0 * total
+        i = np.argmax(cdf >= target, axis=-1)[..., None]
+        prev = np.where(i > 0, np.take_along_axis(cdf, np.maximum(i - 1, 0), -1), 0)
+        count = np.take_along_axis(hist, i, -1)
+        frac = np.where(count > 0, (target - prev) / np.maximum(count, 1), 0.0)
+        out[q] = (lo + (i[..., 0] + frac[..., 0]) * width)
+    return out
+
+
+class MonteCarloResult:
+    """Bands and P(best) for every aircraft (NaN rows = cannot carry pax)."""
+
+    def __init__(self, names, vents, pax, percentiles, mean, std, p_best,
+                 samples, seconds, workers):
+        self.names = list(names)
+        self.vents = vents
+        self.pax = pax
+        self.percentiles = percentiles
+        self.mean = mean
+        self.std = std
+        self.p_best = p_best
+        self.samples = samples
+        self.seconds = seconds
+        self.workers = workers
+
+    @property
+    def samples_per_s(self):
+        return self.samples / self.seconds if self.seconds else float("inf")
+
+    def band(self, metric="conso_L_pax", lo=5, hi=95):
+        """(low, high) arrays (n_aircraft, n_winds); None for duree_h."""
+        scale = {"conso_L_pax": 1.0, "conso_L": float(self.pax)}.get(metric)
+        if scale is None:
+            return None
+        return self.percentiles[lo] * scale, self.percentiles[hi] * scale
+
+    def to_dict(self):
+        def clean(a):
+            return np.where(np.isfinite(a), np.round(a, 4), np.nan).tolist()
+        return {
+            "aircraft": self.names,
+            "vents": np.asarray(self.vents).tolist(),
+            "percentiles": {str(q): clean(v) for q, v in self.percentiles.items()},
+            "mean": clean(self.mean),
+            "std": clean(self.std),
+            "p_best": clean(self.p_best),
+            "samples": self.samples,
+            "seconds": round(self.seconds, 4),
+            "samples_per_s": round(self.samples_per_s, 1),
+            "workers": self.workers,
+        }
+
+
+_POOL = None
+
+
+def _pool(workers):
+    global _POOL
+    if _POOL is None or _POOL._max_workers != workers:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False)
+        # "spawn": safe from threaded hosts (app_web, the Tk producer)
+        _POOL = ProcessPoolExecutor(max_workers=workers,
+                                    mp_context=multiprocessing.get_context("spawn"))
+    return _POOL
+
+
+def run(catalog, direction, vents, pax, distance, samples=MC_SAMPLES,
+        workers=MC_WORKERS, distributions=None, seed=0, percentiles=PERCENTILES,
+        bins=MC_BINS, chunk_elems=MC_CHUNK_ELEMS):
+    """
+    Sample the model `samples` times for one (direction, distance, pax)
+    over `vents`. workers=1 runs in-process (no pool).
+    """
+    dists = distributions if distributions is not None else load_distributions()
+    code = direction_code(direction)
+    vents = np.asarray(vents, dtype=np.float64)
+    all_cols = _catalog_columns(catalog)
+    valid = pax <= all_cols["max_pax"]
+    cols = {k: v[valid] for k, v in all_cols.items()}
+    n, m = int(valid.sum()), len(vents)
+    n_all = len(valid)
+
+    def widen(a):
+        full = np.full((n_all,) + a.shape[1:], np.nan)
+        full[valid] = a
+        return full
+
+    t0 = time.perf_counter()
+    if n == 0:
+        empty = np.full((n_all, m), np.nan)
+        return MonteCarloResult(catalog.names, vents, pax, {q: empty for q in percentiles},
+                                empty, empty, empty, 0, 0.0, 0)
+
+    # histogram range from a pilot draw, widened so the tails stay inside
+    root = np.random.SeedSequence(seed)
+    pilot_seed, task_root = root.spawn(2)
+    pilot = _fuel_per_pax(cols, dists, np.random.default_rng(pilot_seed), MC_PILOT,
+                          code, vents, pax, distance)
+    pmin, pmax = pilot.min(axis=0), pilot.max(axis=0)
+    span = np.maximum(pmax - pmin, 1e-9 * np.maximum(np.abs(pmax), 1.0))
+    lo = pmin - 0.5 * span
+    width = 2.0 * span / bins
+
+    chunk = max(1, chunk_elems // (n * m))
+    workers = max(1, min(workers, -(-samples // chunk)))
+    n_tasks = workers * 4 if workers > 1 else 1
+    per_task = [samples // n_tasks + (i < samples % n_tasks) for i in range(n_tasks)]
+    seeds = task_root.spawn(n_tasks)
+    tasks = [(cols, dists, s, k, chunk, code, vents, pax, distance, lo, width, bins)
+             for s, k in zip(seeds, per_task) if k]
+
+    if workers == 1:
+        parts = [_run_task(t) for t in tasks]
+    else:
+        parts = list(_pool(workers).map(_run_task, tasks))
+    hist = sum(p[0] for p in parts)
+    best = sum(p[1] for p in parts)
+    s1 = sum(p[2] for p in parts)
+    s2 = sum(p[3] for p in parts)
+    seconds = time.perf_counter() - t0
+
+    mean = s1 / samples
+    std = np.sqrt(np.maximum(s2 / samples - mean ** 2, 0.0))
+    pct = _hist_percentiles(hist, lo, width, percentiles)
+    return MonteCarloResult(
+        catalog.names, vents, pax,
+        {q: widen(v) for q, v in pct.items()},
+        widen(mean), widen(std), widen(best / samples),
+        samples, seconds, workers)
+
+
+def draw_bands(ax, result, metric, colors, lo=5, hi=95, alpha=0.14, zorder=0):
+    """
+    One PolyCollection holding the [lo, hi] percentile band of every
+    aircraft on `ax` (colors: one per aircraft). None when `metric` has
+    no spread (duree_h).
+    """
+    from matplotlib.collections import PolyCollection
+    band = result.band(metric, lo, hi)
+    if band is None:
+        return None
+    low, high = band
+    x = np.asarray(result.vents, dtype=float)
+    verts, faces = [], []
+    for i in range(len(result.names)):
+        if not np.isfinite(low[i]).all():
+            continue
+        verts.append(np.concatenate([np.column_stack([x, high[i]]),
+                                     np.column_stack([x[::-1], low[i][::-1]])]))
+        faces.append(colors[i])
+    coll = PolyCollection(verts, facecolors=faces, edgecolors="none",
+                          alpha=alpha, zorder=zorder)
+    ax.add_collection(coll)
+    return coll
+
+
+# ====== CLI ======
+
+
+def main(argv=None):
+    import argparse
+    from catalog import load_catalog
+    ap = argparse.ArgumentParser(description="Monte Carlo fuel uncertainty")
+    ap.add_argument("--samples", type=int, default=MC_SAMPLES)
+    ap.add_argument("--workers", type=int, default=MC_WORKERS)
+    ap.add_argument("--direction", default="head")
+    ap.add_argument("--distance", type=float, default=1200)
+    ap.add_argument("--pax", type=float, default=200)
+    ap.add_argument("--vent-step", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    cat = load_catalog()
+    vents = np.arange(0, 301, args.vent_step)
+    res = run(cat, args.direction, vents, args.pax, args.distance,
+              samples=args.samples, workers=args.workers, seed=args.seed)
+    print(f"[MC] {res.samples:,} samples × {len(cat)} aircraft × {len(vents)} winds "
+          f"in {res.seconds:.2f}s on {res.workers} worker(s) → {res.samples_per_s:,.0f} samples/s")
+    for w in (0, len(vents) // 2, len(vents) - 1):
+        print(f"[MC] vent {vents[w]:3d} km/h")
+        for i, name in enumerate(res.names):
+            if not np.isfinite(res.mean[i, w]):
+                continue
+            p = {q: res.percentiles[q][i, w] for q in PERCENTILES}
+            print(f"      {name:6s} L/pax p5 {p[5]:7.2f}  p50 {p[50]:7.2f}  p95 {p[95]:7.2f}"
+                  f"   P(best) {res.p_best[i, w] * 100:5.1f}%")
+
+
+if __name__ == "__main__":
+    main()
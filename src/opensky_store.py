@@ -0,0 +1,514 @@
+"""
+opensky_store.py
+Append-only, time-partitioned columnar store of OpenSky snapshots.
+
+fetch_opensky_states() keeps only the latest /states/all answer. Here
+every snapshot is appended to a store directory:
+
+    index.jsonl             one line per snapshot: time, partition, offset, rows
+    countries.json          origin_country dictionary (codes in the columns)
+    p<start>/<column>.bin   raw little-endian column files, one directory per
+                            OPENSKY_PARTITION_S seconds of snapshots
+
+A snapshot is a contiguous row range of every column file of its
+partition, rows sorted by icao24. The index is written last, so a crash
+mid-append leaves trailing bytes that the next append truncates.
+
+Queries never parse JSON: the time index is a sorted array (searchsorted
+gives the snapshot at or before T) and columns are memory-mapped, so
+"state at T" touches one row range and "track of icao24 over [t0, t1]"
+does one binary search per snapshot in the range.
+
+Replay plays a time range back at N× speed (Replay.current() is the
+snapshot due now). Offline, `import` loads recorded fixtures, and
+`--synthesize` dead-reckons a single fixture (position += velocity ×
+dt along true_track) into a timeline of successive snapshots.
+
+    python opensky_store.py import STORE [.cache/opensky_all.json] --synthesize 60
+    python opensky_store.py info STORE
+    python opensky_store.py at STORE 1764620700
+    python opensky_store.py track STORE 408127 [t0 t1]
+    python opensky_store.py replay STORE --speed 30
+"""
+import os
+import json
+import time
+import pathlib
+import threading
+
+import numpy as np
+
+OPENSKY_PARTITION_S = int(os.getenv("OPENSKY_PARTITION_S", "3600"))
+FIXTURE = pathlib.Path(__file__).resolve().parent / ".cache" / "opensky_all.json"
+
+INDEX = "index.jsonl"
+COUNTRIES = "countries.json"
+# OpenSky state vector fields (index in the JSON list) → column dtype
+SCHEMA = (
+    ("icao24", 0, "<u4"),
+    ("callsign", 1, "S8"),
+    ("origin_country", 2, "<u2"),
+    ("time_position", 3, "<i8"),
+    ("last_contact", 4, "<i8"),
+    ("longitude", 5, "<f4"),
+    ("latitude", 6, "<f4"),
+    ("baro_altitude", 7, "<f4"),
+    ("on_ground", 8, "u1"),
+    ("velocity", 9, "<f4"),
+    ("true_track", 10, "<f4"),
+    ("vertical_rate", 11, "<f4"),
+    ("geo_altitude", 13, "<f4"),
+    ("squawk", 14, "S4"),
+    ("spi", 15, "u1"),
+    ("position_source", 16, "u1"),
+)
+DTYPES = {name: np.dtype(dt) for name, _, dt in SCHEMA}
+EARTH_M_PER_DEG = 111_320.0
+
+
+def _icao(s):
+    try:
+        return int(s, 16)
+    except (TypeError, ValueError):
+        return 0
+
+
+def columns_from_states(states):
+    """
+    OpenSky `states` (list of state vectors) → dict of numpy columns.
+    Missing floats are NaN, missing times -1; origin_country stays an
+    object array of names (the store dictionary-encodes it).
+    """
+    if not states:
+        return {name: np.empty(0, dtype=object if name == "origin_country" else DTYPES[name])
+                for name, _, _ in SCHEMA}
+    fields = list(zip(*states))
+    cols = {}
+    for name, i, dt in SCHEMA:
+        raw = fields[i] if i < len(fields) else (None,) * len(states)
+        kind = np.dtype(dt).kind
+        if name == "icao24":
+            cols[name] = np.fromiter((_icao(s) for s in raw), dtype=dt, count=len(raw))
+        elif name == "origin_country":
+            cols[name] = np.array([s or "" for s in raw], dtype=object)
+        elif kind == "S":
+            cols[name] = np.array([(s or "").strip().encode("ascii", "replace") for s in raw],
+                                  dtype=dt)
+        elif kind == "f":
+            cols[name] = np.array(raw, dtype=np.float64).astype(dt)
+        elif name in ("time_position", "last_contact"):
+            v = np.array(raw, dtype=np.float64)
+            cols[name] = np.where(np.isfinite(v), v, -1).astype(dt)
+        elif name == "position_source":
+            cols[name] = np.array([s or 0 for s in raw], dtype=dt)
+        else:                       # on_ground, spi
+            cols[name] = np.array([bool(s) for s in raw], dtype=dt)
+    return cols
+
+
+def icao_hex(code):
+    return f"{int(code):06x}"
+
+
+class Snapshot:
+    """One snapshot: `time`, columns by name (memmap views), rows sorted by icao24."""
+
+    def __init__(self, t, columns, countries):
+        self.time = int(t)
+        self.columns = columns
+        self.countries = countries
+
+    def __len__(self):
+        return len(self.columns["icao24"])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def country_names(self):
+        """origin_country as names (object array)."""
+        return np.asarray(self.countries, dtype=object)[self.columns["origin_country"]]
+
+    def find(self, icao24):
+        """Row of an icao24 (hex string or int), or None."""
+        code = _icao(icao24) if isinstance(icao24, str) else int(icao24)
+        col = self.columns["icao24"]
+        i = int(np.searchsorted(col, code))
+        return i if i < len(col) and col[i] == code else None
+
+
+class SnapshotStore:
+    def __init__(self, root, partition_s=OPENSKY_PARTITION_S):
+        self.root = pathlib.Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.partition_s = partition_s
+        self._lock = threading.Lock()
+        self._maps = {}
+        self._load()
+
+    def _load(self):
+        entries = []
+        torn = False
+        path = self.root / INDEX
+        if path.exists():
+            with path.open(encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        torn = True    # interrupted append: drop the tail
+                        break
+        if torn:
+            tmp = self.root / (INDEX + ".tmp")
+            tmp.write_text("".join(json.dumps(e) + "\n" for e in entries), encoding="utf-8")
+            os.replace(tmp, path)
+        self.entries = entries
+        self.times = np.array([e["t"] for e in entries], dtype=np.int64)
+        try:
+            self.countries = json.loads((self.root / COUNTRIES).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.countries = []
+        self._country_codes = {c: i for i, c in enumerate(self.countries)}
+
+    def __len__(self):
+        return len(self.entries)
+
+    # ----- append -----
+    def append(self, data):
+        """Append an OpenSky /states/all answer; False if its time is not new."""
+        return self.append_columns(data["time"], columns_from_states(data.get("states") or []))
+
+    def append_columns(self, t, cols):
+        t = int(t)
+        with self._lock:
+            if len(self.times) and t <= self.times[-1]:
+                return False
+            order = np.argsort(cols["icao24"], kind="stable")
+            names = cols["origin_country"]
+            new = [c for c in dict.fromkeys(names.tolist()) if c not in self._country_codes]
+            if new:
+                for c in new:
+                    self._country_codes[c] = len(self.countries)
+                    self.countries.append(c)
+                tmp = self.root / (COUNTRIES + ".tmp")
+                tmp.write_text(json.dumps(self.countries), encoding="utf-8")
+                os.replace(tmp, self.root / COUNTRIES)
+
+            part = f"p{t - t % self.partition_s}"
+            pdir = self.root / part
+            pdir.mkdir(exist_ok=True)
+            offset = sum(e["rows"] for e in self.entries if e["part"] == part)
+            rows = len(order)
+            for name, _, _ in SCHEMA:
+                if name == "origin_country":
+                    col = np.fromiter((self._country_codes[c] for c in names), dtype=DTYPES[name],
+                                      count=rows)
+                else:
+                    col = np.asarray(cols[name], dtype=DTYPES[name])
+                with open(pdir / f"{name}.bin", "ab") as f:
+                    # drop bytes of an append that never reached the index
+                    f.truncate(offset * DTYPES[name].itemsize)
+                    f.write(np.ascontiguousarray(col[order]).tobytes())
+            entry = {"t": t, "part": part, "offset": offset, "rows": rows}
+            with open(self.root / INDEX, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            self.entries.append(entry)
+            self.times = np.append(self.times, t)
+            self._maps = {k: v for k, v in self._maps.items() if k[0] != part}
+            return True
+
+    # ----- queries -----
+    def _column(self, part, name, end):
+        key = (part, name)
+        m = self._maps.get(key)
+        if m is None or len(m) < end:
+            m = np.memmap(self.root / part / f"{name}.bin", dtype=DTYPES[name], mode="r")
+            self._maps[key] = m
+        return m
+
+    def snapshot(self, i):
+        e = self.entries[i]
+        lo, hi = e["offset"], e["offset"] + e["rows"]
+        cols = {name: self._column(e["part"], name, hi)[lo:hi] if e["rows"] else
+                np.empty(0, DTYPES[name]) for name, _, _ in SCHEMA}
+        return Snapshot(e["t"], cols, self.countries)
+
+    def index_at(self, t):
+        """Index of the last snapshot at or before t (None if before the first)."""
+        i = int(np.searchsorted(self.times, t, side="right")) - 1
+        return i if i >= 0 else None
+
+    def at(self, t):
+        """State at time t: the latest snapshot taken at or before t."""
+        i = self.index_at(t)
+        return None if i is None else self.snapshot(i)
+
+    def snapshots(self, t0=None, t1=None):
+        lo = 0 if t0 is None else int(np.searchsorted(self.times, t0, side="left"))
+        hi = len(self.times) if t1 is None else int(np.searchsorted(self.times, t1, side="right"))
+        for i in range(lo, hi):
+            yield self.snapshot(i)
+
+    def track(self, icao24, t0=None, t1=None,
+              fields=("longitude", "latitude", "baro_altitude", "velocity", "true_track")):
+        """{"time": ..., field: ...} arrays of one aircraft over [t0, t1]."""
+        times, rows = [], {f: [] for f in fields}
+        for snap in self.snapshots(t0, t1):
+            i = snap.find(icao24)
+            if i is None:
+                continue
+            times.append(snap.time)
+            for f in fields:
+                rows[f].append(snap[f][i])
+        out = {"time": np.array(times, dtype=np.int64)}
+        out.update({f: np.array(v, dtype=DTYPES[f]) for f, v in rows.items()})
+        return out
+
+    def info(self):
+        size = sum(p.stat().st_size for p in self.root.glob("p*/*.bin"))
+        return {
+            "root": str(self.root),
+            "snapshots": len(self.entries),
+            "rows": sum(e["rows"] for e in self.entries),
+            "partitions": len({e["part"] for e in self.entries}),
+            "first": int(self.times[0]) if len(self.times) else None,
+            "last": int(self.times[-1]) if len(self.times) else None,
+            "countries": len(self.countries),
+            "size_mb": round(size / 1e6, 2),
+        }
+
+
+def snapshot_from_json(data):
+    """Standalone Snapshot of one /states/all answer (local country dictionary)."""
+    cols = columns_from_states(data.get("states") or [])
+    countries, codes = np.unique(cols["origin_country"].astype(str), return_inverse=True)
+    cols["origin_country"] = codes.astype(DTYPES["origin_country"])
+    order = np.argsort(cols["icao24"], kind="stable")
+    return Snapshot(data.get("time") or 0, {k: v[order] for k, v in cols.items()},
+                    countries.tolist())
+
+
+# ====== Replay ======
+
+
+class Replay:
+    """
+    Historical traffic at `speed`× real time: the simulated clock starts
+    at `start` (default: first snapshot) when the Replay is created and
+    loops over [start, end] when `loop` is set.
+    """
+
+    def __init__(self, store, speed=1.0, start=None, end=None, loop=True, clock=time.monotonic):
+        if not len(store):
+            raise ValueError("empty snapshot store")
+        self.store = store
+        self.speed = float(speed)
+        self.start = int(store.times[0] if start is None else start)
+        self.end = int(store.times[-1] if end is None else end)
+        self.loop = loop
+        self.clock = clock
+        self.t_wall = clock()
+        self._cache = (None, None)
+
+    def sim_time(self, now=None):
+        elapsed = ((self.clock() if now is None else now) - self.t_wall) * self.speed
+        span = self.end - self.start
+        if self.loop and span > 0:
+            elapsed %= span + 1
+        return min(self.start + elapsed, self.end)
+
+    def current(self):
+        """Snapshot due at the current simulated time (cached until it changes)."""
+        i = self.store.index_at(self.sim_time())
+        if i is None:
+            return None
+        if self._cache[0] != i:
+            self._cache = (i, self.store.snapshot(i))
+        return self._cache[1]
+
+    def stats(self):
+        snap = self.current()
+        return {"speed": self.speed, "sim_time": round(self.sim_time(), 1),
+                "snapshot_time": snap.time if snap else None,
+                "aircraft": len(snap) if snap else 0, "range": [self.start, self.end]}
+
+
+class TrafficSource:
+    """
+    Current traffic for the apps: replayed from a snapshot store when
+    `replay_dir` is set, else `fetch()` (live OpenSky JSON, e.g.
+    data_sources.fetch_opensky_states), else the recorded fixture.
+    Conversions are cached per snapshot time.
+    """
+
+    def __init__(self, replay_dir=None, speed=1.0, fetch=None, fixture=FIXTURE, refresh=10.0):
+        self.replay = Replay(SnapshotStore(replay_dir), speed=speed) if replay_dir else None
+        self.fetch = fetch
+        self.fixture = fixture
+        self.refresh = refresh
+        self.source = None
+        self._last = None
+        self._fixture = None
+        self._checked = -float("inf")
+        self._lock = threading.Lock()
+
+    def current(self):
+        if self.replay is not None:
+            self.source = "replay"
+            return self.replay.current()
+        with self._lock:
+            # fetch() reads (and may download) a full JSON answer: at most
+            # once per `refresh` seconds, callers share the converted snapshot
+            now = time.monotonic()
+            if self._last is not None and now - self._checked < self.refresh:
+                return self._last
+            self._checked = now
+            data = None
+            if self.fetch is not None:
+                try:
+                    data = self.fetch()
+                except Exception:
+                    data = None
+                self.source = "opensky" if data else None
+            if not data and self.fixture and os.path.exists(self.fixture):
+                if self._fixture is None:
+                    self._fixture = load_fixture(self.fixture)
+                data = self._fixture
+                self.source = "fixture"
+            if not data:
+                return self._last
+            if self._last is None or self._last.time != int(data.get("time") or 0):
+                self._last = snapshot_from_json(data)
+            return self._last
+
+    def stats(self):
+        snap = self.current()
+        out = {"source": self.source, "time": snap.time if snap else None,
+               "aircraft": len(snap) if snap else 0,
+               "airborne": int((np.asarray(snap["on_ground"]) == 0).sum()) if snap else 0}
+        if self.replay is not None:
+            out["replay"] = self.replay.stats()
+        return out
+
+
+# ====== Fixtures ======
+
+
+def synthesize(data, count, interval=10):
+    """
+    `count` successive (time, columns) snapshots dead-reckoned from one
+    OpenSky answer: airborne aircraft move velocity × dt along true_track
+    and climb vertical_rate × dt.
+    """
+    cols = columns_from_states(data.get("states") or [])
+    lat0 = cols["latitude"].astype(np.float64)
+    lon0 = cols["longitude"].astype(np.float64)
+    alt0 = cols["baro_altitude"].astype(np.float64)
+    airborne = cols["on_ground"] == 0
+    v = np.where(airborne, np.nan_to_num(cols["velocity"].astype(np.float64)), 0.0)
+    trk = np.radians(np.nan_to_num(cols["true_track"].astype(np.float64)))
+    vr = np.where(airborne, np.nan_to_num(cols["vertical_rate"].astype(np.float64)), 0.0)
+    coslat = np.maximum(np.cos(np.radians(lat0)), 1e-6)
+    for k in range(count):
+        dt = k * interval
+        out = dict(cols)
+        lat = lat0 + v * dt * np.cos(trk) / EARTH_M_PER_DEG
+        lon = lon0 + v * dt * np.sin(trk) / (EARTH_M_PER_DEG * coslat)
+        out["latitude"] = np.clip(lat, -90.0, 90.0).astype(np.float32)
+        out["longitude"] = (((lon + 180.0) % 360.0) - 180.0).astype(np.float32)
+        out["baro_altitude"] = np.maximum(alt0 + vr * dt, 0.0).astype(np.float32)
+        for f in ("time_position", "last_contact"):
+            out[f] = np.where(cols[f] >= 0, cols[f] + dt, -1)
+        yield int(data["time"]) + dt, out
+
+
+def load_fixture(path=FIXTURE):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ====== CLI ======
+
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description="OpenSky snapshot store")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("import", help="append recorded /states/all JSON files")
+    p.add_argument("store")
+    p.add_argument("files", nargs="*", default=[str(FIXTURE)])
+    p.add_argument("--synthesize", type=int, default=0, metavar="N",
+                   help="dead-reckon each file into N snapshots")
+    p.add_argument("--interval", type=int, default=10, help="seconds between synthetic snapshots")
+    p = sub.add_parser("record", help="fetch live snapshots (network)")
+    p.add_argument("store")
+    p.add_argument("--count", type=int, default=10)
+    p.add_argument("--every", type=float, default=10.0)
+    p = sub.add_parser("info")
+    p.add_argument("store")
+    p = sub.add_parser("at", help="state at time T")
+    p.add_argument("store")
+    p.add_argument("t", type=int)
+    p = sub.add_parser("track", help="positions of one icao24 over [t0, t1]")
+    p.add_argument("store")
+    p.add_argument("icao24")
+    p.add_argument("t0", type=int, nargs="?")
+    p.add_argument("t1", type=int, nargs="?")
+    p = sub.add_parser("replay")
+    p.add_argument("store")
+    p.add_argument("--speed", type=float, default=10.0)
+    p.add_argument("--seconds", type=float, default=5.0)
+    args = ap.parse_args(argv)
+
+    store = SnapshotStore(args.store)
+    if args.cmd == "import":
+        t0 = time.perf_counter()
+        added = 0
+        for path in args.files:
+            data = load_fixture(path)
+            if args.synthesize:
+                added += sum(store.append_columns(t, c)
+                             for t, c in synthesize(data, args.synthesize, args.interval))
+            else:
+                added += store.append(data)
+        print(f"[OPENSKY] {added} snapshot(s) appended in {time.perf_counter() - t0:.2f}s")
+        print(f"[OPENSKY] {store.info()}")
+    elif args.cmd == "record":
+        from data_sources import fetch_opensky_states
+        for k in range(args.count):
+            data = fetch_opensky_states(cache_max_age=0)
+            ok = bool(data) and store.append(data)
+            print(f"[OPENSKY] {k + 1}/{args.count} {'appended' if ok else 'skipped'}")
+            time.sleep(args.every)
+    elif args.cmd == "info":
+        print(json.dumps(store.info(), indent=1))
+    elif args.cmd == "at":
+        t0 = time.perf_counter()
+        snap = store.at(args.t)
+        ms = (time.perf_counter() - t0) * 1000.0
+        if snap is None:
+            raise SystemExit("no snapshot at or before that time")
+        airborne = int((np.asarray(snap["on_ground"]) == 0).sum())
+        print(f"[OPENSKY] snapshot {snap.time}: {len(snap)} aircraft ({airborne} airborne), "
+              f"lookup {ms:.2f} ms")
+    elif args.cmd == "track":
+        t0 = time.perf_counter()
+        tr = store.track(args.icao24, args.t0, args.t1)
+        ms = (time.perf_counter() - t0) * 1000.0
+        for k, t in enumerate(tr["time"]):
+            print(f"  {t}  lat {tr['latitude'][k]:9.4f}  lon {tr['longitude'][k]:9.4f}  "
+                  f"alt {tr['baro_altitude'][k]:8.0f} m  {tr['velocity'][k]:6.1f} m/s")
+        print(f"[OPENSKY] {len(tr['time'])} points in {ms:.2f} ms")
+    elif args.cmd == "replay":
+        rp = Replay(store, speed=args.speed)
+        end = time.monotonic() + args.seconds
+        last = None
+        while time.monotonic() < end:
+            snap = rp.current()
+            if snap is not None and snap.time != last:
+                last = snap.time
+                print(f"[REPLAY] sim {rp.sim_time():.0f} → snapshot {snap.time} ({len(snap)} aircraft)")
+            time.sleep(0.05)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+output_index.py
+SQLite index of rendered videos (one row per file path, upserted).
+
+render_one_video records each finished file (sequence params, size,
+duration, sha256) so server.py can answer /last and /videos without
+listing and stat-ing the whole output directory on every request.
+The index lives next to the videos (OUT_DIR/index.sqlite3 by default).
+
+It is not append-only: re-rendering a path replaces its row
+(INSERT OR REPLACE, new id), and last() deletes rows whose file is gone.
+"""
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+
+INDEX_NAME = os.getenv("OUT_INDEX", "index.sqlite3")
+VIDEO_EXTS = (".mp4", ".gif")
+
+_NAME_RE = re.compile(
+    r"animation_(?P<direction>[a-z]+)_(?P<distance>\d+)km_(?P<pax>\d+)pax_.*\.(mp4|gif)$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    path       TEXT UNIQUE NOT NULL,
+    name       TEXT NOT NULL,
+    fmt        TEXT NOT NULL,
+    direction  TEXT,
+    distance   INTEGER,
+    pax        INTEGER,
+    frames     INTEGER,
+    fps        REAL,
+    duration_s REAL,
+    size       INTEGER,
+    sha256     TEXT,
+    created    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS videos_created ON videos (created);
+CREATE INDEX IF NOT EXISTS videos_dir_created ON videos (direction, created);
+"""
+
+COLUMNS = ("id", "path", "name", "fmt", "direction", "distance", "pax",
+           "frames", "fps", "duration_s", "size", "sha256", "created")
+
+
+def file_sha256(path, chunk=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class OutputIndex:
+    def __init__(self, out_dir, name=INDEX_NAME):
+        self.out_dir = out_dir
+        self.path = os.path.join(out_dir, name)
+        os.makedirs(out_dir, exist_ok=True)
+        fresh = not os.path.exists(self.path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        if fresh:
+            self.rebuild()
+
+    # ----- writes -----
+    def add(self, path, direction=None, distance=None, pax=None,
+            frames=None, fps=None, sha256=None):
+        """Record one finished video (replacing any row for the same path); returns its id."""
+        st = os.stat(path)
+        duration = (frames / fps) if frames and fps else None
+        row = (os.path.abspath(path), os.path.basename(path),
+               os.path.splitext(path)[1].lstrip(".").lower(),
+               direction, distance, pax, frames, fps, duration,
+               st.st_size, sha256 or file_sha256(path), st.st_mtime)
+        with self._lock, self._db:
+            cur = self._db.execute(
+                "INSERT OR REPLACE INTO videos (path, name, fmt, direction, distance, pax,"
+                " frames, fps, duration_s, size, sha256, created)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+            return cur.lastrowid
+
+    def rebuild(self):
+        """One-off scan to index videos rendered before the index existed."""
+        n = 0
+        for entry in os.scandir(self.out_dir):
+            if not entry.name.endswith(VIDEO_EXTS):
+                continue
+            m = _NAME_RE.match(entry.name)
+            self.add(entry.path,
+                     direction=m["direction"] if m else None,
+                     distance=int(m["distance"]) if m else None,
+                     pax=int(m["pax"]) if m else None)
+            n += 1
+        return n
+
+    def _forget(self, vid):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM videos WHERE id = ?", (vid,))
+
+    # ----- reads -----
+    def _rows(self, sql, args):
+        with self._lock:
+            cur = self._db.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM videos {sql}", args)
+            return [dict(zip(COLUMNS, r)) for r in cur.fetchall()]
+
+    def list(self, direction=None, distance=None, pax=None, limit=50, offset=0):
+        where, args = [], []
+        for col, val in (("direction", direction), ("distance", distance), ("pax", pax)):
+            if val is not None:
+                where.append(f"{col} = ?")
+                args.append(val)
+        sql = ("WHERE " + " AND ".join(where)) if where else ""
+        return self._rows(f"{sql} ORDER BY created DESC, id DESC LIMIT ? OFFSET ?",
+                          args + [int(limit), int(offset)])
+
+    def get(self, vid):
+        rows = self._rows("WHERE id = ?", (int(vid),))
+        return rows[0] if rows else None
+
+    def last(self, direction=None):
+        """Most recent video whose file still exists (stale rows are dropped)."""
+        for _ in range(8):
+            rows = self.list(direction=direction, limit=1)
+            if not rows:
+                return None
+            if os.path.exists(rows[0]["path"]):
+                return rows[0]
+            self._forget(rows[0]["id"])
+        return None
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+
+
+_INDEXES = {}
+
+
+def get_index(out_dir):
+    """One shared OutputIndex per output directory."""
+    key = os.path.abspath(out_dir)
+    if key not in _INDEXES:
+        _INDEXES[key] = OutputIndex(out_dir)
+    return _INDEXES[key]
+
+
+if __name__ == "__main__":
+    import sys
+    idx = get_index(sys.argv[1] if len(sys.argv) > 1 else os.getenv("OUT_DIR", "/out"))
+    t0 = time.perf_counter()
+    print(f"index: {len(idx)} videos, last={idx.last()}  ({(time.perf_counter() - t0) * 1000:.1f} ms)")
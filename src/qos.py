@@ -0,0 +1,170 @@
+"""
+qos.py
+Adaptive quality-of-service for the live stream.
+
+A small controller watches the measured render time per frame and the number
+of viewers / render channels, and moves between quality tiers (dpi, FPS,
+interpolation substeps) to keep the render load inside a latency budget.
+Separate up/down thresholds plus a minimum dwell time give hysteresis so
+the tier does not oscillate.
+"""
+import os
+import time
+import threading
+from collections import deque
+
+# ====== Settings ======
+QOS_ENABLED = os.getenv("QOS", "1") == "1"
+# Max render time per frame (ms) before we step down
+QOS_BUDGET_MS = float(os.getenv("QOS_BUDGET_MS", "120"))
+# Worker utilisation thresholds (fraction of RENDER_WORKERS busy)
+QOS_HIGH = float(os.getenv("QOS_HIGH", "0.85"))
+QOS_LOW = float(os.getenv("QOS_LOW", "0.45"))
+# Minimum seconds between two tier changes
+QOS_DWELL = float(os.getenv("QOS_DWELL", "5"))
+# Smoothing factor of the frame-time moving average
+QOS_ALPHA = float(os.getenv("QOS_ALPHA", "0.2"))
+
+
+class Tier:
+    __slots__ = ("name", "dpi", "fps", "substeps")
+
+    def __init__(self, name, dpi, fps, substeps):
+        self.name = name
+        self.dpi = dpi
+        self.fps = fps
+        self.substeps = substeps
+
+    def to_dict(self):
+        return {"name": self.name, "dpi": self.dpi,
+                "fps": self.fps, "substeps": self.substeps}
+
+
+def default_tiers(max_dpi=150, max_fps=30, max_substeps=4):
+    """Tier ladder from best (index 0) to cheapest."""
+    return [
+        Tier("full", max_dpi, max_fps, max_substeps),
+        Tier("high", min(max_dpi, 110), min(max_fps, 20),
+             max(1, min(max_substeps, 3))),
+        Tier("medium", min(max_dpi, 90), min(max_fps, 15),
+             max(1, min(max_substeps, 2))),
+        Tier("low", min(max_dpi, 75), min(max_fps, 10),
+             max(1, min(max_substeps, 2))),
+        Tier("minimal", min(max_dpi, 60), min(max_fps, 5), 1),
+    ]
+
+
+class QoSController:
+    """
+    Chooses the current tier from observed load.
+
+    load = frame_time * fps * channels / workers, i.e. the fraction of the
+    render pool kept busy. We step down when load > QOS_HIGH or a frame
+    exceeds the budget, and step up only when the *projected* load of the
+    next better tier stays under QOS_LOW. Nothing moves without viewers.
+    """
+
+    def __init__(self, tiers, workers=1, budget_ms=QOS_BUDGET_MS,
+                 high=QOS_HIGH, low=QOS_LOW, dwell=QOS_DWELL,
+                 alpha=QOS_ALPHA, enabled=QOS_ENABLED):
+        self.tiers = tiers
+        self.workers = max(1, workers)
+        self.budget = budget_ms / 1000.0
+        self.high = high
+        self.low = low
+        self.dwell = dwell
+        self.alpha = alpha
+        self.enabled = enabled
+        self.index = 0
+        self.pinned = None
+        self.frame_time = None
+        self.viewers = 0
+        self.channels = 0
+        self.changed_at = 0.0
+        self.history = deque(maxlen=20)
+        self._lock = threading.Lock()
+
+    @property
+    def current(self):
+        i = self.pinned if self.pinned is not None else self.index
+        return self.tiers[i]
+
+    def load(self, tier=None, frame_time=None):
+        tier = tier or self.tiers[self.index]
+        ft = self.frame_time if frame_time is None else frame_time
+        if ft is None:
+            return 0.0
+        return ft * tier.fps * max(1, self.channels) / self.workers
+
+    def set_audience(self, viewers, channels):
+        self.viewers = viewers
+        self.channels = channels
+
+    def observe(self, seconds, dpi=None):
+        """Feed one measured render time; may change the tier."""
+        with self._lock:
+            # Normalise to the current tier's dpi (cost ~ pixel count)
+            cur = self.tiers[self.index]
+            if dpi:
+                seconds *= (cur.dpi / float(dpi)) ** 2
+            if self.frame_time is None:
+                self.frame_time = seconds
+            else:
+                self.frame_time += self.alpha * (seconds - self.frame_time)
+            if self.enabled and self.pinned is None:
+                self._decide()
+
+    def _decide(self):
+        now = time.monotonic()
+        # no viewer, no latency to protect (e.g. warm-up frames)
+        if self.viewers <= 0 or now - self.changed_at < self.dwell:
+            return
+        cur = self.tiers[self.index]
+        if self.index < len(self.tiers) - 1 and (
+                self.load() > self.high or self.frame_time > self.budget):
+            self._move(self.index + 1, now)
+        elif self.index > 0:
+            up = self.tiers[self.index - 1]
+            # Render cost scales with pixel count
+            ft_up = self.frame_time * (up.dpi / float(cur.dpi)) ** 2
+            if ft_up < self.budget and self.load(up, ft_up) < self.low:
+                self._move(self.index - 1, now)
+
+    def _move(self, index, now):
+        old, new = self.tiers[self.index], self.tiers[index]
+        frame_ms = round(self.frame_time * 1000.0, 1)
+        self.index = index
+        self.changed_at = now
+        # keep the average in the new tier's units, like observe() does
+        self.frame_time *= (new.dpi / float(old.dpi)) ** 2
+        self.history.append({
+            "t": time.time(), "from": old.name, "to": new.name,
+            "frame_ms": frame_ms,
+            "viewers": self.viewers, "channels": self.channels,
+        })
+
+    def pin(self, name):
+        """Force a tier by name, or return to automatic with 'auto'."""
+        if name == "auto":
+            self.pinned = None
+            return True
+        for i, t in enumerate(self.tiers):
+            if t.name == name:
+                self.pinned = i
+                return True
+        return False
+
+    def to_dict(self):
+        return {
+            "enabled": self.enabled,
+            "mode": "auto" if self.pinned is None else "pinned",
+            "tier": self.current.to_dict(),
+            "tiers": [t.to_dict() for t in self.tiers],
+            "frame_ms": (round(self.frame_time * 1000.0, 1)
+                         if self.frame_time is not None else None),
+            "load": round(self.load(), 3),
+            "budget_ms": self.budget * 1000.0,
+            "viewers": self.viewers,
+            "channels": self.channels,
+            "history": list(self.history),
+        }
@@ -0,0 +1,128 @@
+"""
+render_cache.py
+Content-addressed cache of rendered videos.
+
+A render is fully determined by its sequence (direction, distance, pax),
+the aircraft table, the render settings (FPS, dpi, INTERVAL_MS, wind
+steps, format) and the rendering code itself. We hash all of that into a
+key; a repeat render of the same key is served by hard-linking the cached
+artifact instead of re-encoding. The cache has a disk budget and evicts
+least-recently-used entries (mtime is refreshed on every hit). Entries
+still hard-linked from an output (st_nlink > 1) share its disk blocks:
+they neither count against the budget nor get evicted, since removing
+them would free nothing.
+"""
+import os
+import json
+import shutil
+import hashlib
+import pathlib
+
+RENDER_CACHE = os.getenv("RENDER_CACHE", "1") == "1"
+RENDER_CACHE_DIR = os.getenv("RENDER_CACHE_DIR", "")         # default: OUT_DIR/.cas
+RENDER_CACHE_MB = float(os.getenv("RENDER_CACHE_MB", "2048"))
+
+_HERE = pathlib.Path(__file__).resolve().parent
+# Source files whose changes invalidate cached renders
+CODE_FILES = ("snapsac_render.py", "fleet_plot.py", "fuel_model.py", "catalog.py",
+              "gif_encoder.py")
+
+
+def code_version(files=CODE_FILES):
+    h = hashlib.sha256()
+    for name in files:
+        try:
+            h.update((_HERE / name).read_bytes())
+        except OSError:
+            h.update(name.encode())
+    return h.hexdigest()[:16]
+
+
+_CODE_VERSION = None
+
+
+def render_key(seq, catalog, settings):
+    """Hex digest identifying one render."""
+    global _CODE_VERSION
+    if _CODE_VERSION is None:
+        _CODE_VERSION = code_version()
+    h = hashlib.sha256()
+    h.update(json.dumps({"seq": seq, "settings": settings, "code": _CODE_VERSION},
+                        sort_keys=True, default=str).encode())
+    h.update(catalog.fingerprint())
+    return h.hexdigest()
+
+
+def _link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+class RenderCache:
+    def __init__(self, root, budget_mb=RENDER_CACHE_MB):
+        self.root = root
+        self.budget = int(budget_mb * 1024 * 1024)
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key, ext):
+        return os.path.join(self.root, f"{key}.{ext}")
+
+    def lookup(self, key, ext):
+        """Cached artifact path or None; a hit refreshes its LRU stamp."""
+        path = self._path(key, ext)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def materialize(self, key, ext, dest):
+        """Hard-link (or copy) a cached artifact to `dest`; False on miss."""
+        src = self.lookup(key, ext)
+        if src is None:
+            return False
+        _link_or_copy(src, dest)
+        return True
+
+    def store(self, key, ext, src):
+        """Add a freshly rendered file, then enforce the disk budget."""
+        path = self._path(key, ext)
+        tmp = path + ".tmp"
+        _link_or_copy(src, tmp)
+        os.replace(tmp, path)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        """Drop least-recently-used entries the cache alone holds until under budget."""
+        entries = []
+        total = 0
+        for e in os.scandir(self.root):
+            if e.is_file() and not e.name.endswith(".tmp"):
+                st = e.stat()
+                if st.st_nlink > 1:
+                    continue
+                entries.append((st.st_mtime, st.st_size, e.path))
+                total += st.st_size
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.budget:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+
+def get_cache(out_dir):
+    """Cache for an output dir, or None when disabled (RENDER_CACHE=0)."""
+    if not RENDER_CACHE:
+        return None
+    return RenderCache(RENDER_CACHE_DIR or os.path.join(out_dir, ".cas"))
@@ -0,0 +1,220 @@
+"""
+route.py
+Fuel and time along a great-circle route, segment by segment.
+
+calcule_etat flies one `distance` in one wind. Here the origin →
+destination great circle is cut into N segments; each segment takes the
+wind at its midpoint (a constant wind, or a wind_field.WindField), split
+into head / cross components against the segment's heading, and the
+model is integrated over segments for every aircraft at once — one
+fuel_model.evaluate_each call on an (n_aircraft, n_segments) grid.
+
+Results are memoized per (route, pax, catalog, wind snapshot): comparing
+routes or aircraft again under the same wind costs a dict lookup.
+
+    python route.py CDG JFK --pax 180 [--segments 64] [--wind 80 --wind-from 270]
+    python route.py CDG JFK LHR:DXB --field       # several routes, gridded wind
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import fuel_model
+from traffic_fuel import wind_components
+
+ROUTE_SEGMENTS = int(os.getenv("ROUTE_SEGMENTS", "64"))
+ROUTE_CACHE = int(os.getenv("ROUTE_CACHE", "256"))
+EARTH_RADIUS_KM = 6371.0
+
+AIRPORTS = {
+    "CDG": (49.0097, 2.5479), "ORY": (48.7262, 2.3652), "LHR": (51.4700, -0.4543),
+    "FRA": (50.0379, 8.5622), "AMS": (52.3105, 4.7683), "MAD": (40.4983, -3.5676),
+    "JFK": (40.6413, -73.7781), "LAX": (33.9416, -118.4085), "ATL": (33.6407, -84.4277),
+    "DXB": (25.2532, 55.3657), "SIN": (1.3644, 103.9915), "HND": (35.5494, 139.7798),
+    "SYD": (-33.9399, 151.1753), "GRU": (-23.4356, -46.4731), "JNB": (-26.1392, 28.2460),
+}
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+cache_stats = {"hits": 0, "misses": 0}
+
+
+def airport(code):
+    """(lat, lon) of an AIRPORTS code or of a "lat,lon" string."""
+    key = code.strip().upper()
+    if key in AIRPORTS:
+        return AIRPORTS[key]
+    try:
+        lat, lon = (float(x) for x in code.split(","))
+    except ValueError:
+        raise ValueError(f"unknown airport {code!r} (use an AIRPORTS code or lat,lon)")
+    return lat, lon
+
+
+def _unit(lat, lon):
+    la, lo = np.radians(lat), np.radians(lon)
+    return np.stack([np.cos(la) * np.cos(lo), np.cos(la) * np.sin(lo), np.sin(la)], axis=-1)
+
+
+def _latlon(p):
+    return (np.degrees(np.arctan2(p[..., 2], np.hypot(p[..., 0], p[..., 1]))),
+            np.degrees(np.arctan2(p[..., 1], p[..., 0])))
+
+
+def great_circle(origin, destination, segments=ROUTE_SEGMENTS):
+    """
+    Segments of the great circle origin → destination:
+    {"lat", "lon"} of the segments+1 waypoints, and per segment
+    "mid_lat", "mid_lon", "length_km", "heading" (true track at midpoint).
+    """
+    a, b = _unit(*origin), _unit(*destination)
+    omega = np.arccos(np.clip(np.dot(a, b), -1.0, 1.0))
+    if omega < 1e-9:
+        raise ValueError("origin and destination coincide")
+    if np.pi - omega < 1e-9:
+        raise ValueError("antipodal endpoints: great circle undefined")
+
+    def slerp(f):
+        f = np.asarray(f)[..., None]
+        return (np.sin((1 - f) * omega) * a + np.sin(f * omega) * b) / np.sin(omega)
+
+    lat, lon = _latlon(slerp(np.linspace(0.0, 1.0, segments + 1)))
+    mid_lat, mid_lon = _latlon(slerp((np.arange(segments) + 0.5) / segments))
+    # heading at the midpoint: bearing towards the segment end
+    la1, la2 = np.radians(mid_lat), np.radians(lat[1:])
+    dlon = np.radians(lon[1:] - mid_lon)
+    heading = np.degrees(np.arctan2(np.sin(dlon) * np.cos(la2),
+                                    np.cos(la1) * np.sin(la2)
+                                    - np.sin(la1) * np.cos(la2) * np.cos(dlon))) % 360.0
+    return {
+        "lat": lat, "lon": lon, "mid_lat": mid_lat, "mid_lon": mid_lon,
+        "length_km": np.full(segments, omega * EARTH_RADIUS_KM / segments),
+        "heading": heading,
+    }
+
+
+def _wind_key(wind):
+    if wind is None:
+        return ("calm",)
+    if hasattr(wind, "at"):
+        return ("field", id(wind), wind.time)
+    return ("const",) + tuple(float(x) for x in wind)
+
+
+def segment_winds(geom, wind=None):
+    """(speed km/h, from °) per segment: `wind` is None, (speed, from) or a WindField."""
+    n = len(geom["heading"])
+    if wind is None:
+        return np.zeros(n), np.zeros(n)
+    if hasattr(wind, "at"):
+        return wind.at(geom["mid_lat"], geom["mid_lon"])
+    speed, from_deg = wind
+    return np.full(n, float(speed)), np.full(n, float(from_deg))
+
+
+def evaluate(catalog, origin, destination, pax, wind=None, segments=ROUTE_SEGMENTS):
+    """
+    Route totals per aircraft: {"distance_km", "conso_L", "conso_L_pax",
+    "duree_h", "mean_head_kmh"} (arrays over the catalog, NaN where pax >
+    max_pax) plus the segment geometry. Memoized per wind snapshot;
+    treat the arrays as read-only.
+    """
+    origin, destination = tuple(origin), tuple(destination)
+    key = (origin, destination, int(segments), float(pax), catalog.fingerprint(), _wind_key(wind))
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            cache_stats["hits"] += 1
+            return _cache[key]
+        cache_stats["misses"] += 1
+
+    geom = great_circle(origin, destination, segments)
+    speed, from_deg = segment_winds(geom, wind)
+    head, cross = wind_components(geom["heading"], speed, from_deg)
+    ids = catalog.ids[:, None]
+    e = fuel_model.evaluate_each(catalog, ids, head[None, :], cross[None, :], pax)
+    seg_km = geom["length_km"][None, :]
+    conso_L = (e["conso_km"] * seg_km).sum(axis=1)
+    out = {
+        "distance_km": float(geom["length_km"].sum()),
+        "conso_L": conso_L,
+        "conso_L_pax": conso_L / pax,
+        "duree_h": (seg_km / e["vitesse"]).sum(axis=1),
+        "mean_head_kmh": float(np.average(head, weights=geom["length_km"])),
+        "geometry": geom,
+    }
+    for k in ("conso_L", "conso_L_pax", "duree_h"):
+        out[k].flags.writeable = False
+
+    with _cache_lock:
+        _cache[key] = out
+        while len(_cache) > max(ROUTE_CACHE, 1):
+            _cache.popitem(last=False)
+    return out
+
+
+def best(catalog, result, metric="conso_L_pax"):
+    """Name of the aircraft minimizing `metric` on a route, or None."""
+    vals = result[metric]
+    if not np.isfinite(vals).any():
+        return None
+    return catalog.names[int(np.nanargmin(vals))]
+
+
+def compare(catalog, routes, pax, wind=None, segments=ROUTE_SEGMENTS):
+    """[(origin_code, destination_code, result)] for several routes under one wind."""
+    return [(o, d, evaluate(catalog, airport(o), airport(d), pax, wind, segments))
+            for o, d in routes]
+
+
+def main(argv=None):
+    import argparse
+    import time
+    from catalog import load_catalog
+    ap = argparse.ArgumentParser(description="Fuel / time along great-circle routes")
+    ap.add_argument("origin")
+    ap.add_argument("destination")
+    ap.add_argument("more", nargs="*", help="extra routes as ORIG:DEST")
+    ap.add_argument("--pax", type=int, default=180)
+    ap.add_argument("--segments", type=int, default=ROUTE_SEGMENTS)
+    ap.add_argument("--wind", type=float, help="constant wind speed, km/h")
+    ap.add_argument("--wind-from", type=float, default=270.0)
+    ap.add_argument("--field", action="store_true", help="use the gridded wind field")
+    args = ap.parse_args(argv)
+
+    cat = load_catalog()
+    wind = None
+    if args.field:
+        from wind_field import current_field
+        wind = current_field()
+        if wind is None:
+            raise SystemExit("wind field unavailable")
+    elif args.wind is not None:
+        wind = (args.wind, args.wind_from)
+    routes = [(args.origin, args.destination)] + [tuple(r.split(":", 1)) for r in args.more]
+    if any(len(r) != 2 for r in routes):
+        raise SystemExit("extra routes must be ORIG:DEST")
+
+    t0 = time.perf_counter()
+    try:
+        results = compare(cat, routes, args.pax, wind, args.segments)
+    except ValueError as e:                     # unknown airport, degenerate route
+        raise SystemExit(str(e))
+    t_cold = (time.perf_counter() - t0) * 1000.0
+    t0 = time.perf_counter()
+    compare(cat, routes, args.pax, wind, args.segments)
+    t_warm = (time.perf_counter() - t0) * 1000.0
+    for o, d, r in results:
+        print(f"{o} → {d}: {r['distance_km']:.0f} km, mean headwind {r['mean_head_kmh']:+.1f} km/h, "
+              f"best {best(cat, r)}")
+        for i, name in enumerate(cat.names):
+            print(f"  {name:6s} {r['conso_L'][i]:10.0f} L  {r['conso_L_pax'][i]:8.1f} L/pax  "
+                  f"{r['duree_h'][i]:6.2f} h")
+    print(f"[ROUTE] {len(routes)} route(s) × {args.segments} segments × {len(cat)} aircraft: "
+          f"{t_cold:.2f} ms, cached {t_warm:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
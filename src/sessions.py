@@ -0,0 +1,244 @@
+"""
+sessions.py
+Per-viewer animation state and a bounded, shared render pool for app_web.
+
+Each browser gets a small session record (direction lock, FPS, resolution,
+position in the stream). Sessions with the same configuration subscribe to
+the same render "channel": a frame is rendered once per channel and handed
+to every viewer of that channel, so N viewers on K distinct configurations
+cost K renders, not N.
+"""
+import os
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# ====== Settings ======
+RENDER_WORKERS = max(1, int(os.getenv("RENDER_WORKERS", "4")))
+SESSION_TTL = float(os.getenv("SESSION_TTL", "120"))    # s without a request
+CHANNEL_TTL = float(os.getenv("CHANNEL_TTL", "60"))     # s without a viewer
+
+FPS_CHOICES = (5, 10, 15, 20, 30)
+RESOLUTIONS = {"low": 75, "medium": 110, "high": 150}
+
+
+def snap_fps(fps, max_fps):
+    """Round a requested FPS down to an allowed value (keeps channels few)."""
+    try:
+        fps = int(fps)
+    except (TypeError, ValueError):
+        fps = max_fps
+    allowed = [f for f in FPS_CHOICES if f <= max_fps] or [min(FPS_CHOICES)]
+    below = [f for f in allowed if f <= fps]
+    return max(below) if below else min(allowed)
+
+
+def snap_resolution(name, default="high"):
+    name = str(name or "").strip().lower()
+    return name if name in RESOLUTIONS else default
+
+
+# ====== Session table ======
+
+
+class Session:
+    __slots__ = ("sid", "direction", "fps", "resolution",
+                 "frame_no", "last_seen", "streams")
+
+    def __init__(self, sid, direction, fps, resolution):
+        self.sid = sid
+        self.direction = direction      # None = AUTO, else head/tail/side
+        self.fps = fps
+        self.resolution = resolution
+        self.frame_no = 0               # last channel frame delivered
+        self.last_seen = time.monotonic()
+        self.streams = 0                # open /video_feed responses
+
+    def key(self):
+        """Channel key: sessions with equal keys share renders."""
+        return (self.direction or "auto", self.fps, self.resolution)
+
+    def to_dict(self):
+        return {
+            "sid": self.sid,
+            "direction": self.direction or "auto",
+            "fps": self.fps,
+            "resolution": self.resolution,
+            "frame": self.frame_no,
+        }
+
+
+class SessionTable:
+    """Thread-safe sid → Session map with idle expiry."""
+
+    def __init__(self, default_direction=None, default_fps=30,
+                 default_resolution="high", ttl=SESSION_TTL):
+        self.default_direction = default_direction
+        self.default_fps = default_fps
+        self.default_resolution = default_resolution
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def get(self, sid, create=True):
+        """Return the session for `sid` (creating a fresh one if needed)."""
+        now = time.monotonic()
+        with self._lock:
+            s = self._sessions.get(sid) if sid else None
+            if s is None:
+                if not create:
+                    return None
+                s = Session(sid or uuid.uuid4().hex,
+                            self.default_direction, self.default_fps,
+                            self.default_resolution)
+                self._sessions[s.sid] = s
+            s.last_seen = now
+            self._expire(now)
+            return s
+
+    def _expire(self, now):
+        dead = [sid for sid, s in self._sessions.items()
+                if s.streams == 0 and now - s.last_seen > self.ttl]
+        for sid in dead:
+            del self._sessions[sid]
+
+    def open_stream(self, session):
+        """Count an open stream on `session` (re-adding it if it expired meanwhile)."""
+        with self._lock:
+            self._sessions.setdefault(session.sid, session)
+            session.streams += 1
+            session.last_seen = time.monotonic()
+
+    def close_stream(self, session):
+        with self._lock:
+            session.streams -= 1
+            session.last_seen = time.monotonic()
+
+    def active_count(self):
+        """Number of sessions currently holding an open stream."""
+        with self._lock:
+            return sum(1 for s in self._sessions.values() if s.streams > 0)
+
+    def keys_in_use(self):
+        with self._lock:
+            return {s.key() for s in self._sessions.values() if s.streams > 0}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+
+# ====== Shared render pool ======
+
+
+class _Channel:
+    __slots__ = ("key", "renderer", "lock", "frame_no", "frame",
+                 "rendered_at", "future", "last_used")
+
+    def __init__(self, key, renderer):
+        self.key = key
+        self.renderer = renderer
+        self.lock = threading.Lock()
+        self.frame_no = 0
+        self.frame = None
+        self.rendered_at = 0.0
+        self.future = None
+        self.last_used = time.monotonic()
+
+
+class RenderPool:
+    """
+    Bounded worker pool rendering one frame stream per distinct key.
+
+    `factory(key)` builds a renderer exposing `generate_frame() -> bytes`.
+    A channel renders at most one frame at a time and at most once per
+    `interval`; every caller waiting on it gets the same bytes.
+    `on_render(key, seconds, renderer)` is called after each render.
+    """
+
+    def __init__(self, factory, workers=RENDER_WORKERS, channel_ttl=CHANNEL_TTL,
+                 on_render=None):
+        self.factory = factory
+        self.workers = workers
+        self.channel_ttl = channel_ttl
+        self.on_render = on_render
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="render")
+        self._lock = threading.Lock()
+        self._channels = {}
+        self.renders = 0
+
+    def _channel(self, key):
+        with self._lock:
+            ch = self._channels.get(key)
+            if ch is None:
+                ch = _Channel(key, self.factory(key))
+                self._channels[key] = ch
+            ch.last_used = time.monotonic()
+            return ch
+
+    def _render(self, ch):
+        try:
+            t0 = time.perf_counter()
+            frame = ch.renderer.generate_frame()
+            if self.on_render:
+                self.on_render(ch.key, time.perf_counter() - t0, ch.renderer)
+            with ch.lock:
+                ch.frame_no += 1
+                ch.frame = frame
+                ch.rendered_at = time.monotonic()
+                return ch.frame_no, frame
+        finally:
+            with ch.lock:
+                ch.future = None
+            with self._lock:
+                self.renders += 1
+
+    def frame(self, key, after, interval):
+        """
+        Return `(frame_no, bytes)` for the first channel frame newer than
+        `after`, rendering it if due and waiting for pacing otherwise.
+        """
+        ch = self._channel(key)
+        while True:
+            with ch.lock:
+                if ch.frame is not None and ch.frame_no > after:
+                    return ch.frame_no, ch.frame
+                fut = ch.future
+                wait = ch.rendered_at + interval - time.monotonic()
+                if fut is None and wait <= 0:
+                    fut = ch.future = self._executor.submit(self._render, ch)
+            if fut is not None:
+                return fut.result()
+            time.sleep(wait)
+
+    def renderer(self, key):
+        """Direct access to a channel's renderer (e.g. to reset it)."""
+        return self._channel(key).renderer
+
+    def expire(self, keys_in_use=()):
+        """Drop channels nobody watched for `channel_ttl` seconds."""
+        now = time.monotonic()
+        with self._lock:
+            dead = [k for k, ch in self._channels.items()
+                    if k not in keys_in_use and ch.future is None
+                    and now - ch.last_used > self.channel_ttl]
+            for k in dead:
+                ch = self._channels.pop(k)
+                close = getattr(ch.renderer, "close", None)
+                if close:
+                    close()
+        return len(dead)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._channels)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "channels": len(self._channels),
+                "keys": ["/".join(map(str, k)) for k in self._channels],
+                "renders": self.renders,
+            }
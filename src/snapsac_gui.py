@@ -6,19 +6,29 @@
 # - Marqueur glow collé sur la courbe (plus de séparation point/ligne)
 
 from matplotlib.collections import PolyCollection
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.animation import FuncAnimation
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from matplotlib.figure import Figure
+from collections import deque
 import numpy as np
 import os
 import math
-import tkinter as tk
-from tkinter import ttk
+import time
+import threading
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import traceback
 
-# Matplotlib backend Tk
-import matplotlib
-matplotlib.use("TkAgg")
+from catalog import load_catalog
+from fleet_plot import FleetArtists, fleet_colors, rank_by, use_collections
+import fuel_model
+import monte_carlo
+import crossover
+import pareto
+import export
+
+# tkinter et le backend TkAgg ne sont importés que par l'App :
+# le mode headless (Agg) tourne sans Tk ni serveur X
 
 # ====== Build canari (pour vérifier que c’est bien cette version) ======
 APP_BUILD = os.getenv("BUILD_ID", "dev")
@@ -32,6 +42,23 @@ VENT_STEPS = list(range(0, 301, 5))     # 0,5,10,...,300
 SUBSTEPS = 1                            # 1 frame = 1 point
 INTERVAL_MS = int(os.getenv("INTERVAL_MS", "30"))  # ~30 ms → ~1,8s le sweep
 EASING = "linear"                       # plus utile ici, mais on garde le switch
+# Blit : seuls les artistes animés sont redessinés sur des fonds en cache
+BLIT = os.getenv("BLIT", "1") == "1"
+# Séquences calculées d'avance par le thread producteur
+PLAN_AHEAD = max(1, int(os.getenv("PLAN_AHEAD", "2")))
+REFILL_DELAY = 0.25                      # s, pause du producteur après chaque get()
+# Pré-rendu des fonds de séquence dans un processus dédié ("auto" : si >1 cœur)
+_PRERENDER = os.getenv("PRERENDER", "auto").strip().lower()
+PRERENDER = (os.cpu_count() or 1) > 1 if _PRERENDER == "auto" else _PRERENDER == "1"
+# Écart toléré (p95) entre deux frames et INTERVAL_MS, mesuré sur JITTER_WINDOW frames
+JITTER_TARGET_MS = float(os.getenv("JITTER_TARGET_MS", "8"))
+JITTER_WINDOW = 240
+# Bandes d'incertitude Monte Carlo (p5–p95) sur les graphes de conso
+MC_BANDS = os.getenv("MC_BANDS", "0") == "1"
+MC_OVERLAY_SAMPLES = int(os.getenv("MC_OVERLAY_SAMPLES", "20000"))
+# Mode headless par défaut (machines sans X) ; ffmpeg pour --record
+HEADLESS = os.getenv("HEADLESS", "0") == "1"
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
 
 
 def log(msg: str):
@@ -40,14 +67,11 @@ def log(msg: str):
 
 
 # ====== Données métier ======
-AVIONS = {
-    "A320": {"poids_vide": 42000,  "conso_base": 2.4, "max_pax": 180, "sens_vent": 1.0, "vitesse": 840},
-    "B737": {"poids_vide": 41413,  "conso_base": 2.6, "max_pax": 190, "sens_vent": 1.1, "vitesse": 842},
-    "B777": {"poids_vide": 134800, "conso_base": 5.0, "max_pax": 396, "sens_vent": 1.3, "vitesse": 905},
-    "A380": {"poids_vide": 277000, "conso_base": 8.0, "max_pax": 850, "sens_vent": 1.5, "vitesse": 945},
-}
-POIDS_PASSAGER = 80
-POIDS_BAGAGE = 23
+# Specs avions : fichier catalogue (AIRCRAFT_CATALOG, défaut data/aircraft.csv)
+CATALOG = load_catalog()
+AVIONS = CATALOG.as_dict()
+POIDS_PASSAGER = fuel_model.POIDS_PASSAGER
+POIDS_BAGAGE = fuel_model.POIDS_BAGAGE
 DIRECTIONS = ["head", "tail", "side"]
 DISTANCES = [800, 1200, 1600, 2000]
 PAX_LIST = [140, 160, 180, 200, 220, 240]
@@ -70,21 +94,21 @@ PALETTE = {
 
 
 def calcule_etat(avion_key, direction, vent, pax, distance):
-    specs = AVIONS[avion_key]
-    if pax > specs["max_pax"]:
+    specs = CATALOG.spec(avion_key)
+    if pax > specs.max_pax:
         return None
-    masse = specs["poids_vide"] + pax * (POIDS_PASSAGER + POIDS_BAGAGE)
+    masse = specs.poids_vide + pax * (POIDS_PASSAGER + POIDS_BAGAGE)
     if direction == "head":
-        coef = vent * 0.005 * specs["sens_vent"]
-        vitesse = specs["vitesse"] - vent
+        coef = vent * 0.005 * specs.sens_vent
+        vitesse = specs.vitesse - vent
     elif direction == "tail":
-        coef = vent * -0.003 * specs["sens_vent"]
-        vitesse = specs["vitesse"] + vent
+        coef = vent * -0.003 * specs.sens_vent
+        vitesse = specs.vitesse + vent
     else:
-        coef = vent * 0.001 * specs["sens_vent"]
-        vitesse = specs["vitesse"]
+        coef = vent * 0.001 * specs.sens_vent
+        vitesse = specs.vitesse
     vitesse = max(600, min(1000, vitesse))
-    conso_km = specs["conso_base"] + (masse / 1000.0) * 0.1 + coef
+    conso_km = specs.conso_base + (masse / 1000.0) * 0.1 + coef
     conso_L = conso_km * distance
     return {
         "conso_L": conso_L,
@@ -95,14 +119,9 @@ def calcule_etat(avion_key, direction, vent, pax, distance):
 
 
 def ymax_sequence(direction, distance, pax, metric):
-    y_max = 0.0
     # ici on peut garder un pas plus gros pour le bound
-    for v in range(0, 301, 20):
-        for avion in AVIONS:
-            e = calcule_etat(avion, direction, v, pax, distance)
-            if e:
-                y_max = max(y_max, e[metric])
-    return (y_max * 1.20) if y_max > 0 else 1.0
+    return fuel_model.ymax(CATALOG, direction, distance, pax, metric,
+                           vents=range(0, 301, 20), headroom=1.20)
 
 
 def sequence_generator():
@@ -112,6 +131,41 @@ def sequence_generator():
                 for pax in PAX_LIST:
                     yield {"direction": d, "distance": dist, "pax": pax}
 
+
+# ====== Sweep précalculé ======
+STATE_KEYS = ("conso_L", "conso_L_pax", "duree_h", "vitesse")
+
+
+def precompute_sweep(direction, distance, pax, vents=VENT_STEPS):
+    """
+    Toute une séquence en un appel vectorisé : chaque métrique en
+    (n_avions, n_vents), NaN si l'avion ne peut pas porter `pax`, et
+    l'indice du meilleur L/pax à chaque pas de vent (-1 si aucun) et le
+    masque des avions Pareto-optimaux (L/pax, durée).
+    """
+    x = np.asarray(vents, dtype=float)
+    e = fuel_model.evaluate(CATALOG, direction, x, pax, distance)
+    cpx = e["conso_L_pax"]
+    finite = np.isfinite(cpx)
+    best = np.where(finite.any(axis=0),
+                    np.argmin(np.where(finite, cpx, np.inf), axis=0), -1)
+    return {"x": x, "best": best, "pareto": pareto.pareto_mask(cpx, e["duree_h"]),
+            **{k: e[k] for k in STATE_KEYS}}
+
+
+def step_fill_verts(x, y):
+    """Sommets du polygone de fill_between(x, y, step="pre") jusqu'à y=0."""
+    n = len(x)
+    verts = np.empty((2 * n + 1, 2))
+    verts[0] = (x[0], 0.0)
+    verts[-1] = (x[-1], 0.0)
+    steps = verts[1:-1]
+    steps[0::2, 0] = x
+    steps[1::2, 0] = x[:-1]
+    steps[0::2, 1] = y
+    steps[1::2, 1] = y[1:]
+    return verts
+
 # ====== Easing ======
 
 
@@ -151,6 +205,7 @@ def add_glow_marker(ax, color):
 
 
 def kpi_row(parent, row, label, init_value="—"):
+    from tkinter import ttk
     parent.grid_columnconfigure(0, weight=1)
     parent.grid_columnconfigure(1, weight=1)
 
@@ -163,10 +218,227 @@ def kpi_row(parent, row, label, init_value="—"):
     val.grid(row=row, column=1, sticky="e", padx=(8, 0), pady=2)
     return val
 
-# ====== App ======
+# ====== Plans de séquence (calculés hors du thread Tk) ======
+
+
+def build_plan(seq):
+    """
+    Tout ce qu'une séquence affiche, prêt à appliquer : sweep, ylim,
+    titres et, pour chaque frame, meilleur avion, classement, polygones
+    de remplissage, textes KPI et bandeau. Aucun artiste n'est touché,
+    donc appelable depuis n'importe quel thread.
+    """
+    direction, distance, pax = seq["direction"], seq["distance"], seq["pax"]
+    sw = precompute_sweep(direction, distance, pax)
+    metrics = SweepFigure.METRICS
+    mc = None
+    if MC_BANDS:
+        mc = monte_carlo.run(CATALOG, direction, sw["x"], pax, distance,
+                             samples=MC_OVERLAY_SAMPLES, workers=1)
+    frames = []
+    for k, v_cur in enumerate(sw["x"]):
+        best = int(sw["best"][k])
+        best_model = CATALOG.names[best] if best >= 0 else None
+        x = sw["x"][:k + 1]
+        fill = {m: (step_fill_verts(x, sw[m][best, :k + 1])
+                    if best_model and k >= 1 else None) for m in metrics}
+        kpi = None
+        if best_model:
+            kpi = (best_model,
+                   f"{sw['conso_L_pax'][best, k]:.1f}",
+                   f"{sw['conso_L'][best, k]:,.0f}".replace(",", " "),
+                   f"{sw['duree_h'][best, k]:.2f}",
+                   f"{sw['vitesse'][best, k]:.0f}")
+        frames.append({
+            "k": k + 1,
+            "v": float(v_cur),
+            "best": best,
+            "best_model": best_model,
+            "rank": rank_by(sw["conso_L_pax"][:, k]),
+            "fill": fill,
+            "kpi": kpi,
+            "best_p": float(mc.p_best[best, k]) if mc and best_model else None,
+            "pareto": pareto.front_names(CATALOG, sw["pareto"][:, k]),
+            "header": (f"Vent {v_cur:3.0f} km/h   |   {direction}   "
+                       f"|   {distance} km   |   {pax} pax"),
+        })
+    return {
+        "seq": seq,
+        "sweep": sw,
+        "ymax": {m: ymax_sequence(direction, distance, pax, m) for m in metrics},
+        "frames": frames,
+        "mc": mc,
+        "crossovers": crossover.solve(CATALOG, direction, distance, pax,
+                                      lo=float(sw["x"][0]), hi=float(sw["x"][-1])),
+        "background": None,
+    }
 
 
-class App:
+_TWIN = None
+
+
+def render_background(plan, size):
+    """
+    Fond statique d'une séquence (axes, ticks, titres ; artistes animés
+    exclus) rendu sur une figure Agg jumelle de `size` (w px, h px, dpi).
+    Exécuté dans le processus de pré-rendu : ce rendu tient le GIL
+    ~150 ms et gênerait le thread Tk s'il tournait dans le même processus.
+    """
+    global _TWIN
+    if _TWIN is None or _TWIN[0] != size:
+        w, h, dpi = size
+        fig = Figure(figsize=(w / dpi, h / dpi), dpi=dpi, facecolor=BG)
+        view = SweepFigure(fig)
+        view.set_animated(True)
+        _TWIN = (size, FigureCanvasAgg(fig), view)
+    _, canvas, view = _TWIN
+    view.load(plan)
+    canvas.draw()
+    return np.array(canvas.buffer_rgba())
+
+
+class PlanProducer:
+    """
+    Thread producteur : garde PLAN_AHEAD séquences d'avance dans une deque
+    (append/popleft atomiques, pas de verrou). Si la taille du canvas
+    affiché est connue et PRERENDER actif, le fond de la séquence est
+    aussi pré-rendu (render_background, dans un processus à part), ce
+    qui évite le canvas.draw() complet au changement de séquence.
+    """
+
+    def __init__(self, seqs, ahead=None, prerender=None):
+        self.seqs = seqs
+        self.ahead = ahead or PLAN_AHEAD
+        self.ready = deque()
+        self.size = None            # (largeur px, hauteur px, dpi) du canvas affiché
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.pool = None
+        if PRERENDER if prerender is None else prerender:
+            # "spawn" : pas de fork d'un processus qui a déjà initialisé Tk
+            self.pool = ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        self.thread = threading.Thread(target=self._run, name="gui-producer", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def set_size(self, width, height, dpi):
+        self.size = (int(width), int(height), float(dpi))
+
+    def get(self, timeout=None):
+        """Prochain plan (attend s'il n'est pas prêt) ; None après `timeout`."""
+        end = None if timeout is None else time.perf_counter() + timeout
+        while not self.ready:
+            if end is not None and time.perf_counter() > end:
+                return None
+            time.sleep(0.002)
+        plan = self.ready.popleft()
+        self._wake.set()
+        return plan
+
+    def _background(self, plan):
+        if self.pool is None or self.size is None:
+            return None
+        # seuls seq, ymax et les bandes servent au fond : inutile d'envoyer les frames
+        light = {"seq": plan["seq"], "ymax": plan["ymax"], "mc": plan["mc"],
+                 "crossovers": plan["crossovers"]}
+        return self.pool.submit(render_background, light, self.size).result()
+
+    def _run(self):
+        while not self._stop.is_set():
+            if len(self.ready) >= self.ahead:
+                if self._wake.wait(0.5):
+                    self._wake.clear()
+                    # un plan vient d'être pris : laisser passer le changement
+                    # de séquence côté Tk avant de recharger le CPU
+                    self._stop.wait(REFILL_DELAY)
+                continue
+            try:
+                plan = build_plan(next(self.seqs))
+                plan["background"] = self._background(plan)
+            except Exception:
+                traceback.print_exc()
+                log("[GUI] ERROR in producer")
+                time.sleep(0.5)
+                continue
+            self.ready.append(plan)
+
+
+# ====== Blit ======
+
+
+class Blitter:
+    """
+    Fonds des axes en cache ; chaque frame restaure les fonds, redessine
+    les seuls artistes animés et blitte les axes concernés. Après tout
+    rendu complet (1re frame, redimensionnement) les fonds sont re-capturés.
+    """
+
+    def __init__(self, canvas, artists):
+        self.canvas = canvas
+        self.artists = sorted(artists, key=lambda a: a.get_zorder())
+        self.axes = list(dict.fromkeys(a.axes for a in self.artists))
+        self.backgrounds = {}
+        for a in self.artists:
+            a.set_animated(True)
+        canvas.mpl_connect("draw_event", self._on_draw)
+
+    def _on_draw(self, event):
+        self.capture()
+        self._draw_artists()
+
+    def capture(self):
+        self.backgrounds = {ax: self.canvas.copy_from_bbox(ax.bbox) for ax in self.axes}
+
+    def _draw_artists(self):
+        for a in self.artists:
+            a.axes.draw_artist(a)
+
+    def paste(self, background):
+        """
+        Remplace tout le canvas par un fond pré-rendu (même taille) ;
+        False si absent ou d'une autre taille (l'appelant fait un draw()).
+        """
+        if background is None:
+            return False
+        buf = np.asarray(self.canvas.get_renderer().buffer_rgba())
+        if buf.shape != background.shape:
+            return False
+        buf[...] = background
+        self.capture()
+        self._draw_artists()
+        self.canvas.blit()
+        return True
+
+    def update(self):
+        if not self.backgrounds:
+            self.canvas.draw()      # _on_draw capture les fonds
+            return
+        for ax in self.axes:
+            self.canvas.restore_region(self.backgrounds[ax])
+        self._draw_artists()
+        for ax in self.axes:
+            self.canvas.blit(ax.bbox)
+
+
+# ====== Figure (sans widgets Tk) ======
+
+
+class SweepFigure:
+    """
+    Les 3 graphes + artistes animés, indépendants de Tk : la même figure
+    sert à l'App (FigureCanvasTkAgg), au pré-rendu des fonds et au
+    benchmark offscreen (Agg). load()/apply() n'appliquent que des
+    données déjà calculées par build_plan.
+    """
     METRICS = ("conso_L", "conso_L_pax", "duree_h")
     TITLES = {
         "conso_L":     "Consommation totale (L) vs Vent",
@@ -175,7 +447,300 @@ class App:
     }
     YLABS = {"conso_L": "Litres", "conso_L_pax": "L/pax", "duree_h": "Heures"}
 
+    def __init__(self, fig):
+        self.fig = fig
+        self.ax_conso = fig.add_subplot(3, 1, 1)
+        self.ax_cpx = fig.add_subplot(3, 1, 2)
+        self.ax_duree = fig.add_subplot(3, 1, 3)
+        self.axes = {
+            "conso_L": self.ax_conso,
+            "conso_L_pax": self.ax_cpx,
+            "duree_h": self.ax_duree,
+        }
+        for metric, ax in self.axes.items():
+            set_axis_style(ax, self.TITLES[metric], self.YLABS[metric])
+            ax.set_xlim(0, 300)
+
+        # Bandeau titre : un axe invisible (au lieu de suptitle) pour que
+        # le texte par frame soit blitté comme les autres artistes
+        self.ax_head = fig.add_axes([0.0, 0.955, 1.0, 0.04])
+        self.ax_head.set_axis_off()
+        self.header = self.ax_head.text(
+            0.5, 0.5, "", ha="center", va="center",
+            fontsize=14, fontweight="bold", color=FG)
+
+        # Séries & objets animés
+        self.series = {m: {} for m in self.METRICS}
+        self.fill_best = {}
+        self.wind_lines = {}
+        self.best_text = {}
+
+        # Grande flotte : 1 LineCollection + 1 scatter + top-K étiquettes par axe
+        self.colors = {n: tuple(c) for n, c in zip(
+            CATALOG.names, fleet_colors(CATALOG.names, PALETTE))}
+        self.fleet = None
+        if use_collections(len(CATALOG)):
+            self.fleet = {
+                m: FleetArtists(ax, CATALOG.names, list(self.colors.values()),
+                                lw=2.4, best_lw=3.8, alpha=0.70,
+                                marker_size=40, best_marker_size=160,
+                                label_kw={"color": "#D9DEF9", "clip_on": True})
+                for m, ax in self.axes.items()
+            }
+
+        for metric, ax in self.axes.items():
+            # remplissage sous la meilleure courbe : un seul polygone,
+            # sommets mis à jour en place
+            self.fill_best[metric] = PolyCollection(
+                [], alpha=0.10, zorder=0, edgecolors="none")
+            ax.add_collection(self.fill_best[metric])
+            self.wind_lines[metric] = ax.axvline(
+                0, color="#7480b8", lw=1.6, ls="--", alpha=0.8, zorder=4)
+            self.best_text[metric] = ax.text(
+                0.985, 0.06, "Best: —", transform=ax.transAxes,
+                ha="right", va="bottom", fontsize=10, color="#C9CEEC"
+            )
+            for avion, color in (self.colors.items() if self.fleet is None else ()):
+                shadow, = ax.plot(
+                    [], [], lw=6.0, color="#000000",
+                    alpha=0.22, solid_capstyle="round", zorder=1
+                )
+                line,   = ax.plot(
+                    [], [], lw=3.4, color=color, alpha=0.98,
+                    solid_capstyle="round", zorder=3, label=avion
+                )
+                g_outer, g_inner = add_glow_marker(ax, color)
+                self.series[metric][avion] = {
+                    "line": line, "shadow": shadow, "glow": (g_outer, g_inner)
+                }
+            if self.fleet is None:
+                leg = ax.legend(loc="upper left", frameon=False, fontsize=9)
+                for txt in leg.get_texts():
+                    txt.set_color("#D9DEF9")
+
+        # bandes Monte Carlo : statiques pendant une séquence (dans le fond)
+        self.bands = {}
+        # vents de bascule du meilleur avion (statiques, dans le fond aussi)
+        self.xovers = []
+        self.plan = None
+
+    def artists(self):
+        """Artistes modifiés à chaque frame (ceux à blitter)."""
+        out = [self.header]
+        for metric in self.METRICS:
+            out += [self.fill_best[metric], self.wind_lines[metric],
+                    self.best_text[metric]]
+            if self.fleet is not None:
+                out += self.fleet[metric].artists()
+            for s in self.series[metric].values():
+                out += [s["shadow"], s["line"], *s["glow"]]
+        return out
+
+    def set_animated(self, flag=True):
+        for a in self.artists():
+            a.set_animated(flag)
+
+    def load(self, plan):
+        """Nouvelle séquence : limites, titres, artistes vidés."""
+        self.plan = plan
+        seq = plan["seq"]
+        self.direction = seq["direction"]
+        self.distance = seq["distance"]
+        self.pax = seq["pax"]
+
+        for metric, ax in self.axes.items():
+            if self.fleet is not None:
+                self.fleet[metric].clear()
+            for s in self.series[metric].values():
+                s["line"].set_data([], [])
+                s["shadow"].set_data([], [])
+                outer, inner = s["glow"]
+                outer.set_offsets([[np.nan, np.nan]])
+                inner.set_offsets([[np.nan, np.nan]])
+                outer.set_alpha(0.0)
+                inner.set_alpha(0.0)
+
+            ax.set_ylim(0, plan["ymax"][metric])
+            ax.set_title(
+                f"{self.TITLES[metric]} — {self.direction} | {self.distance} km | {self.pax} pax",
+                fontsize=13, fontweight="bold", color=FG, pad=10
+            )
+            self.wind_lines[metric].set_xdata([0, 0])
+            self.best_text[metric].set_text("Best: —")
+            self.fill_best[metric].set_verts([])
+
+            band = self.bands.pop(metric, None)
+            if band is not None:
+                band.remove()
+            if plan.get("mc") is not None:
+                band = monte_carlo.draw_bands(
+                    ax, plan["mc"], metric, list(self.colors.values()))
+                if band is not None:
+                    self.bands[metric] = band
+
+        for art in self.xovers:
+            art.remove()
+        self.xovers = [art for ax in self.axes.values()
+                       for art in crossover.annotate(ax, plan.get("crossovers", []),
+                                                     self.colors)]
+
+        self.fig.patch.set_facecolor(BG)
+        self.header.set_text(
+            f"Kerosene Flight Optimizator — {self.direction} | {self.distance} km | {self.pax} pax")
+
+    def reset(self, seq):
+        self.load(build_plan(seq))
+
+    def apply(self, fr):
+        """Applique une frame du plan courant aux artistes."""
+        sw = self.plan["sweep"]
+        k = fr["k"]
+        v_cur = fr["v"]
+        x = sw["x"][:k]
+        best = fr["best"]
+        best_model = fr["best_model"]
+
+        for metric, ax in self.axes.items():
+            Y = sw[metric][:, :k]
+            if self.fleet is not None:
+                self.fleet[metric].update(x, Y, best=best if best >= 0 else None,
+                                          rank=fr["rank"])
+            else:
+                for i, (avion, s) in enumerate(self.series[metric].items()):
+                    s["line"].set_data(x, Y[i])
+                    s["shadow"].set_data(x, Y[i])
+                    is_best = (avion == best_model)
+                    on_front = avion in fr["pareto"]
+                    s["line"].set_linewidth(3.8 if is_best else 3.0 if on_front else 2.4)
+                    s["line"].set_alpha(1.0 if is_best else 0.90 if on_front else 0.70)
+                    s["shadow"].set_alpha(0.30 if is_best else 0.14)
+
+                # glow marker collé sur la courbe (pas de décalage)
+                if best_model:
+                    outer, inner = self.series[metric][best_model]["glow"]
+                    outer.set_offsets([[v_cur, Y[best, -1]]])
+                    inner.set_offsets([[v_cur, Y[best, -1]]])
+                    outer.set_alpha(0.28)
+                    inner.set_alpha(1.0)
+
+            self.wind_lines[metric].set_xdata([v_cur, v_cur])
+            best_label = f"Best: {best_model if best_model else '—'}"
+            if fr.get("best_p") is not None:
+                best_label += f"  ·  P(best) {fr['best_p']:.0%}"
+            if len(fr["pareto"]) > 1:
+                best_label += f"\nPareto: {pareto.summary(fr['pareto'])}"
+            self.best_text[metric].set_text(best_label)
+
+            # remplissage sous la meilleure courbe — x déjà croissants
+            fb = self.fill_best[metric]
+            verts = fr["fill"][metric]
+            if verts is not None:
+                fb.set_verts([verts])
+                fb.set_facecolor(self.colors[best_model])
+            else:
+                fb.set_verts([])
+
+        self.header.set_text(fr["header"])
+
+    def update(self, frame_id):
+        self.apply(self.plan["frames"][frame_id])
+
+
+# ====== Boucle commune (Tk / headless) ======
+
+
+class SweepDriver:
+    """
+    Boucle commune à l'App Tk et au mode headless : plans pris au
+    producteur, frame appliquée puis blittée. Les sous-classes n'ajoutent
+    que l'affichage hors figure (_show_plan / _show_frame).
+    """
+    # export.ExportWriter des points joués (--export), None = désactivé
+    exporter = None
+
+    def _init_driver(self, canvas, blit=None, prerender=None):
+        self.canvas = canvas
+        blit = BLIT if blit is None else blit
+        # Blit : seuls les artistes animés sont redessinés sur des fonds en cache
+        self.blitter = Blitter(canvas, self.view.artists()) if blit else None
+        # État & séquences : calculées d'avance par le thread producteur,
+        # la boucle n'applique que des données prêtes
+        self.producer = PlanProducer(sequence_generator(), prerender=prerender)
+        canvas.mpl_connect("resize_event", self._on_resize)
+        self._on_resize(None)
+        self.producer.start()
+        self.step_index = 0
+        self._load_plan(self.producer.get())
+
+    def _on_resize(self, event):
+        w, h = self.canvas.get_width_height(physical=True)
+        self.producer.set_size(w, h, self.fig.dpi)
+
+    def _load_plan(self, plan):
+        self.view.load(plan)
+        self._plan_used = False
+        self.direction = self.view.direction
+        self.distance = self.view.distance
+        self.pax = self.view.pax
+
+        # Fond pré-rendu par le producteur ; sinon (1re séquence, taille
+        # changée entre-temps) rendu complet synchrone
+        if not (self.blitter and self.blitter.paste(plan["background"])):
+            self.canvas.draw()
+        self.step_index = 0
+        self._show_plan(plan)
+
+    def _show_plan(self, plan):
+        pass
+
+    def _show_frame(self, fr, frame_id):
+        pass
+
+    def _export_frame(self, frame_id):
+        # colonnes déjà calculées dans le plan ; l'écriture se fait dans le
+        # thread de l'exporteur (batch abandonné si le disque ne suit pas)
+        sw = self.view.plan["sweep"]
+        states = {m: sw[m][:, frame_id:frame_id + 1] for m in export.METRICS}
+        self.exporter.submit(export.rows_from_states(
+            fuel_model.direction_code(self.direction), sw["x"][frame_id],
+            self.distance, self.pax, states), block=False)
+
+    def _update(self, frame_id):
+        try:
+            if frame_id >= len(VENT_STEPS):
+                return
+
+            if (frame_id % LOG_EVERY) == 0:
+                log(f"[GUI] frame={frame_id} | vent={VENT_STEPS[frame_id]} km/h")
+
+            # séquence terminée : la suivante est déjà prête dans la file
+            if frame_id == 0 and self._plan_used:
+                self._load_plan(self.producer.get())
+            self._plan_used = True
+
+            fr = self.view.plan["frames"][frame_id]
+            self.view.apply(fr)
+            self._show_frame(fr, frame_id)
+            if self.exporter is not None:
+                self._export_frame(frame_id)
+
+            if self.blitter:
+                self.blitter.update()
+            else:
+                self.canvas.draw_idle()
+        except Exception:
+            traceback.print_exc()
+            log("[GUI] ERROR in _update")
+
+
+# ====== App ======
+
+
+class App(SweepDriver):
     def __init__(self, root):
+        from tkinter import ttk
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
         self.root = root
         self.root.title(
             f"Kerosene Flight Optimizator — Live  [BUILD {APP_BUILD}]"
@@ -221,53 +786,11 @@ class App:
 
         # Figure 3x1 empilée
         self.fig = Figure(figsize=(10.8, 8.6), dpi=100, facecolor=BG)
-        self.ax_conso = self.fig.add_subplot(3, 1, 1)
-        self.ax_cpx = self.fig.add_subplot(3, 1, 2)
-        self.ax_duree = self.fig.add_subplot(3, 1, 3)
-        self.axes = {
-            "conso_L": self.ax_conso,
-            "conso_L_pax": self.ax_cpx,
-            "duree_h": self.ax_duree,
-        }
-        for metric, ax in self.axes.items():
-            set_axis_style(ax, self.TITLES[metric], self.YLABS[metric])
-            ax.set_xlim(0, 300)
+        self.view = SweepFigure(self.fig)
+        self.axes = self.view.axes
 
-        # Séries & objets animés
-        self.series = {m: {} for m in self.METRICS}
-        self.fill_best: dict[str, PolyCollection | None] = {
-            m: None for m in self.METRICS}
-        self.wind_lines = {}
-        self.best_text = {}
-
-        for metric, ax in self.axes.items():
-            self.wind_lines[metric] = ax.axvline(
-                0, color="#7480b8", lw=1.6, ls="--", alpha=0.8, zorder=4)
-            self.best_text[metric] = ax.text(
-                0.985, 0.06, "Best: —", transform=ax.transAxes,
-                ha="right", va="bottom", fontsize=10, color="#C9CEEC"
-            )
-            for avion, color in PALETTE.items():
-                shadow, = ax.plot(
-                    [], [], lw=6.0, color="#000000",
-                    alpha=0.22, solid_capstyle="round", zorder=1
-                )
-                line,   = ax.plot(
-                    [], [], lw=3.4, color=color, alpha=0.98,
-                    solid_capstyle="round", zorder=3, label=avion
-                )
-                g_outer, g_inner = add_glow_marker(ax, color)
-                self.series[metric][avion] = {
-                    "x": [], "y": [], "line": line,
-                    "shadow": shadow, "glow": (g_outer, g_inner)
-                }
-            leg = ax.legend(loc="upper left", frameon=False, fontsize=9)
-            for txt in leg.get_texts():
-                txt.set_color("#D9DEF9")
-
-        self.canvas = FigureCanvasTkAgg(self.fig, master=left)
-        self.canvas.draw()
-        self.canvas.get_tk_widget().grid(row=1, column=0, sticky="nsew")
+        canvas = FigureCanvasTkAgg(self.fig, master=left)
+        canvas.get_tk_widget().grid(row=1, column=0, sticky="nsew")
 
         self.prog = ttk.Progressbar(
             left,
@@ -317,6 +840,8 @@ class App:
             right, row=9,  label="Durée (h)",      init_value="—")
         self.kpi_vit = kpi_row(
             right, row=10, label="Vitesse (km/h)", init_value="—")
+        self.kpis = (self.kpi_model, self.kpi_cpx, self.kpi_conso,
+                     self.kpi_duree, self.kpi_vit)
 
         ttk.Separator(right, orient="horizontal").grid(
             row=11, column=0, columnspan=2, sticky="ew", pady=8
@@ -326,190 +851,262 @@ class App:
         ttk.Label(right, text=f"{APP_BUILD}", style="Muted.TLabel").grid(
             row=12, column=1, sticky="e")
 
-        # État & séquences
-        self.seq_gen = sequence_generator()
-        self.current_seq = next(self.seq_gen)
-        self.step_index = 0
-        self._reset_sequence(self.current_seq)
+        self._init_driver(canvas)
 
-        total_frames = len(VENT_STEPS) * SUBSTEPS
-        self.anim = FuncAnimation(
-            self.fig, self._update, frames=total_frames,
-            interval=INTERVAL_MS, blit=False,
-            cache_frame_data=False, save_count=total_frames
-        )
-        log("[GUI] animation initialisée — Neon Dark (fast, pas=5, no-substeps)")
+        # Cadence : échéances absolues (pas d'accumulation de retard)
+        self.interval = INTERVAL_MS / 1000.0
+        self.jitter = deque(maxlen=JITTER_WINDOW)
+        self.apply_ms = deque(maxlen=JITTER_WINDOW)
+        self._last_tick = None
+        self._deadline = time.perf_counter() + self.interval
+        self.root.after(INTERVAL_MS, self._tick)
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+        log(f"[GUI] animation initialisée — Neon Dark (fast, pas=5, no-substeps, blit={BLIT})")
 
     # ----- helpers -----
-    def _reset_sequence(self, seq):
-        self.direction = seq["direction"]
-        self.distance = seq["distance"]
-        self.pax = seq["pax"]
+    def _on_close(self):
+        self.producer.stop()
+        self.root.destroy()
+
+    def _show_plan(self, plan):
         self.tag_dir.config(text=f"Direction: {self.direction}")
         self.tag_dist.config(text=f"Distance : {self.distance} km")
         self.tag_pax.config(text=f"Passagers: {self.pax}")
-
-        for metric, ax in self.axes.items():
-            for avion, s in self.series[metric].items():
-                s["x"].clear()
-                s["y"].clear()
-                s["line"].set_data([], [])
-                s["shadow"].set_data([], [])
-                outer, inner = s["glow"]
-                outer.set_offsets([[np.nan, np.nan]])
-                inner.set_offsets([[np.nan, np.nan]])
-                outer.set_alpha(0.0)
-                inner.set_alpha(0.0)
-
-            ymax = ymax_sequence(
-                self.direction, self.distance, self.pax, metric)
-            ax.set_ylim(0, ymax)
-            ax.set_title(
-                f"{self.TITLES[metric]} — {self.direction} | {self.distance} km | {self.pax} pax",
-                fontsize=13, fontweight="bold", color=FG, pad=10
-            )
-            self.wind_lines[metric].set_xdata([0, 0])
-            self.best_text[metric].set_text("Best: —")
-
-            fb = self.fill_best[metric]
-            if isinstance(fb, PolyCollection):
-                try:
-                    fb.remove()
-                except Exception:
-                    pass
-            self.fill_best[metric] = None
-
-        self.fig.patch.set_facecolor(BG)
-        self.fig.suptitle(
-            f"Kerosene Flight Optimizator — {self.direction} | {self.distance} km | {self.pax} pax",
-            fontsize=15, fontweight="bold", color=FG
-        )
-        self.canvas.draw()
-        self.step_index = 0
         self.prog["value"] = 0
 
         # reset KPI
-        self.kpi_model.config(text="—")
-        self.kpi_cpx.config(text="—")
-        self.kpi_conso.config(text="—")
-        self.kpi_duree.config(text="—")
-        self.kpi_vit.config(text="—")
+        for kpi in self.kpis:
+            kpi.config(text="—")
 
-    def _etat(self, avion, vent):
-        return calcule_etat(avion, self.direction, vent, self.pax, self.distance)
+    def _show_frame(self, fr, frame_id):
+        # KPIs (textes déjà formatés par le producteur)
+        if fr["kpi"]:
+            for kpi, text in zip(self.kpis, fr["kpi"]):
+                kpi.config(text=text)
+        self.prog["value"] = frame_id + 1
 
     # ----- animation -----
-    def _update(self, frame_id):
+    def _tick(self):
+        now = time.perf_counter()
+        if self._last_tick is not None:
+            self.jitter.append(abs(now - self._last_tick - self.interval) * 1000.0)
+        self._last_tick = now
+
+        self._update(self.step_index)
+        self.apply_ms.append((time.perf_counter() - now) * 1000.0)
+        self.step_index = (self.step_index + 1) % (len(VENT_STEPS) * SUBSTEPS)
+        if self.step_index == 0:
+            self._report_jitter()
+
+        self._deadline += self.interval
+        delay = self._deadline - time.perf_counter()
+        if delay < -self.interval:
+            # trop en retard : on repart de maintenant plutôt que d'enchaîner
+            self._deadline = time.perf_counter()
+            delay = 0.0
+        self.root.after(max(1, int(delay * 1000)), self._tick)
+
+    def _report_jitter(self):
+        if not self.jitter:
+            return
+        p95 = float(np.percentile(self.jitter, 95))
+        msg = (f"[GUI] jitter p95 {p95:.1f} ms (cible {JITTER_TARGET_MS:.0f} ms), "
+               f"frame {np.mean(self.apply_ms):.1f} ms, plans prêts {len(self.producer.ready)}")
+        if p95 > JITTER_TARGET_MS:
+            print(msg, flush=True)
+        else:
+            log(msg)
+
+
+# ====== Headless (Agg, sans Tk) ======
+
+
+class HeadlessApp(SweepDriver):
+    """
+    Même figure et même boucle que l'App, sur un canvas Agg, sans widget
+    ni import de tkinter : CI, suivi de performance, machines sans X.
+    """
+
+    def __init__(self, dpi=100, blit=None, prerender=None):
+        self.fig = Figure(figsize=(10.8, 8.6), dpi=dpi, facecolor=BG)
+        self.view = SweepFigure(self.fig)
+        self.axes = self.view.axes
+        self._init_driver(FigureCanvasAgg(self.fig), blit=blit, prerender=prerender)
+
+    def close(self):
+        self.producer.stop()
+
+    def run(self, frames, fps=None, record=None, warm=True):
+        """
+        Enchaîne `frames` frames, au plus vite (fps=None) ou à cadence
+        fixe ; `record` = chemin MP4 (buffer du canvas envoyé à ffmpeg).
+        Renvoie une ligne par frame : (frame, frame_id, ms, reset, late).
+        """
+        if warm:
+            # régime établi : le producteur a rempli sa file
+            end = time.perf_counter() + 30.0
+            while len(self.producer.ready) < self.producer.ahead and time.perf_counter() < end:
+                time.sleep(0.01)
+        n = len(VENT_STEPS) * SUBSTEPS
+        rec = open_recorder(record, self.canvas.get_width_height(physical=True),
+                            fps or 1000.0 / INTERVAL_MS) if record else None
+        interval = 1.0 / fps if fps else 0.0
+        rows = []
+        deadline = time.perf_counter()
         try:
-            self.step_index = frame_id  # 1 frame = 1 vent step
-            if self.step_index >= len(VENT_STEPS):
-                return []
+            for i in range(frames):
+                frame_id = i % n
+                t0 = time.perf_counter()
+                late = bool(fps) and (t0 - deadline) > interval
+                self._update(frame_id)
+                ms = (time.perf_counter() - t0) * 1000.0
+                if rec is not None:
+                    rec.stdin.write(memoryview(np.asarray(self.canvas.buffer_rgba())).cast("B"))
+                rows.append((i, frame_id, ms, frame_id == 0 and i > 0, late))
+                if fps:
+                    deadline += interval
+                    delay = deadline - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    elif delay < -1.0:
+                        deadline = time.perf_counter()
+        finally:
+            if rec is not None:
+                rec.stdin.close()
+                rec.wait()
+        return rows
+
+
+def open_recorder(path, size, fps):
+    """ffmpeg lisant des frames RGBA brutes sur stdin → MP4 H.264."""
+    w, h = size
+    cmd = [
+        FFMPEG_BIN, "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "rawvideo", "-pix_fmt", "rgba", "-s", f"{w}x{h}",
+        "-r", f"{fps:g}", "-i", "pipe:0",
+        # yuv420p : dimensions paires
+        "-vf", "scale=trunc(iw/2)*2:trunc(ih/2)*2",
+        "-c:v", "libx264", "-pix_fmt", "yuv420p", path,
+    ]
+    return subprocess.Popen(cmd, stdin=subprocess.PIPE)
+
+
+def frame_stats(rows, elapsed, fps=None):
+    """Résumé des temps par frame (JSON-able, comparable entre builds)."""
+    steady = np.array([r[2] for r in rows if not r[3]])
+    resets = [r[2] for r in rows if r[3]]
+    return {
+        "build": APP_BUILD,
+        "frames": len(rows),
+        "fps": round(len(rows) / elapsed, 2) if elapsed else None,
+        "target_fps": round(fps or 1000.0 / INTERVAL_MS, 2),
+        "frame_ms": round(float(steady.mean()), 2),
+        "p50_ms": round(float(np.percentile(steady, 50)), 2),
+        "p95_ms": round(float(np.percentile(steady, 95)), 2),
+        "p99_ms": round(float(np.percentile(steady, 99)), 2),
+        # frame qui change de séquence (le « gel » visible)
+        "reset_ms": round(float(max(resets)), 2) if resets else None,
+        "late": sum(1 for r in rows if r[4]),
+    }
 
-            v_cur = VENT_STEPS[self.step_index]
 
-            if (frame_id % LOG_EVERY) == 0:
-                log(f"[GUI] frame={frame_id} | vent={v_cur} km/h")
-
-            best_model, best_state, best_cpx = None, None, float("inf")
-
-            # Ajout d'un nouveau point pour chaque avion
-            for avion in AVIONS:
-                e = self._etat(avion, v_cur)
-                if not e:
-                    continue
-
-                # update séries
-                for metric in self.METRICS:
-                    s = self.series[metric][avion]
-                    s["x"].append(v_cur)
-                    s["y"].append(e[metric])
-                    s["line"].set_data(s["x"], s["y"])
-                    s["shadow"].set_data(s["x"], s["y"])
-
-                # meilleur L/pax au vent courant
-                cpx_cur = e["conso_L_pax"]
-                if cpx_cur < best_cpx:
-                    best_cpx = cpx_cur
-                    best_model = avion
-                    best_state = e
-
-            # styliser gagnant, ligne de vent, remplissage & glow
-            for metric, ax in self.axes.items():
-                for avion, s in self.series[metric].items():
-                    is_best = (avion == best_model)
-                    s["line"].set_linewidth(3.8 if is_best else 2.4)
-                    s["line"].set_alpha(1.0 if is_best else 0.70)
-                    s["shadow"].set_alpha(0.30 if is_best else 0.14)
+# ====== Benchmark offscreen ======
 
-                self.wind_lines[metric].set_xdata([v_cur, v_cur])
 
-                # remplissage sous la meilleure courbe — x déjà croissants
-                if best_model:
-                    bx = self.series[metric][best_model]["x"]
-                    by = self.series[metric][best_model]["y"]
-                    if len(bx) >= 2:
-                        bx_np = np.asarray(bx, dtype=float)
-                        by_np = np.asarray(by, dtype=float)
-
-                        fb = self.fill_best[metric]
-                        if isinstance(fb, PolyCollection):
-                            try:
-                                fb.remove()
-                            except Exception:
-                                pass
-                        self.fill_best[metric] = ax.fill_between(
-                            bx_np, by_np, step="pre",
-                            color=PALETTE[best_model], alpha=0.10, zorder=0
-                        )
-
-                self.best_text[metric].set_text(
-                    f"Best: {best_model if best_model else '—'}")
+BENCH_MODES = {
+    # mode: (blit, pré-rendu des fonds)
+    "full": (False, False),
+    "blit": (True, False),
+    "producer": (True, True),
+}
 
-                # glow marker collé sur la courbe (pas de décalage)
-                if best_model:
-                    bx = self.series[metric][best_model]["x"]
-                    by = self.series[metric][best_model]["y"]
-                    if len(bx) > 0:
-                        x_last = bx[-1]
-                        y_last = by[-1]
-                        outer, inner = self.series[metric][best_model]["glow"]
-                        outer.set_offsets([[x_last, y_last]])
-                        inner.set_offsets([[x_last, y_last]])
-                        outer.set_alpha(0.28)
-                        inner.set_alpha(1.0)
-
-            # KPIs
-            if best_model and best_state:
-                self.kpi_model.config(text=best_model)
-                self.kpi_cpx.config(text=f"{best_state['conso_L_pax']:.1f}")
-                self.kpi_conso.config(
-                    text=f"{best_state['conso_L']:,.0f}".replace(",", " "))
-                self.kpi_duree.config(text=f"{best_state['duree_h']:.2f}")
-                self.kpi_vit.config(text=f"{best_state['vitesse']:.0f}")
-
-            self.fig.suptitle(
-                f"Vent {v_cur:3.0f} km/h   |   {self.direction}   "
-                f"|   {self.distance} km   |   {self.pax} pax",
-                fontsize=14, fontweight="bold", color=FG
-            )
 
-            self.prog["value"] = frame_id + 1
+def benchmark(sweeps=3, mode="producer", dpi=100):
+    """
+    Temps par frame de la figure de l'App en headless. mode : "full"
+    (rendu complet à chaque frame), "blit" (fonds en cache) ou "producer"
+    (blit + fonds de séquence pré-rendus par le producteur).
+    """
+    blit, prerender = BENCH_MODES[mode]
+    app = HeadlessApp(dpi=dpi, blit=blit, prerender=prerender)
+    try:
+        t0 = time.perf_counter()
+        rows = app.run(len(VENT_STEPS) * SUBSTEPS * sweeps)
+        elapsed = time.perf_counter() - t0
+    finally:
+        app.close()
+    return {"mode": mode, **frame_stats(rows, elapsed)}
 
-            total_frames = len(VENT_STEPS) * SUBSTEPS
-            if frame_id == total_frames - 1:
-                self.current_seq = next(self.seq_gen)
-                self._reset_sequence(self.current_seq)
 
-            self.canvas.draw_idle()
-            return []
-        except Exception:
-            traceback.print_exc()
-            log("[GUI] ERROR in _update")
-            return []
+# ====== main ======
 
 
-# ====== main ======
-if __name__ == "__main__":
+def main(argv=None):
+    import argparse
+    import json
+    ap = argparse.ArgumentParser(description="Kerosene Flight Optimizator — UI Neon Dark")
+    ap.add_argument("--headless", action="store_true", default=HEADLESS,
+                    help="figure Agg sans fenêtre Tk (défaut : HEADLESS=1)")
+    ap.add_argument("--sweeps", type=int, default=3,
+                    help="séquences à jouer en headless")
+    ap.add_argument("--frames", type=int, default=None,
+                    help="nombre de frames (prioritaire sur --sweeps)")
+    ap.add_argument("--fps", type=float, default=0.0,
+                    help="cadence fixe en headless (0 = au plus vite)")
+    ap.add_argument("--record", metavar="OUT.mp4", help="enregistre la session en MP4")
+    ap.add_argument("--timings", metavar="OUT.csv", help="temps par frame en CSV")
+    ap.add_argument("--export", metavar="OUT.csv|OUT.arrow",
+                    help="exporte les points joués (CSV, ou Arrow IPC avec pyarrow)")
+    ap.add_argument("--bench", action="store_true",
+                    help="compare full / blit / producer en headless")
+    args = ap.parse_args(argv)
+
+    if args.bench:
+        for mode in BENCH_MODES:
+            r = benchmark(sweeps=args.sweeps, mode=mode)
+            # pas de changement de séquence sur un seul balayage
+            reset = f"{r['reset_ms']:.1f} ms" if r["reset_ms"] is not None else "n/a"
+            print(f"[BENCH] {r['mode']:8s} {r['fps']:6.1f} FPS  "
+                  f"({r['frame_ms']:.1f} ms/frame, p95 {r['p95_ms']:.1f} ms, "
+                  f"reset {reset}, target {r['target_fps']:.0f} FPS, "
+                  f"{r['frames']} frames)")
+        return
+
+    exporter = export.ExportWriter(args.export, CATALOG.names) if args.export else None
+
+    if args.headless:
+        app = HeadlessApp()
+        app.exporter = exporter
+        frames = args.frames or len(VENT_STEPS) * SUBSTEPS * args.sweeps
+        try:
+            t0 = time.perf_counter()
+            rows = app.run(frames, fps=args.fps or None, record=args.record)
+            elapsed = time.perf_counter() - t0
+        finally:
+            app.close()
+            if exporter is not None:
+                print(f"[GUI] export : {exporter.close()}")
+        if args.timings:
+            with open(args.timings, "w", encoding="utf-8") as f:
+                f.write("frame,frame_id,ms,reset,late\n")
+                for i, frame_id, ms, reset, late in rows:
+                    f.write(f"{i},{frame_id},{ms:.3f},{int(reset)},{int(late)}\n")
+        print(json.dumps(frame_stats(rows, elapsed, args.fps or None)))
+        if args.record:
+            print(f"[GUI] vidéo : {args.record}")
+        return
+
+    import tkinter as tk
+    import matplotlib
+    matplotlib.use("TkAgg")
     root = tk.Tk()
-    app = App(root)
-    root.mainloop()
+    App(root).exporter = exporter
+    try:
+        root.mainloop()
+    finally:
+        if exporter is not None:
+            print(f"[GUI] export : {exporter.close()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,13 @@ import random
 import matplotlib
 matplotlib.use("Agg")  # backend headless
 
+from catalog import load_catalog
+from fleet_plot import FleetArtists, fleet_colors, rank_by, use_collections
+from output_index import get_index
+from render_cache import get_cache, render_key
+from gif_encoder import GIF_ENCODER, GIF_DECIMATE, save_figure_gif
+import fuel_model
+
 print("[INFO] Python:", sys.version.split()[0])
 print("[INFO] MPL backend:", matplotlib.get_backend())
 print("[INFO] ffmpeg disponible:", writers.is_available("ffmpeg"))
@@ -19,14 +26,10 @@ FPS = int(os.getenv("FPS", "10"))
 INTERVAL_MS = int(os.getenv("INTERVAL_MS", "90"))
 SHUFFLE_SEQUENCES = os.getenv("SHUFFLE_SEQUENCES", "0")
 
-AVIONS = {
-    "A320": {"poids_vide": 42000,  "conso_base": 2.4, "max_pax": 180, "sens_vent": 1.0, "vitesse": 840},
-    "B737": {"poids_vide": 41413,  "conso_base": 2.6, "max_pax": 190, "sens_vent": 1.1, "vitesse": 842},
-    "B777": {"poids_vide": 134800, "conso_base": 5.0, "max_pax": 396, "sens_vent": 1.3, "vitesse": 905},
-    "A380": {"poids_vide": 277000, "conso_base": 8.0, "max_pax": 850, "sens_vent": 1.5, "vitesse": 945},
-}
-POIDS_PASSAGER = 80
-POIDS_BAGAGE = 23
+CATALOG = load_catalog()   # AIRCRAFT_CATALOG, défaut data/aircraft.csv
+AVIONS = CATALOG.as_dict()
+POIDS_PASSAGER = fuel_model.POIDS_PASSAGER
+POIDS_BAGAGE = fuel_model.POIDS_BAGAGE
 VENTS = list(range(0, 301, 10))
 DIRECTIONS = ["head", "tail", "side"]
 DISTANCES = [800, 1200, 1600, 2000]
@@ -36,33 +39,28 @@ COULEURS = {"A320": "#1f77b4", "B737": "#2ca02c",
 
 
 def calcule_etat(avion_key: str, direction: str, vent: int, pax: int, distance: int):
-    specs = AVIONS[avion_key]
-    if pax > specs["max_pax"]:
+    specs = CATALOG.spec(avion_key)
+    if pax > specs.max_pax:
         return None
-    masse = specs["poids_vide"] + pax * (POIDS_PASSAGER + POIDS_BAGAGE)
+    masse = specs.poids_vide + pax * (POIDS_PASSAGER + POIDS_BAGAGE)
     if direction == "head":
-        coef = vent * 0.005 * specs["sens_vent"]
-        vitesse = specs["vitesse"] - vent
+        coef = vent * 0.005 * specs.sens_vent
+        vitesse = specs.vitesse - vent
     elif direction == "tail":
-        coef = vent * -0.003 * specs["sens_vent"]
-        vitesse = specs["vitesse"] + vent
+        coef = vent * -0.003 * specs.sens_vent
+        vitesse = specs.vitesse + vent
     else:
-        coef = vent * 0.001 * specs["sens_vent"]
-        vitesse = specs["vitesse"]
+        coef = vent * 0.001 * specs.sens_vent
+        vitesse = specs.vitesse
     vitesse = max(600, min(1000, vitesse))
-    conso_km = specs["conso_base"] + (masse / 1000.0) * 0.1 + coef
+    conso_km = specs.conso_base + (masse / 1000.0) * 0.1 + coef
     conso_L = conso_km * distance
     return {"conso_L": conso_L, "conso_L_pax": conso_L / pax, "duree_h": distance / vitesse, "vitesse": vitesse}
 
 
 def ymax_sequence(direction: str, distance: int, pax: int, metric: str) -> float:
-    y_max = 0.0
-    for vent in VENTS:
-        for avion in AVIONS:
-            etat = calcule_etat(avion, direction, vent, pax, distance)
-            if etat:
-                y_max = max(y_max, etat[metric])
-    return (y_max * 1.12) if y_max > 0 else 1.0
+    return fuel_model.ymax(CATALOG, direction, distance, pax, metric,
+                           vents=VENTS, headroom=1.12)
 
 
 def all_sequences():
@@ -87,17 +85,15 @@ def next_sequence():
     return seq
 
 
-def render_one_video(out_dir=OUT_DIR):
-    print(f"[RENDER] out_dir={out_dir}")
-    os.makedirs(out_dir, exist_ok=True)
-    assert os.path.isdir(
-        out_dir), f"[ERR] Dossier sortie introuvable: {out_dir}"
+def render_colors():
+    """Couleur par avion du catalogue (COULEURS, sinon colormap)."""
+    return {n: tuple(c) for n, c in zip(
+        CATALOG.names, fleet_colors(CATALOG.names, COULEURS))}
 
-    seq = next_sequence()
-    direction, distance, pax = seq["direction"], seq["distance"], seq["pax"]
-    print(
-        f"[RENDER] sequence: direction={direction}, distance={distance}, pax={pax}")
 
+def build_animation(seq):
+    """Figure 1×3 + fonction update(frame_idx) pour une séquence."""
+    direction, distance, pax = seq["direction"], seq["distance"], seq["pax"]
     fig, axes = plt.subplots(1, 3, figsize=(13.5, 4.8), dpi=100)
     ax_conso, ax_cpx, ax_duree = axes
     for ax in axes:
@@ -117,90 +113,171 @@ def render_one_video(out_dir=OUT_DIR):
     ax_cpx.set_ylim(0, ymax_sequence(direction, distance, pax, "conso_L_pax"))
     ax_duree.set_ylim(0, ymax_sequence(direction, distance, pax, "duree_h"))
 
-    series = {"conso_L": {}, "conso_L_pax": {}, "duree_h": {}}
     wind_lines = {
         "conso_L": ax_conso.axvline(0, color="#444", lw=1.2, ls="--", alpha=0.6),
         "conso_L_pax": ax_cpx.axvline(0, color="#444", lw=1.2, ls="--", alpha=0.6),
         "duree_h": ax_duree.axvline(0, color="#444", lw=1.2, ls="--", alpha=0.6),
     }
-    labels = {"conso_L": {}, "conso_L_pax": {}, "duree_h": {}}
-
-    for avion, color in COULEURS.items():
-        l1, = ax_conso.plot([], [], lw=2.4, color=color, label=avion)
-        l2, = ax_cpx.plot([], [], lw=2.4, color=color, label=avion)
-        l3, = ax_duree.plot([], [], lw=2.4, color=color, label=avion)
-        series["conso_L"][avion] = {"x": [], "y": [], "line": l1}
-        series["conso_L_pax"][avion] = {"x": [], "y": [], "line": l2}
-        series["duree_h"][avion] = {"x": [], "y": [], "line": l3}
-        labels["conso_L"][avion] = ax_conso.text(
-            0, 0, "", color=color, fontsize=9, ha="left", va="center", alpha=0.8)
-        labels["conso_L_pax"][avion] = ax_cpx.text(
-            0, 0, "", color=color, fontsize=9, ha="left", va="center", alpha=0.8)
-        labels["duree_h"][avion] = ax_duree.text(
-            0, 0, "", color=color, fontsize=9, ha="left", va="center", alpha=0.8)
-
-    ax_conso.legend(loc="upper left", frameon=False, fontsize=9)
-    ax_cpx.legend(loc="upper left", frameon=False, fontsize=9)
-    ax_duree.legend(loc="upper left", frameon=False, fontsize=9)
+    metric_axes = (("conso_L", ax_conso), ("conso_L_pax", ax_cpx), ("duree_h", ax_duree))
+    colors = render_colors()
 
     fig.suptitle(
         f"Snapsac — {direction} | {distance} km | {pax} pax", fontsize=12, fontweight="bold")
 
-    def update(frame_idx):
-        vent = VENTS[frame_idx]
-        best_model, best_cpx = None, float("inf")
-        for avion in AVIONS:
-            etat = calcule_etat(avion, direction, vent, pax, distance)
-            if not etat:
-                continue
-            for metric, ax in (("conso_L", ax_conso), ("conso_L_pax", ax_cpx), ("duree_h", ax_duree)):
-                value = etat[metric]
-                s = series[metric][avion]
-                s["x"].append(vent)
-                s["y"].append(value)
-                s["line"].set_data(s["x"], s["y"])
-                labels[metric][avion].set_text(avion)
-                labels[metric][avion].set_position((vent + 4, value))
-            if etat["conso_L_pax"] < best_cpx:
-                best_cpx = etat["conso_L_pax"]
-                best_model = avion
-        for metric in series:
-            for avion, s in series[metric].items():
-                s["line"].set_linewidth(3.2 if avion == best_model else 2.0)
-                s["line"].set_alpha(1.0 if avion == best_model else 0.55)
-            wind_lines[metric].set_xdata([vent, vent])
-        fig.suptitle(
-            f"Snapsac — {direction} | Vent {vent} km/h | {distance} km | {pax} pax — Best: {best_model}",
-            fontsize=12, fontweight="bold"
-        )
-        return []
+    if use_collections(len(CATALOG)):
+        # Flotte nombreuse : 1 LineCollection + 1 scatter + top-K étiquettes par axe
+        sweep = fuel_model.evaluate(CATALOG, direction, VENTS, pax, distance)
+        fleet = {metric: FleetArtists(ax, CATALOG.names, list(colors.values()),
+                                      lw=2.0, best_lw=3.2, alpha=0.55,
+                                      label_kw={"alpha": 0.8})
+                 for metric, ax in metric_axes}
+
+        def update(frame_idx):
+            vent = VENTS[frame_idx]
+            rank = rank_by(sweep["conso_L_pax"][:, frame_idx])
+            best = int(rank[0]) if rank.size else None
+            for metric, _ in metric_axes:
+                fleet[metric].update(VENTS[:frame_idx + 1],
+                                     sweep[metric][:, :frame_idx + 1],
+                                     best=best, rank=rank)
+                wind_lines[metric].set_xdata([vent, vent])
+            best_model = CATALOG.names[best] if best is not None else None
+            fig.suptitle(
+                f"Snapsac — {direction} | Vent {vent} km/h | {distance} km | {pax} pax — Best: {best_model}",
+                fontsize=12, fontweight="bold"
+            )
+            return []
+    else:
+        series = {"conso_L": {}, "conso_L_pax": {}, "duree_h": {}}
+        labels = {"conso_L": {}, "conso_L_pax": {}, "duree_h": {}}
+
+        for avion, color in colors.items():
+            l1, = ax_conso.plot([], [], lw=2.4, color=color, label=avion)
+            l2, = ax_cpx.plot([], [], lw=2.4, color=color, label=avion)
+            l3, = ax_duree.plot([], [], lw=2.4, color=color, label=avion)
+            series["conso_L"][avion] = {"x": [], "y": [], "line": l1}
+            series["conso_L_pax"][avion] = {"x": [], "y": [], "line": l2}
+            series["duree_h"][avion] = {"x": [], "y": [], "line": l3}
+            labels["conso_L"][avion] = ax_conso.text(
+                0, 0, "", color=color, fontsize=9, ha="left", va="center", alpha=0.8)
+            labels["conso_L_pax"][avion] = ax_cpx.text(
+                0, 0, "", color=color, fontsize=9, ha="left", va="center", alpha=0.8)
+            labels["duree_h"][avion] = ax_duree.text(
+                0, 0, "", color=color, fontsize=9, ha="left", va="center", alpha=0.8)
+
+        ax_conso.legend(loc="upper left", frameon=False, fontsize=9)
+        ax_cpx.legend(loc="upper left", frameon=False, fontsize=9)
+        ax_duree.legend(loc="upper left", frameon=False, fontsize=9)
+
+        def update(frame_idx):
+            vent = VENTS[frame_idx]
+            best_model, best_cpx = None, float("inf")
+            for avion in AVIONS:
+                etat = calcule_etat(avion, direction, vent, pax, distance)
+                if not etat:
+                    continue
+                for metric, ax in (("conso_L", ax_conso), ("conso_L_pax", ax_cpx), ("duree_h", ax_duree)):
+                    value = etat[metric]
+                    s = series[metric][avion]
+                    s["x"].append(vent)
+                    s["y"].append(value)
+                    s["line"].set_data(s["x"], s["y"])
+                    labels[metric][avion].set_text(avion)
+                    labels[metric][avion].set_position((vent + 4, value))
+                if etat["conso_L_pax"] < best_cpx:
+                    best_cpx = etat["conso_L_pax"]
+                    best_model = avion
+            for metric in series:
+                for avion, s in series[metric].items():
+                    s["line"].set_linewidth(3.2 if avion == best_model else 2.0)
+                    s["line"].set_alpha(1.0 if avion == best_model else 0.55)
+                wind_lines[metric].set_xdata([vent, vent])
+            fig.suptitle(
+                f"Snapsac — {direction} | Vent {vent} km/h | {distance} km | {pax} pax — Best: {best_model}",
+                fontsize=12, fontweight="bold"
+            )
+            return []
 
     fig.tight_layout(rect=(0, 0.03, 1, 0.95))
+    return fig, update, len(VENTS)
+
+
+def render_one_video(out_dir=OUT_DIR):
+    print(f"[RENDER] out_dir={out_dir}")
+    os.makedirs(out_dir, exist_ok=True)
+    assert os.path.isdir(
+        out_dir), f"[ERR] Dossier sortie introuvable: {out_dir}"
+
+    seq = next_sequence()
+    direction, distance, pax = seq["direction"], seq["distance"], seq["pax"]
+    print(
+        f"[RENDER] sequence: direction={direction}, distance={distance}, pax={pax}")
+
+    # Cache adressé par contenu : même séquence + avions + réglages + code
+    # → on réutilise le fichier déjà encodé (hardlink) au lieu de ré-encoder
+    fmt = "mp4" if writers.is_available("ffmpeg") else "gif"
+    fps = FPS if fmt == "mp4" else 1000.0 / INTERVAL_MS
+    ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    out_path = os.path.join(
+        out_dir, f"animation_{direction}_{distance}km_{pax}pax_{ts}.{fmt}")
+    cache = get_cache(out_dir)
+    key = render_key(seq, CATALOG, {
+        "fps": FPS, "dpi": 100, "interval_ms": INTERVAL_MS, "vents": VENTS,
+        "fmt": fmt, "batched": use_collections(len(CATALOG)),
+        "gif": (GIF_ENCODER, GIF_DECIMATE) if fmt == "gif" else None,
+    })
+    if cache is not None and cache.materialize(key, fmt, out_path):
+        print("[RENDER] cache hit:", out_path)
+        _index_output(out_dir, out_path, seq, fps)
+        return out_path
+
+    fig, update, frames = build_animation(seq)
 
     try:
-        anim = FuncAnimation(fig, update, frames=len(
-            VENTS), interval=INTERVAL_MS, blit=False)
-        ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        out_path_mp4 = os.path.join(
-            out_dir, f"animation_{direction}_{distance}km_{pax}pax_{ts}.mp4")
-        if writers.is_available("ffmpeg"):
-            print("[RENDER] writing MP4:", out_path_mp4)
+        # Pas de FuncAnimation pour l'encodeur GIF rapide : son draw_event
+        # déclencherait une frame d'init en plus
+        if fmt == "mp4" or GIF_ENCODER != "fast":
+            anim = FuncAnimation(fig, update, frames=frames,
+                                 interval=INTERVAL_MS, blit=False)
+        if fmt == "mp4":
+            print("[RENDER] writing MP4:", out_path)
             writer = FFMpegWriter(
                 fps=FPS, metadata={'artist': 'Kerosene-Flight-Optimizator'})
-            anim.save(out_path_mp4, writer=writer, dpi=100)
-            print("[RENDER] OK MP4:", out_path_mp4)
+            anim.save(out_path, writer=writer, dpi=100)
+            print("[RENDER] OK MP4:", out_path)
         else:
-            out_path_gif = os.path.join(
-                out_dir, f"animation_{direction}_{distance}km_{pax}pax_{ts}.gif")
-            print("[RENDER] ffmpeg indisponible → GIF:", out_path_gif)
-            anim.save(out_path_gif, writer="pillow", dpi=100)
-            print("[RENDER] OK GIF:", out_path_gif)
+            print("[RENDER] ffmpeg indisponible → GIF:", out_path)
+            if GIF_ENCODER == "fast":
+                # palette globale + diff de frames (cf. gif_encoder.py)
+                save_figure_gif(fig, update, frames, out_path, fps,
+                                render_colors().values(), dpi=100)
+            else:
+                anim.save(out_path, writer="pillow", dpi=100)
+            print("[RENDER] OK GIF:", out_path)
     except Exception as e:
         print("[ERROR] render failed:", e, file=sys.stderr)
         raise
     finally:
         plt.close(fig)
 
+    if cache is not None:
+        try:
+            cache.store(key, fmt, out_path)
+        except OSError as e:
+            print("[WARN] render cache store failed:", e, file=sys.stderr)
+    _index_output(out_dir, out_path, seq, fps)
+    return out_path
+
+
+def _index_output(out_dir, out_path, seq, fps):
+    # Index de sortie (server.py /last, /videos) : pas de scan du dossier
+    try:
+        get_index(out_dir).add(out_path, direction=seq["direction"],
+                               distance=seq["distance"], pax=seq["pax"],
+                               frames=len(VENTS), fps=fps)
+    except Exception as e:
+        print("[WARN] output index update failed:", e, file=sys.stderr)
+
 
 def main():
     print("[MAIN] out_dir:", OUT_DIR)
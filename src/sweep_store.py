@@ -0,0 +1,378 @@
+"""
+sweep_store.py
+Out-of-core sweeps of the continuous scenario space.
+
+The animations only visit DISTANCES × PAX_LIST (4 × 6). Here the space is
+direction × distance × wind × pax (e.g. 100–15000 km by 10 km, pax from 1
+to the largest max_pax) × aircraft — hundreds of millions of points. It
+is generated lazily in chunks of about SWEEP_CHUNK_ELEMS values, each
+chunk is evaluated with one fuel_model.evaluate call and written straight
+into memory-mapped .npy files, so RAM stays flat whatever the grid size.
+
+Layout of a store directory:
+
+    index.json          axes, shape, metrics, catalog fingerprint, done chunks
+    <metric>.npy        (direction, distance, vent, pax, aircraft) float32
+    best.npy            (direction, distance, vent, pax) int16, argmin L/pax
+                        (-1: no aircraft can carry pax)
+
+Axes are regular (start, stop, step), so a coordinate maps to an index
+arithmetically and any query is a plain memmap slice: only the touched
+pages are read. NaN marks aircraft that cannot carry the pax count.
+Chunks are recorded in index.json as they land, so an interrupted build
+resumes where it stopped.
+
+    python sweep_store.py build OUT [--distance 100:15000:10] [--vent 0:300:20]
+    python sweep_store.py info OUT
+    python sweep_store.py query OUT --direction head --distance 4200 --vent 60 --pax 300
+    python sweep_store.py plot OUT best.png --direction head --vent 60
+"""
+import os
+import json
+import hashlib
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+import fuel_model
+
+SWEEP_CHUNK_ELEMS = int(os.getenv("SWEEP_CHUNK_ELEMS", "4000000"))
+SWEEP_WORKERS = int(os.getenv("SWEEP_WORKERS", "1"))
+SWEEP_DTYPE = os.getenv("SWEEP_DTYPE", "float32")
+
+INDEX = "index.json"
+BEST = "best"
+AXES = ("direction", "distance", "vent", "pax")
+METRICS = ("conso_L_pax", "conso_L", "duree_h")
+DEFAULT_RANGES = {"distance": (100, 15000, 10), "vent": (0, 300, 20)}
+FORMAT_VERSION = 1
+
+
+def axis_values(spec):
+    """Values of an axis: list of labels, or inclusive [start, stop, step]."""
+    if isinstance(spec[0], str):
+        return list(spec)
+    start, stop, step = spec
+    return np.arange(start, stop + step / 2.0, step, dtype=np.float64)
+
+
+def parse_range(text):
+    """'100:15000:10' → (100.0, 15000.0, 10.0)."""
+    parts = [float(p) for p in text.split(":")]
+    if len(parts) != 3 or parts[2] <= 0 or parts[1] < parts[0]:
+        raise ValueError(f"range must be start:stop:step, got {text!r}")
+    return tuple(parts)
+
+
+def catalog_key(catalog):
+    return hashlib.sha1(catalog.fingerprint()).hexdigest()
+
+
+def _write_json(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp, path)
+
+
+class SweepStore:
+    """A store directory; use SweepStore.create() or SweepStore.open()."""
+
+    def __init__(self, path, index, mode="r"):
+        self.path = path
+        self.index = index
+        self.mode = mode
+        self.axes = {a: axis_values(index["axes"][a]) for a in AXES}
+        self.names = index["names"]
+        self.shape = tuple(index["shape"])
+        self._arrays = {}
+
+    # ----- creation / opening -----
+    @classmethod
+    def create(cls, path, catalog, distance=DEFAULT_RANGES["distance"],
+               vent=DEFAULT_RANGES["vent"], pax=None, directions=fuel_model.DIRECTIONS,
+               metrics=METRICS, dtype=SWEEP_DTYPE, chunk_elems=SWEEP_CHUNK_ELEMS):
+        """
+        New store, or the existing one at `path` when it was created with
+        the same axes/metrics/catalog (so build() resumes it).
+        """
+        pax = pax or (1, int(catalog.max_pax.max()), 1)
+        axes = {"direction": list(directions), "distance": list(distance),
+                "vent": list(vent), "pax": list(pax)}
+        shape = tuple(len(axis_values(axes[a])) for a in AXES) + (len(catalog),)
+        per_distance = shape[2] * shape[3] * shape[4]
+        block = max(1, min(shape[1], chunk_elems // per_distance))
+        index = {
+            "version": FORMAT_VERSION,
+            "catalog": catalog_key(catalog),
+            "names": list(catalog.names),
+            "axes": axes,
+            "shape": list(shape),
+            "dtype": np.dtype(dtype).name,
+            "metrics": list(metrics),
+            "chunk": {"axis": "distance", "size": block},
+            "done": [],
+            "seconds": 0.0,
+        }
+        existing = cls._read_index(path)
+        same = ("version", "catalog", "axes", "shape", "dtype", "metrics", "chunk")
+        if existing and all(existing.get(k) == index[k] for k in same):
+            return cls(path, existing, mode="r+")
+
+        os.makedirs(path, exist_ok=True)
+        for m in metrics:
+            open_memmap(os.path.join(path, f"{m}.npy"), mode="w+",
+                        dtype=index["dtype"], shape=shape)
+        open_memmap(os.path.join(path, f"{BEST}.npy"), mode="w+",
+                    dtype=np.int16, shape=shape[:-1])
+        _write_json(os.path.join(path, INDEX), index)
+        return cls(path, index, mode="r+")
+
+    @classmethod
+    def open(cls, path, mode="r"):
+        index = cls._read_index(path)
+        if index is None:
+            raise FileNotFoundError(f"no sweep store at {path}")
+        if index.get("version") != FORMAT_VERSION:
+            raise ValueError(f"sweep store version {index.get('version')} not supported")
+        return cls(path, index, mode)
+
+    @staticmethod
+    def _read_index(path):
+        try:
+            with open(os.path.join(path, INDEX), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    # ----- build -----
+    def chunks(self):
+        """All chunk ids → (direction index, distance slice)."""
+        block = self.index["chunk"]["size"]
+        n_dist = self.shape[1]
+        per_dir = -(-n_dist // block)
+        for cid in range(self.shape[0] * per_dir):
+            d, b = divmod(cid, per_dir)
+            yield cid, d, slice(b * block, min((b + 1) * block, n_dist))
+
+    @property
+    def complete(self):
+        return len(self.index["done"]) == sum(1 for _ in self.chunks())
+
+    @property
+    def points(self):
+        return int(np.prod(self.shape))
+
+    def build(self, catalog, workers=SWEEP_WORKERS, progress=None):
+        """Evaluate every missing chunk; returns points/s of this run."""
+        if catalog_key(catalog) != self.index["catalog"]:
+            raise ValueError("catalog changed since the store was created")
+        done = set(self.index["done"])
+        todo = [(cid, d, s.start, s.stop) for cid, d, s in self.chunks() if cid not in done]
+        total = sum(1 for _ in self.chunks())
+        t0 = time.perf_counter()
+        if workers > 1 and len(todo) > 1:
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(workers, mp_context=ctx) as pool:
+                results = pool.map(_write_chunk, [(self.path, catalog, c) for c in todo])
+                self._record(results, total, t0, progress)
+        else:
+            self._record((_write_chunk((self.path, catalog, c)) for c in todo),
+                         total, t0, progress)
+        seconds = time.perf_counter() - t0
+        done_points = len(todo) * self.points / max(total, 1)
+        return done_points / seconds if seconds > 0 else 0.0
+
+    def _record(self, results, total, t0, progress):
+        for cid in results:
+            self.index["done"].append(cid)
+            self.index["seconds"] = round(self.index["seconds"] + (time.perf_counter() - t0), 3)
+            t0 = time.perf_counter()
+            _write_json(os.path.join(self.path, INDEX), self.index)
+            if progress:
+                progress(len(self.index["done"]), total)
+
+    # ----- queries -----
+    def array(self, metric):
+        """Memory-mapped array of `metric` (or "best")."""
+        if metric not in self._arrays:
+            if metric != BEST and metric not in self.index["metrics"]:
+                raise KeyError(f"metric not in store: {metric!r}")
+            self._arrays[metric] = np.load(os.path.join(self.path, f"{metric}.npy"),
+                                           mmap_mode=self.mode)
+        return self._arrays[metric]
+
+    def locate(self, axis, value):
+        """Index of `value` on `axis` (nearest grid point for numeric axes)."""
+        spec = self.index["axes"][axis]
+        if axis == "direction":
+            try:
+                return spec.index(value)
+            except ValueError:
+                raise ValueError(f"direction not in store: {value!r}") from None
+        start, stop, step = spec
+        if not (start - step / 2.0 <= float(value) <= stop + step / 2.0):
+            raise ValueError(f"{axis}={value} outside [{start}, {stop}]")
+        return int(round((float(value) - start) / step))
+
+    def _key(self, coords):
+        key = []
+        for axis in AXES:
+            c = coords.get(axis)
+            if c is None:
+                key.append(slice(None))
+            elif isinstance(c, tuple):
+                lo, hi = c
+                key.append(slice(self.locate(axis, lo), self.locate(axis, hi) + 1))
+            else:
+                key.append(self.locate(axis, c))
+        return tuple(key)
+
+    def select(self, metric, aircraft=None, **coords):
+        """
+        Slice of `metric`: each axis given as a value, a (lo, hi) inclusive
+        range or omitted (whole axis); `aircraft` as a name or omitted.
+        """
+        key = self._key(coords)
+        if aircraft is not None:
+            key += (self.names.index(aircraft),)
+        return self.array(metric)[key]
+
+    def best(self, **coords):
+        """Best-aircraft indices (-1: none) for the selected points."""
+        return self.array(BEST)[self._key(coords)]
+
+    def info(self):
+        sizes = sum(os.path.getsize(os.path.join(self.path, f"{m}.npy"))
+                    for m in list(self.index["metrics"]) + [BEST])
+        return {
+            "path": self.path,
+            "shape": dict(zip(AXES + ("aircraft",), self.shape)),
+            "points": self.points,
+            "metrics": self.index["metrics"],
+            "chunks": f"{len(self.index['done'])}/{sum(1 for _ in self.chunks())}",
+            "size_mb": round(sizes / 1e6, 1),
+            "build_s": self.index["seconds"],
+        }
+
+
+def _write_chunk(args):
+    """Evaluate one (direction, distance block) and write it in place."""
+    path, catalog, (cid, d, lo, hi) = args
+    store = SweepStore.open(path, mode="r+")
+    dist = store.axes["distance"][lo:hi, None, None]
+    vent = store.axes["vent"][None, :, None]
+    pax = store.axes["pax"][None, None, :]
+    direction = store.axes["direction"][d]
+    e = fuel_model.evaluate(catalog, direction, vent, pax, dist)
+    for m in store.index["metrics"]:
+        store.array(m)[d, lo:hi] = np.moveaxis(e[m], 0, -1)
+    cpx = e["conso_L_pax"]
+    finite = np.isfinite(cpx)
+    best = np.where(finite.any(axis=0),
+                    np.argmin(np.where(finite, cpx, np.inf), axis=0), -1)
+    store.array(BEST)[d, lo:hi] = best
+    for a in store._arrays.values():
+        a.flush()
+    return cid
+
+
+def plot_best_map(store, direction, vent, path, colors=None, dpi=100):
+    """Best aircraft over (distance, pax) for one direction and wind, as PNG."""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.colors import ListedColormap
+    from matplotlib.patches import Patch
+    from fleet_plot import fleet_colors
+
+    best = np.asarray(store.best(direction=direction, vent=vent))    # (distance, pax)
+    if colors is None:
+        colors = fleet_colors(store.names)
+    cmap = ListedColormap(["#202436"] + [tuple(c) for c in colors])
+    d, p = store.axes["distance"], store.axes["pax"]
+    fig = Figure(figsize=(9, 6), dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.imshow(best.T + 1, origin="lower", aspect="auto", cmap=cmap, interpolation="nearest",
+              vmin=0, vmax=len(store.names), extent=(d[0], d[-1], p[0], p[-1]))
+    ax.set_xlabel("Distance (km)")
+    ax.set_ylabel("Passengers")
+    ax.set_title(f"Best aircraft (L/pax) — {direction}, wind {vent:g} km/h")
+    ax.legend(handles=[Patch(color=cmap(i + 1), label=n) for i, n in enumerate(store.names)],
+              loc="upper right", fontsize=8)
+    fig.savefig(path)
+    return path
+
+
+# ====== CLI ======
+
+
+def main(argv=None):
+    import argparse
+    from catalog import load_catalog
+    ap = argparse.ArgumentParser(description="Chunked out-of-core scenario sweeps")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="create (or resume) a store")
+    b.add_argument("out")
+    b.add_argument("--distance", type=parse_range, default=DEFAULT_RANGES["distance"])
+    b.add_argument("--vent", type=parse_range, default=DEFAULT_RANGES["vent"])
+    b.add_argument("--pax", type=parse_range, default=None,
+                   help="default 1:<largest max_pax>:1")
+    b.add_argument("--workers", type=int, default=SWEEP_WORKERS)
+    b.add_argument("--chunk-elems", type=int, default=SWEEP_CHUNK_ELEMS)
+    i = sub.add_parser("info")
+    i.add_argument("out")
+    q = sub.add_parser("query", help="every aircraft at one scenario point")
+    q.add_argument("out")
+    for name in AXES:
+        q.add_argument(f"--{name}", required=True,
+                       type=str if name == "direction" else float)
+    p = sub.add_parser("plot", help="best-aircraft map over distance × pax")
+    p.add_argument("out")
+    p.add_argument("png")
+    p.add_argument("--direction", default="head")
+    p.add_argument("--vent", type=float, default=0.0)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "build":
+        cat = load_catalog()
+        store = SweepStore.create(args.out, cat, args.distance, args.vent, args.pax,
+                                  chunk_elems=args.chunk_elems)
+
+        def progress(done, total):
+            print(f"\r[SWEEP] chunk {done}/{total}", end="", flush=True)
+
+        rate = store.build(cat, workers=args.workers, progress=progress)
+        print(f"\n[SWEEP] {store.points:,} points, {rate:,.0f} points/s this run")
+        print(f"[SWEEP] {store.info()}")
+    elif args.cmd == "info":
+        print(json.dumps(SweepStore.open(args.out).info(), indent=1))
+    elif args.cmd == "query":
+        store = SweepStore.open(args.out)
+        coords = {a: getattr(args, a) for a in AXES}
+        t0 = time.perf_counter()
+        try:
+            rows = {m: np.asarray(store.select(m, **coords)) for m in store.index["metrics"]}
+            best = int(store.best(**coords))
+        except ValueError as e:                 # point outside the stored axes
+            raise SystemExit(str(e))
+        ms = (time.perf_counter() - t0) * 1000.0
+        for k, name in enumerate(store.names):
+            vals = "  ".join(f"{m} {rows[m][k]:10.3f}" for m in rows)
+            print(f"{'*' if k == best else ' '} {name:6s} {vals}")
+        print(f"[SWEEP] query {ms:.2f} ms")
+    elif args.cmd == "plot":
+        store = SweepStore.open(args.out)
+        t0 = time.perf_counter()
+        try:
+            plot_best_map(store, args.direction, args.vent, args.png)
+        except ValueError as e:
+            raise SystemExit(str(e))
+        print(f"[SWEEP] {args.png} in {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+wind_field.py
+Gridded wind field with bilinear interpolation.
+
+fetch_current_wind() gives one speed / direction at one point. Here a
+regular lat/lon grid (WIND_FIELD_RES_DEG over a bbox, the whole globe
+by default) is fetched from Open-Meteo with multi-coordinate requests
+(latitude=a,b,c&longitude=x,y,z, WIND_FIELD_BATCH points per request),
+cached on disk like the other data sources, and interpolated:
+
+- winds are split into u (east) / v (north) components and those are
+  interpolated bilinearly, so a cell between a westerly and an easterly
+  wind correctly weakens instead of averaging directions;
+- queries are vectorized: WindField.at(lat, lon) answers every OpenSky
+  aircraft or every route waypoint in one call;
+- a global grid wraps in longitude; grid points a failed batch left
+  empty take the field's mean wind.
+
+OPEN_METEO_URL points the client at any Open-Meteo compatible server;
+`stub` serves an analytic wind with the same JSON shape, and `check`
+measures the interpolation error against it:
+
+    python wind_field.py stub --port 8765 &
+    OPEN_METEO_URL=http://127.0.0.1:8765/v1/forecast python wind_field.py check
+"""
+import os
+import json
+import time
+import threading
+
+import numpy as np
+
+from data_sources import _cache_get, _cache_set
+
+OPEN_METEO_URL = os.getenv("OPEN_METEO_URL", "https://api.open-meteo.com/v1/forecast")
+WIND_FIELD_RES_DEG = float(os.getenv("WIND_FIELD_RES_DEG", "10"))
+WIND_FIELD_LEVEL = os.getenv("WIND_FIELD_LEVEL", "10m")      # or e.g. 250hPa (cruise)
+WIND_FIELD_BATCH = int(os.getenv("WIND_FIELD_BATCH", "100"))
+WIND_FIELD_MAX_AGE = int(os.getenv("WIND_FIELD_MAX_AGE", "1800"))
+WIND_FIELD_RETRY_S = 60.0          # back-off after a failed fetch
+WORLD = (-180.0, 180.0, -90.0, 90.0)                        # lon0, lon1, lat0, lat1
+
+
+def to_uv(speed, from_deg):
+    """Meteorological wind (speed, direction it blows *from*) → (u east, v north)."""
+    rad = np.radians(np.asarray(from_deg, dtype=np.float64))
+    speed = np.asarray(speed, dtype=np.float64)
+    return -speed * np.sin(rad), -speed * np.cos(rad)
+
+
+def from_uv(u, v):
+    """(u, v) → (speed, direction blown from in degrees [0, 360))."""
+    speed = np.hypot(u, v)
+    return speed, np.degrees(np.arctan2(-u, -v)) % 360.0
+
+
+def grid_axes(res=WIND_FIELD_RES_DEG, bbox=WORLD):
+    """
+    Latitudes and longitudes of the grid nodes (a global grid stops short
+    of lon1). Node counts are rounded so the axes end exactly on the bbox:
+    a res that does not divide the span becomes the nearest one that does.
+    """
+    lon0, lon1, lat0, lat1 = bbox
+    lats = np.linspace(lat0, lat1, max(1, round((lat1 - lat0) / res)) + 1)
+    if lon1 - lon0 >= 360.0:
+        n = max(2, round(360.0 / res))
+        lons = lon0 + np.arange(n) * (360.0 / n)
+    else:
+        lons = np.linspace(lon0, lon1, max(1, round((lon1 - lon0) / res)) + 1)
+    return lats, lons
+
+
+class WindField:
+    """Bilinear interpolator over u/v on a regular grid (arrays (n_lat, n_lon), km/h)."""
+
+    def __init__(self, lats, lons, u, v, time=None):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        u = np.asarray(u, dtype=np.float64)
+        v = np.asarray(v, dtype=np.float64)
+        missing = ~(np.isfinite(u) & np.isfinite(v))
+        if missing.all():
+            raise ValueError("wind field: no data")
+        u = np.where(missing, u[~missing].mean(), u)
+        v = np.where(missing, v[~missing].mean(), v)
+        self.u, self.v = u, v
+        self.missing = int(missing.sum())
+        self.time = time
+        self.res_lat = self.lats[1] - self.lats[0] if len(self.lats) > 1 else 1.0
+        self.res_lon = self.lons[1] - self.lons[0] if len(self.lons) > 1 else 1.0
+        self.periodic = len(self.lons) * self.res_lon >= 360.0 - 1e-9
+
+    @classmethod
+    def from_speed_direction(cls, lats, lons, speed, from_deg, time=None):
+        u, v = to_uv(speed, from_deg)
+        return cls(lats, lons, u, v, time)
+
+    def _axis(self, x, x0, res, n, periodic):
+        f = (x - x0) / res
+        if periodic:
+            i0 = np.floor(f).astype(np.intp)
+            t = f - i0
+            return i0 % n, (i0 + 1) % n, t
+        f = np.clip(f, 0.0, n - 1)
+        i0 = np.minimum(np.floor(f).astype(np.intp), max(n - 2, 0))
+        return i0, np.minimum(i0 + 1, n - 1), f - i0
+
+    def uv(self, lat, lon):
+        """Interpolated (u, v) km/h at broadcastable lat / lon arrays (NaN positions → NaN)."""
+        lat, lon = np.broadcast_arrays(np.asarray(lat, dtype=np.float64),
+                                       np.asarray(lon, dtype=np.float64))
+        bad = ~(np.isfinite(lat) & np.isfinite(lon))
+        if bad.any():
+            lat = np.where(bad, self.lats[0], lat)
+            lon = np.where(bad, self.lons[0], lon)
+        y0, y1, ty = self._axis(lat, self.lats[0], self.res_lat, len(self.lats), False)
+        x0, x1, tx = self._axis(lon, self.lons[0], self.res_lon, len(self.lons), self.periodic)
+        out = []
+        for g in (self.u, self.v):
+            top = g[y1, x0] * (1 - tx) + g[y1, x1] * tx
+            bottom = g[y0, x0] * (1 - tx) + g[y0, x1] * tx
+            out.append(np.where(bad, np.nan, bottom * (1 - ty) + top * ty))
+        return out[0], out[1]
+
+    def at(self, lat, lon):
+        """(speed km/h, direction from °) at broadcastable lat / lon arrays."""
+        return from_uv(*self.uv(lat, lon))
+
+    def info(self):
+        return {"shape": [len(self.lats), len(self.lons)],
+                "res_deg": [float(self.res_lat), float(self.res_lon)],
+                "periodic": bool(self.periodic), "missing": self.missing, "time": self.time,
+                "mean_kmh": round(float(np.hypot(self.u, self.v).mean()), 1)}
+
+
+# ====== Open-Meteo client ======
+
+
+def fetch_points(lats, lons, level=WIND_FIELD_LEVEL, url=None, batch=WIND_FIELD_BATCH,
+                 timeout=10, session=None):
+    """
+    (speed km/h, from °) at each (lat, lon) through batched multi-coordinate
+    requests; points of failed batches are NaN.
+    """
+    import requests
+    http = session or requests
+    url = url or OPEN_METEO_URL
+    lats = np.asarray(lats, dtype=np.float64).ravel()
+    lons = np.asarray(lons, dtype=np.float64).ravel()
+    speed = np.full(len(lats), np.nan)
+    direction = np.full(len(lats), np.nan)
+    var_s, var_d = f"wind_speed_{level}", f"wind_direction_{level}"
+    for start in range(0, len(lats), max(1, batch)):
+        sl = slice(start, start + max(1, batch))
+        params = {
+            "latitude": ",".join(f"{x:.4f}" for x in lats[sl]),
+            "longitude": ",".join(f"{x:.4f}" for x in lons[sl]),
+            "current": f"{var_s},{var_d}",
+            "wind_speed_unit": "kmh",
+        }
+        try:
+            r = http.get(url, params=params, timeout=timeout)
+            if r.status_code != 200:
+                print(f"Wind field batch {start}: HTTP {r.status_code}")
+                continue
+            data = r.json()
+        except Exception as e:
+            print(f"Wind field batch {start}: {type(e).__name__}")
+            continue
+        rows = data if isinstance(data, list) else [data]
+        for k, row in enumerate(rows[:len(lats[sl])]):
+            cur = row.get("current") or {}
+            if cur.get(var_s) is not None and cur.get(var_d) is not None:
+                speed[start + k] = float(cur[var_s])
+                direction[start + k] = float(cur[var_d])
+    return speed, direction
+
+
+def fetch_field(res=WIND_FIELD_RES_DEG, bbox=WORLD, level=WIND_FIELD_LEVEL, url=None,
+                batch=WIND_FIELD_BATCH, max_age=WIND_FIELD_MAX_AGE):
+    """Grid wind field, from the disk cache when younger than `max_age` s; None on failure."""
+    url = url or OPEN_METEO_URL
+    lats, lons = grid_axes(res, bbox)
+    name = "windfield_" + "_".join(str(x) for x in (level, res, *bbox))
+    cached = _cache_get(name, max_age=max_age)
+    if not cached or cached.get("url") != url:
+        LAT, LON = np.meshgrid(lats, lons, indexing="ij")
+        speed, direction = fetch_points(LAT, LON, level, url, batch)
+        if not np.isfinite(speed).any():
+            return None
+        cached = {"url": url, "time": time.time(),
+                  "speed": np.where(np.isfinite(speed), speed, None).tolist(),
+                  "direction": np.where(np.isfinite(direction), direction, None).tolist()}
+        _cache_set(name, cached)
+    shape = (len(lats), len(lons))
+    speed = np.array(cached["speed"], dtype=np.float64).reshape(shape)
+    direction = np.array(cached["direction"], dtype=np.float64).reshape(shape)
+    return WindField.from_speed_direction(lats, lons, speed, direction, cached["time"])
+
+
+_field = None
+_field_lock = threading.Lock()
+_failed_at = -float("inf")
+_fetching = False
+
+
+def current_field(max_age=WIND_FIELD_MAX_AGE, **kw):
+    """
+    Shared field, refetched (or re-read from cache) once `max_age` s old;
+    after a failure the previous field (or None) is served for
+    WIND_FIELD_RETRY_S seconds. Single flight: the caller that starts a
+    fetch waits for it, concurrent callers get the previous field (or
+    None) at once instead of queueing behind the network.
+    """
+    global _field, _failed_at, _fetching
+    with _field_lock:
+        now = time.time()
+        stale = _field is None or now - (_field.time or 0) > max_age
+        if not stale or _fetching or now - _failed_at <= WIND_FIELD_RETRY_S:
+            return _field
+        _fetching = True
+    field = None
+    try:
+        field = fetch_field(max_age=max_age, **kw)
+    finally:
+        with _field_lock:
+            _fetching = False
+            if field is not None:
+                _field = field
+            else:
+                _failed_at = time.time()
+    return _field
+
+
+# ====== Stub server ======
+
+
+def analytic_wind(lat, lon):
+    """Smooth test field (speed km/h, from °): jet-like westerlies plus a wave."""
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    u = 120.0 * np.cos(np.radians(lat)) ** 2 * np.sin(np.radians(2 * lat)) ** 2 + 10.0
+    v = 30.0 * np.sin(np.radians(lon)) * np.cos(np.radians(lat))
+    return from_uv(u, v)
+
+
+def serve_stub(port=8765, wind=analytic_wind, host="127.0.0.1"):
+    """Blocking Open-Meteo compatible server answering `current=` wind queries from `wind`."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import urlparse, parse_qs
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            q = parse_qs(urlparse(self.path).query)
+            try:
+                lats = [float(x) for x in q["latitude"][0].split(",")]
+                lons = [float(x) for x in q["longitude"][0].split(",")]
+                var_s, var_d = q["current"][0].split(",")[:2]
+            except (KeyError, ValueError):
+                self.send_error(400)
+                return
+            speed, direction = wind(lats, lons)
+            rows = [{"latitude": a, "longitude": b,
+                     "current": {var_s: round(float(s), 2), var_d: round(float(d), 1)}}
+                    for a, b, s, d in zip(lats, lons, speed, direction)]
+            body = json.dumps(rows if len(rows) > 1 else rows[0]).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"[WIND] stub Open-Meteo on http://{host}:{port}/v1/forecast")
+    server.serve_forever()
+
+
+# ====== CLI ======
+
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description="Gridded Open-Meteo wind field")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("stub", help="serve an analytic wind field (Open-Meteo JSON)")
+    p.add_argument("--port", type=int, default=8765)
+    p = sub.add_parser("check", help="fetch the grid and compare with the analytic field")
+    p.add_argument("--res", type=float, default=WIND_FIELD_RES_DEG)
+    p.add_argument("--points", type=int, default=10000)
+    p = sub.add_parser("at", help="wind at positions: at -- lat,lon [lat,lon ...]")
+    p.add_argument("positions", nargs="+")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "stub":
+        serve_stub(args.port)
+    elif args.cmd == "check":
+        t0 = time.perf_counter()
+        field = fetch_field(args.res, max_age=0)
+        if field is None:
+            raise SystemExit(f"no wind data from {OPEN_METEO_URL}")
+        t_fetch = time.perf_counter() - t0
+        rng = np.random.default_rng(0)
+        lat = rng.uniform(-85, 85, args.points)
+        lon = rng.uniform(-180, 180, args.points)
+        t0 = time.perf_counter()
+        u, v = field.uv(lat, lon)
+        t_query = (time.perf_counter() - t0) * 1000.0
+        eu, ev = to_uv(*analytic_wind(lat, lon))
+        err = np.hypot(u - eu, v - ev)
+        print(f"[WIND] {field.info()} fetched in {t_fetch:.2f}s")
+        print(f"[WIND] {args.points} queries in {t_query:.2f} ms; vector error vs analytic: "
+              f"mean {err.mean():.2f} km/h, p95 {np.percentile(err, 95):.2f}, max {err.max():.2f}")
+    else:
+        field = current_field()
+        if field is None:
+            raise SystemExit(f"no wind data from {OPEN_METEO_URL}")
+        lat, lon = np.array([[float(x) for x in p.split(",")] for p in args.positions]).T
+        for a, b, s, d in zip(lat, lon, *field.at(lat, lon)):
+            print(f"  {a:8.3f} {b:9.3f}  {s:6.1f} km/h from {d:5.1f}°")
+
+
+if __name__ == "__main__":
+    main()